@@ -0,0 +1,138 @@
+"""
+Performance benchmarks for the data-prep and scoring hot paths (pytest-benchmark).
+Everything runs offline on synthetic fixtures of increasing size.
+
+# Compare against the committed baseline and fail on a >10% median regression
+pytest bench_hotpaths.py --benchmark-compare=benchmarks/baseline.json --benchmark-compare-fail=median:10%
+
+# Re-record the baseline
+pytest bench_hotpaths.py --benchmark-json=benchmarks/baseline.json
+
+Timings are machine-specific: on other hardware, record a baseline from the unchanged tree first.
+"""
+
+import os
+import sys
+import random
+import pytest
+from PIL import Image, ImageDraw
+
+from scraper import get_card_info
+from generate_questions import generate_task_data, load_ideologies
+import create_hfdataset
+import standardize_images
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lmms-eval-files', 'mmbeliefs_mcq'))
+from utils import multiple_choice_accuracy
+
+IDEOLOGIES = ['Nazi', 'Incel', 'Anti-Ukrainian', 'Hindu Supremacist', 'White Supremacist', 'Anti-LGBTQ+',
+              'Neo-Confederate', 'Accelerationist', 'Islamist', 'Christian Nationalist']
+LOCATIONS = ['United States', 'Germany', 'India', 'Brazil', 'Australia', 'Ukraine']
+
+
+def make_card_html(num_cards, seed=0):
+    """HTML with the same card layout as the GPAHE database page."""
+    rng = random.Random(seed)
+    cards = []
+    for i in range(num_cards):
+        chips = ''.join(f'<div class="MuiChip-root"><span>{v}</span></div>' for v in rng.sample(IDEOLOGIES, 2))
+        locations = ''.join(f'<div class="MuiChip-root"><span>{v}</span></div>' for v in rng.sample(LOCATIONS, 1))
+        images = ''.join(f'<div class="static-image" style="background-image: url(&quot;https://example.org/{i}_{j}.png&quot;)"></div>'
+                         for j in range(rng.randint(1, 3)))
+        cards.append(
+            f'<div class="list-item-wrapper MuiBox-root css-1ycirx"><h2>Symbol {i}</h2>'
+            f'<div class="label-wrapper"><p>Ideology</p>{chips}</div>'
+            f'<div class="label-wrapper"><p>Location</p>{locations}</div>'
+            f'<div class="label-wrapper"><p>Description</p><div class="sw-width-s">Description of symbol {i}. ' + 'Lorem ipsum ' * 20 + '</div></div>'
+            f'{images}</div>'
+        )
+    return '<html><body>' + ''.join(cards) + '</body></html>'
+
+
+def make_image(path, size, mode, seed=0):
+    rng = random.Random(seed)
+    img = Image.new('RGBA', size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(img)
+    for _ in range(20):
+        x0, y0 = rng.randrange(size[0]), rng.randrange(size[1])
+        draw.ellipse((x0, y0, x0 + size[0] // 4, y0 + size[1] // 4),
+                     fill=(rng.randrange(256), rng.randrange(256), rng.randrange(256), 255))
+    img.convert(mode).save(path)
+    return path
+
+
+@pytest.mark.parametrize('num_cards', [50, 500])
+def test_get_card_info(benchmark, num_cards):
+    html = make_card_html(num_cards)
+    results = benchmark(get_card_info, html)
+    assert len(results) == num_cards
+
+
+@pytest.mark.parametrize('mode', ['RGB', 'RGBA', 'LA'])
+@pytest.mark.parametrize('size', [(224, 224), (1024, 768), (2048, 2048)])
+def test_resize_with_padding(benchmark, tmp_path, mode, size):
+    im_path = make_image(os.path.join(tmp_path, f'input_{mode}.png'), size, mode)
+    output_dir = os.path.join(tmp_path, 'out')
+    os.makedirs(output_dir)
+    benchmark(standardize_images.resize_with_padding, im_path, output_dir)
+
+
+@pytest.mark.parametrize('mode', ['RGB', 'RGBA', 'LA'])
+@pytest.mark.parametrize('size', [(448, 448), (2048, 2048)])
+def test_get_contrasting_background(benchmark, tmp_path, mode, size):
+    img = Image.open(make_image(os.path.join(tmp_path, f'input_{mode}.png'), size, mode))
+    img.load()
+    benchmark(standardize_images.get_contrasting_background, img)
+
+
+@pytest.mark.parametrize('size', [(448, 448), (2048, 2048)])
+def test_compress_image(benchmark, tmp_path, size):
+    im_path = make_image(os.path.join(tmp_path, 'input.png'), size, 'RGB')
+    assert benchmark(standardize_images.compress_image, im_path) is not None
+
+
+def _synthetic_results(num_items, seed=0):
+    rng = random.Random(seed)
+    results, labels = [], {}
+    for i in range(num_items):
+        images = [f'images_std/{i}_{j}.png' for j in range(rng.randint(1, 3))]
+        for image in images:
+            labels[os.path.basename(image)] = rng.sample(['logo', 'photo', 'textheavy', 'flaglike'], 1)
+        results.append({'title': f'Symbol {i}', 'Ideology': rng.sample(IDEOLOGIES, rng.randint(1, 3)),
+                        'Location': rng.sample(LOCATIONS, 1), 'images': images})
+    return results, labels
+
+
+@pytest.mark.parametrize('num_items', [1000, 10000])
+def test_generate_questions(benchmark, num_items):
+    results, labels = _synthetic_results(num_items)
+    _, external_ideologies = load_ideologies('assets')
+    task_data, _ = benchmark(generate_task_data, results, external_ideologies, labels)
+    assert len(task_data) == len(labels)
+
+
+@pytest.mark.parametrize('num_rows', [50, 200])
+def test_build_hf_dataset(benchmark, tmp_path, num_rows):
+    rows = []
+    for i in range(num_rows):
+        im_path = make_image(os.path.join(tmp_path, f'{i}_0.png'), (448, 448), 'RGB', seed=i)
+        rows.append({'question': f'Question {i}', 'answer_target': 'A', 'image_path': im_path,
+                     'candidate_answers': ['a', 'b', 'c', 'None of the above']})
+    # prepare_dataset adds the decoded image to each row, so every round gets fresh copies
+    dataset = benchmark(lambda: create_hfdataset.prepare_dataset([dict(r) for r in rows]))
+    assert len(dataset['validation']) == num_rows
+
+
+@pytest.mark.parametrize('num_samples', [10000, 100000])
+def test_multiple_choice_accuracy(benchmark, num_samples):
+    rng = random.Random(0)
+    samples = []
+    for _ in range(num_samples):
+        candidates = rng.sample(IDEOLOGIES, 3) + ['None of the above']
+        response = rng.choice(['A', 'B) ', 'C) ' + candidates[2], ' d', 'I cannot answer that.'])
+        samples.append((response, candidates, [candidates[rng.randrange(3)]]))
+
+    def score():
+        return sum(multiple_choice_accuracy(*sample) for sample in samples)
+
+    assert 0 < benchmark(score) < num_samples
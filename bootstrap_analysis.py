@@ -0,0 +1,189 @@
+"""
+Bootstrap confidence intervals and paired model comparisons over slices of the evaluation.
+
+Per-sample exact_match scores of every model are loaded once into a models x samples matrix, and
+slices (all samples, each image label, location and ideology) into a slices x samples membership
+matrix. Each bootstrap resample is a row of sample indices drawn with replacement; its per-sample
+counts turn every slice accuracy of every model into a single matrix product, so thousands of
+resamples over the full corpus take seconds. Model differences are paired: both models are scored
+on the same resamples. The seed is fixed, so reports are reproducible.
+
+Usage:
+python3 bootstrap_analysis.py --results_dir mmbeliefs_mcq_results --num_resamples 2000
+# Outputs: bootstrap_report.json
+"""
+
+import os
+import glob
+import json
+import argparse
+import itertools
+
+import numpy as np
+
+DEFAULT_NUM_RESAMPLES = 2000
+DEFAULT_SEED = 0
+DEFAULT_TASK = 'mmbeliefs_mcq_val'
+
+
+def load_samples(path):
+    """doc_id -> sample from an lmms_eval --log_samples JSONL file."""
+    samples = {}
+    with open(path, 'r') as f:
+        for line in f:
+            if line.strip():
+                sample = json.loads(line)
+                samples[sample['doc_id']] = sample
+    return samples
+
+
+def find_sample_files(results_dir, task=DEFAULT_TASK):
+    """
+    Latest samples file of each model for exactly this task (lmms_eval names them
+    <date>_samples_<task>.jsonl), so runs of other tasks such as the _local variant are not mixed in.
+    The model name is its output directory under results_dir.
+    """
+    latest = {}
+    for path in glob.glob(os.path.join(results_dir, '**', f'*_samples_{task}.jsonl'), recursive=True):
+        model = os.path.relpath(path, results_dir).split(os.sep)[0]
+        if model not in latest or os.path.getmtime(path) > os.path.getmtime(latest[model]):
+            latest[model] = path
+    return dict(sorted(latest.items()))
+
+
+def correctness_matrix(model_samples, metric='exact_match'):
+    """
+    Returns (models, doc_ids, matrix) with matrix[m, j] the score of model m on doc_ids[j].
+    Only samples scored for every model are kept, so all comparisons are paired.
+    """
+    models = list(model_samples)
+    doc_ids = sorted(set.intersection(*(set(samples) for samples in model_samples.values())))
+    matrix = np.array([[float(model_samples[m][d][metric]) for d in doc_ids] for m in models], dtype=np.float64)
+    return models, doc_ids, matrix
+
+
+def slice_matrix(docs, min_size=1):
+    """
+    Returns (slice_names, membership) with membership[s, j] True if docs[j] is in slice s.
+    Slices: 'all', 'label:<image label>', 'location:<location>', 'ideology:<correct ideology>'.
+    """
+    slices = {'all': set(range(len(docs)))}
+    fields = [('label', 'image_labels'), ('location', 'locations'), ('ideology', 'superset_correct_answers')]
+    for j, doc in enumerate(docs):
+        for prefix, field in fields:
+            values = doc.get(field) or []
+            for value in [values] if isinstance(values, str) else values:
+                slices.setdefault(f"{prefix}:{value}", set()).add(j)
+    names = ['all'] + sorted(name for name, members in slices.items() if name != 'all' and len(members) >= min_size)
+    membership = np.zeros((len(names), len(docs)), dtype=bool)
+    for s, name in enumerate(names):
+        membership[s, list(slices[name])] = True
+    return names, membership
+
+
+def resample_counts(num_samples, num_resamples, seed=DEFAULT_SEED):
+    """num_resamples x num_samples matrix of how often each sample is drawn in each resample."""
+    rng = np.random.default_rng(seed)
+    indices = rng.integers(0, num_samples, size=(num_resamples, num_samples))
+    offsets = (np.arange(num_resamples) * num_samples)[:, None]
+    counts = np.bincount((indices + offsets).ravel(), minlength=num_resamples * num_samples)
+    return counts.reshape(num_resamples, num_samples).astype(np.float32)
+
+
+def bootstrap_accuracies(correct, membership, counts):
+    """
+    Accuracy of every model on every slice under every resample: an array of shape
+    (num_resamples, num_slices, num_models). Slices empty in a resample are NaN.
+    """
+    num_slices, num_models = membership.shape[0], correct.shape[0]
+    # Row s * num_models + m holds the scores of model m masked to slice s
+    masked = (membership[:, None, :] * correct[None, :, :]).reshape(num_slices * num_models, -1)
+    hits = counts @ masked.T.astype(np.float32)
+    sizes = counts @ membership.T.astype(np.float32)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return hits.reshape(-1, num_slices, num_models) / sizes[:, :, None]
+
+
+def analyze(models, correct, slice_names, membership, num_resamples=DEFAULT_NUM_RESAMPLES, seed=DEFAULT_SEED,
+            confidence=0.95):
+    """Per-slice accuracies with percentile CIs, and paired differences with two-sided bootstrap p-values."""
+    counts = resample_counts(correct.shape[1], num_resamples, seed)
+    boot = bootstrap_accuracies(correct, membership, counts)
+    alpha = (1 - confidence) / 2 * 100
+    sizes = membership.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        observed = (membership.astype(np.float64) @ correct.T) / sizes[:, None]
+
+    report = {'models': models, 'num_samples': int(correct.shape[1]), 'num_resamples': num_resamples,
+              'seed': seed, 'confidence': confidence, 'slices': {}}
+    for s, name in enumerate(slice_names):
+        lows = np.nanpercentile(boot[:, s, :], alpha, axis=0)
+        highs = np.nanpercentile(boot[:, s, :], 100 - alpha, axis=0)
+        entry = {'size': int(sizes[s]), 'models': {}, 'pairs': {}}
+        for m, model in enumerate(models):
+            entry['models'][model] = {'accuracy': float(observed[s, m]), 'ci_low': float(lows[m]),
+                                      'ci_high': float(highs[m])}
+        for a, b in itertools.combinations(range(len(models)), 2):
+            diffs = boot[:, s, a] - boot[:, s, b]
+            diffs = diffs[~np.isnan(diffs)]
+            p_value = min(1.0, 2 * min(np.mean(diffs <= 0), np.mean(diffs >= 0))) if len(diffs) else float('nan')
+            entry['pairs'][f"{models[a]} vs {models[b]}"] = {
+                'difference': float(observed[s, a] - observed[s, b]),
+                'ci_low': float(np.percentile(diffs, alpha)) if len(diffs) else float('nan'),
+                'ci_high': float(np.percentile(diffs, 100 - alpha)) if len(diffs) else float('nan'),
+                'p_value': float(p_value),
+            }
+        report['slices'][name] = entry
+    return report
+
+
+def format_report(report, slices=None):
+    lines = []
+    for name, entry in report['slices'].items():
+        if slices and name not in slices:
+            continue
+        lines.append(f"{name} (n={entry['size']})")
+        for model, stats in sorted(entry['models'].items(), key=lambda x: -x[1]['accuracy']):
+            lines.append(f"    {model:<40} {stats['accuracy']:.3f} [{stats['ci_low']:.3f}, {stats['ci_high']:.3f}]")
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bootstrap CIs and paired model comparisons over slices')
+    parser.add_argument('--results_dir', type=str, default='mmbeliefs_mcq_results')
+    parser.add_argument('--task', type=str, default=DEFAULT_TASK,
+                        help='lmms_eval task whose samples are analyzed, e.g. mmbeliefs_mcq_val_local')
+    parser.add_argument('--task_data_path', type=str, default=None,
+                        help='Slice fields for samples whose logged doc lacks them, indexed by doc_id '
+                             '(only valid when docs are in task data order, i.e. not a delta-published dataset)')
+    parser.add_argument('--metric', type=str, default='exact_match')
+    parser.add_argument('--num_resamples', type=int, default=DEFAULT_NUM_RESAMPLES)
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--confidence', type=float, default=0.95)
+    parser.add_argument('--min_slice_size', type=int, default=20)
+    parser.add_argument('--output_path', type=str, default='bootstrap_report.json')
+    args = parser.parse_args()
+
+    sample_files = find_sample_files(args.results_dir, args.task)
+    if not sample_files:
+        raise SystemExit(f"No {args.task} samples files found under {args.results_dir} (run lmms_eval with --log_samples)")
+    model_samples = {model: load_samples(path) for model, path in sample_files.items()}
+    models, doc_ids, correct = correctness_matrix(model_samples, args.metric)
+    print(f"Loaded {len(models)} models x {len(doc_ids)} samples")
+
+    task_data = None
+    if args.task_data_path:
+        with open(args.task_data_path, 'r') as f:
+            task_data = json.load(f)
+    first = model_samples[models[0]]
+    docs = [{**(task_data[d] if task_data else {}), **first[d].get('doc', {})} for d in doc_ids]
+    slice_names, membership = slice_matrix(docs, args.min_slice_size)
+
+    report = analyze(models, correct, slice_names, membership, args.num_resamples, args.seed, args.confidence)
+    with open(args.output_path, 'w') as f:
+        json.dump(report, f, indent=4)
+    print(format_report(report))
+    print(f"Report with paired comparisons for {len(slice_names)} slices saved to {args.output_path}")
+
+if __name__ == "__main__":
+    main()
@@ -4,23 +4,56 @@ from PIL import Image
 from datasets import Dataset, DatasetDict
 from huggingface_hub import create_repo, delete_repo
 import os
+import sys
+import shutil
+import time
+from delta_publish import HubRepo, LocalRepo, publish_delta, format_report, image_columns
+from profiling import span, traced
 
 
-def prepare_dataset(raw_data):
+@traced('build_hf_dataset')
+def prepare_dataset(raw_data, resolutions=()):
     processed_data = []
     for item in raw_data:        # Load and store the image in the dataset
         try:
-            image = Image.open(item['image_path']).convert('RGB')
-            item['image'] = image  # replace path with actual image object
+            # 'image' plus an 'image_<WxH>' column per additional resolution
+            images = {}
+            for column, image_path in image_columns(item, resolutions).items():
+                with span('load_image'):
+                    images[column] = Image.open(image_path).convert('RGB')
+            item.update(images)  # replace path with actual image object
             processed_data.append(item)
         except Exception as e:
             print(f"Error loading image {item['image_path']}: {e}")
 
     # Create dataset and wrap it in DatasetDict with 'test' split
-    dataset = Dataset.from_list(processed_data)
+    with span('dataset_from_list', num_rows=len(processed_data)):
+        dataset = Dataset.from_list(processed_data)
     dataset_dict = DatasetDict({"validation": dataset})
     return dataset_dict
 
+@traced()
+def save_dataset_to_disk(dataset, path):
+    """
+    Save the dataset as Arrow files for load_from_disk (memory-mapped, no network).
+    path is a symlink to a versioned copy next to it: each save writes a new copy and atomically
+    repoints the symlink, so path always resolves and processes that have the previous copy mapped
+    keep reading it undisturbed.
+    """
+    path = path.rstrip('/')
+    previous = os.path.realpath(path) if os.path.islink(path) else None
+    version_path = f"{path}.{int(time.time() * 1e6):020d}"
+    dataset.save_to_disk(version_path)
+    if os.path.isdir(path) and previous is None:
+        # A plain directory from before path was a symlink; it cannot be replaced atomically, only once
+        previous = f"{version_path}.old"
+        os.rename(path, previous)
+    tmp_link = f"{version_path}.link"
+    os.symlink(os.path.basename(version_path), tmp_link)
+    os.replace(tmp_link, path)
+    if previous is not None:
+        shutil.rmtree(previous, ignore_errors=True)
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--task_offset", type=int, default=0)
@@ -28,6 +61,17 @@ if __name__ == "__main__":
     parser.add_argument("--task_data_path", type=str, default="task_data.json")
     parser.add_argument("--dataset_name", type=str, default="mmbeliefs_mcq")
     parser.add_argument("--private", type=bool, default=True)
+    parser.add_argument("--delta", action="store_true",
+                        help="Upload only changed content-hashed shards instead of recreating the repo")
+    parser.add_argument("--num_shards", type=int, default=16)
+    parser.add_argument("--resolutions", type=str, nargs='*', default=[],
+                        help="Additional resolutions (e.g. 336x336) from standardize_images.py --target_sizes, "
+                             "added as image_<WxH> columns")
+    parser.add_argument("--save_to_disk", type=str, default=None,
+                        help="Save the dataset to this directory for the mmbeliefs_mcq_val_local task "
+                             "instead of pushing to the Hub")
+    parser.add_argument("--local_repo", type=str, default=None,
+                        help="Publish to a local directory repo instead of the Hub (implies --delta)")
     args = parser.parse_args()
 
     with open(args.task_data_path, "r") as f:
@@ -35,13 +79,27 @@ if __name__ == "__main__":
     if (args.num_tasks + args.task_offset) >= len(task_data):
         raise ValueError("The specified num_tasks + task_offset is >= the number of tasks in the dataset.")
     raw_data = task_data[args.task_offset:min(args.num_tasks + args.task_offset, len(task_data))]
-    dataset = prepare_dataset(raw_data)
+
+    if args.delta or args.local_repo:
+        repo = LocalRepo(args.local_repo) if args.local_repo else HubRepo(args.dataset_name, private=args.private)
+        with span('publish_delta', num_rows=len(raw_data)):
+            report = publish_delta(raw_data, repo, num_shards=args.num_shards, resolutions=args.resolutions)
+        print(format_report(report))
+        sys.exit(0)
+
+    dataset = prepare_dataset(raw_data, resolutions=args.resolutions)
+
+    if args.save_to_disk:
+        save_dataset_to_disk(dataset, args.save_to_disk)
+        print(f"Dataset with {len(raw_data)} images saved to {args.save_to_disk}")
+        sys.exit(0)
 
     try:
         delete_repo(args.dataset_name, repo_type="dataset")
     except:
         pass
     create_repo(args.dataset_name, repo_type="dataset", private=args.private)
-    dataset.push_to_hub(args.dataset_name)
+    with span('push_to_hub'):
+        dataset.push_to_hub(args.dataset_name)
 
     print(f"Dataset {args.dataset_name} ({'private' if args.private else 'public'}) with {len(raw_data)} images pushed to Hugging Face Hub")
\ No newline at end of file
@@ -0,0 +1,316 @@
+"""
+Incremental publishing of the task dataset as content-addressed Parquet shards.
+
+Rows are assigned to shards by a hash of their content (question fields plus image bytes), so a
+change to a few rows only changes the shards holding them. The shard hashes are stored in a
+manifest inside the dataset repo; a publish compares against it and uploads only the changed
+shards, in parallel, as a single commit.
+
+Every row carries its content hash as a stable 'row_id' column, and shard hashes cover row content
+only, so inserting or removing rows changes just the shards holding them. Shards are sorted by
+row_id, and so are the eval task's documents, so doc ids follow row content, not task data order.
+
+The dataset card's features and data_files are rewritten on every publish that changes them, so
+a card left by a full push_to_hub does not describe the old schema.
+
+Two repo backends share the same interface:
+- HubRepo: a Hugging Face Hub dataset repo
+- LocalRepo: a directory with atomically swapped revisions, for testing and offline use
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from datasets import Dataset, Image as ImageFeature, Value
+from datasets.info import DatasetInfo, DatasetInfosDict
+
+from standardize_images import resolution_output_dir
+
+MANIFEST_FILENAME = "mmbeliefs_manifest.json"
+ROW_ID_COLUMN = "row_id"
+CARD_FILENAME = "README.md"
+
+
+def image_columns(item, resolutions=()):
+    """Image column name -> file path: 'image' for the primary resolution, 'image_<WxH>' for others."""
+    columns = {'image': item['image_path']}
+    for resolution in resolutions:
+        # Written by standardize_images.py --target_sizes
+        columns[f'image_{resolution}'] = os.path.join(
+            resolution_output_dir(os.path.dirname(item['image_path']), resolution), os.path.basename(item['image_path']))
+    return columns
+
+
+def row_hash(item, resolutions=()):
+    """SHA-256 over the row's fields (excluding any decoded image) and the bytes of its image files."""
+    h = hashlib.sha256()
+    fields = {k: v for k, v in item.items() if k != 'image'}
+    h.update(json.dumps(fields, sort_keys=True).encode())
+    for column, path in image_columns(item, resolutions).items():
+        h.update(column.encode())
+        with open(path, 'rb') as f:
+            h.update(hashlib.sha256(f.read()).digest())
+    return h.hexdigest()
+
+
+def shard_filename(split, index, num_shards):
+    return f"data/{split}-{index:05d}-of-{num_shards:05d}.parquet"
+
+
+def plan_shards(task_data, num_shards, split='validation', resolutions=()):
+    """
+    Assign rows to shards by content hash. Returns {filename: {'hash', 'rows'}} where rows carry
+    their content hash in ROW_ID_COLUMN and are sorted by it, so a shard's hash depends only on
+    the content of its rows, not on where they are in task_data.
+    """
+    shards = {shard_filename(split, i, num_shards): [] for i in range(num_shards)}
+    for item in task_data:
+        h = row_hash(item, resolutions)
+        shards[shard_filename(split, int(h[:8], 16) % num_shards, num_shards)].append({**item, ROW_ID_COLUMN: h})
+    plan = {}
+    for filename, rows in shards.items():
+        if rows:
+            rows.sort(key=lambda item: item[ROW_ID_COLUMN])
+            plan[filename] = {
+                'hash': hashlib.sha256(','.join(item[ROW_ID_COLUMN] for item in rows).encode()).hexdigest(),
+                'rows': rows,
+            }
+    return plan
+
+
+def dataset_features(task_data, resolutions=()):
+    """Features inferred from all rows, so every shard gets the same schema."""
+    features = Dataset.from_list([{k: v for k, v in item.items() if k != 'image'} for item in task_data]).features
+    features[ROW_ID_COLUMN] = Value('string')
+    for column in image_columns(task_data[0], resolutions):
+        features[column] = ImageFeature()
+    return features
+
+
+def dataset_card(text, features, split='validation'):
+    """
+    The dataset card (README.md) with its dataset_info and configs metadata set to the published
+    schema and shard files; the rest of the card is kept. text is None if the repo has no card.
+    """
+    from huggingface_hub import DatasetCard
+    card = DatasetCard(text or "---\n---\n")
+    DatasetInfosDict({'default': DatasetInfo(features=features)}).to_dataset_card_data(card.data)
+    card.data['configs'] = [{'config_name': 'default',
+                             'data_files': [{'split': split, 'path': f"data/{split}-*"}]}]
+    return str(card)
+
+
+def write_shard(rows, path, features, resolutions=()):
+    """Write rows to Parquet with the image files embedded as Image features."""
+    records = []
+    for item in rows:
+        record = {k: v for k, v in item.items() if k != 'image'}
+        for column, image_path in image_columns(item, resolutions).items():
+            with open(image_path, 'rb') as f:
+                record[column] = {'bytes': f.read(), 'path': os.path.basename(image_path)}
+        records.append(record)
+    dataset = Dataset.from_list(records, features=features)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    dataset.to_parquet(path)
+    return os.path.getsize(path)
+
+
+class LocalRepo:
+    """
+    File-based stand-in for a Hub dataset repo. Each commit builds a new revision directory
+    (unchanged files are hard-linked) and then atomically repoints the 'current' symlink.
+    """
+
+    def __init__(self, root):
+        # Absolute, so the 'current' symlink does not resolve relative to the repo directory itself
+        self.root = os.path.abspath(root)
+        os.makedirs(os.path.join(root, 'revisions'), exist_ok=True)
+
+    @property
+    def current(self):
+        link = os.path.join(self.root, 'current')
+        return os.path.realpath(link) if os.path.islink(link) else None
+
+    def revision(self):
+        return os.path.basename(self.current) if self.current else None
+
+    def list_files(self, revision=None):
+        """Paths of all files in the current revision (the only one readable here)."""
+        if self.current is None:
+            return []
+        return sorted(os.path.relpath(os.path.join(root, name), self.current).replace(os.sep, '/')
+                      for root, _, files in os.walk(self.current) for name in files)
+
+    def read_file(self, path_in_repo, revision=None):
+        """Text of a file in the current revision, or None if it does not exist."""
+        path = os.path.join(self.current, path_in_repo) if self.current else None
+        if path is None or not os.path.exists(path):
+            return None
+        with open(path, 'r') as f:
+            return f.read()
+
+    def read_manifest(self):
+        if self.current is None:
+            return None, None
+        path = os.path.join(self.current, MANIFEST_FILENAME)
+        if not os.path.exists(path):
+            return None, self.revision()
+        with open(path, 'r') as f:
+            return json.load(f), self.revision()
+
+    def commit(self, additions, deletions, message, parent_revision=None, num_workers=8):
+        """additions: {path_in_repo: local_path}; deletions: [path_in_repo]."""
+        if self.revision() != parent_revision:
+            raise RuntimeError(f"Repo moved from {parent_revision} to {self.revision()} during publish")
+        revision = f"{int(time.time() * 1e6):020d}"
+        new_dir = os.path.join(self.root, 'revisions', revision)
+        if self.current:
+            shutil.copytree(self.current, new_dir, copy_function=os.link)
+        else:
+            os.makedirs(new_dir)
+        for path_in_repo in deletions:
+            os.remove(os.path.join(new_dir, path_in_repo))
+
+        def add(item):
+            path_in_repo, local_path = item
+            dest = os.path.join(new_dir, path_in_repo)
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            if os.path.exists(dest):
+                os.remove(dest)  # Hard link shared with the previous revision
+            shutil.copyfile(local_path, dest)
+
+        with ThreadPoolExecutor(max_workers=num_workers) as executor:
+            list(executor.map(add, additions.items()))
+        with open(os.path.join(new_dir, '.commit_message'), 'w') as f:
+            f.write(message)
+
+        tmp_link = os.path.join(self.root, f'.current-{revision}')
+        os.symlink(new_dir, tmp_link)
+        os.replace(tmp_link, os.path.join(self.root, 'current'))
+        return revision
+
+
+class HubRepo:
+    """Hugging Face Hub dataset repo; commits are atomic and LFS uploads run in parallel."""
+
+    def __init__(self, repo_id, private=True):
+        from huggingface_hub import HfApi, create_repo
+        self.repo_id = repo_id
+        self.api = HfApi()
+        create_repo(repo_id, repo_type="dataset", private=private, exist_ok=True)
+
+    def read_manifest(self):
+        from huggingface_hub import hf_hub_download
+        from huggingface_hub.utils import EntryNotFoundError
+        revision = self.api.repo_info(self.repo_id, repo_type="dataset").sha
+        try:
+            path = hf_hub_download(self.repo_id, MANIFEST_FILENAME, repo_type="dataset", revision=revision)
+        except EntryNotFoundError:
+            return None, revision
+        with open(path, 'r') as f:
+            return json.load(f), revision
+
+    def read_file(self, path_in_repo, revision=None):
+        from huggingface_hub import hf_hub_download
+        from huggingface_hub.utils import EntryNotFoundError
+        if revision is None:
+            return None
+        try:
+            path = hf_hub_download(self.repo_id, path_in_repo, repo_type="dataset", revision=revision)
+        except EntryNotFoundError:
+            return None
+        with open(path, 'r') as f:
+            return f.read()
+
+    def list_files(self, revision=None):
+        if revision is None:
+            return []
+        return self.api.list_repo_files(self.repo_id, repo_type="dataset", revision=revision)
+
+    def commit(self, additions, deletions, message, parent_revision=None, num_workers=8):
+        from huggingface_hub import CommitOperationAdd, CommitOperationDelete
+        operations = [CommitOperationAdd(path_in_repo=p, path_or_fileobj=local) for p, local in additions.items()]
+        operations += [CommitOperationDelete(path_in_repo=p) for p in deletions]
+        info = self.api.create_commit(self.repo_id, operations, commit_message=message, repo_type="dataset",
+                                      num_threads=num_workers, parent_commit=parent_revision)
+        return info.oid
+
+
+def publish_delta(task_data, repo, num_shards=16, split='validation', num_workers=8, work_dir=None, resolutions=()):
+    """
+    Publish task_data to repo, uploading only shards whose content hash changed since the last
+    published manifest. Returns a report with shard counts, bytes uploaded and bytes/time saved.
+    """
+    start = time.time()
+    shards = plan_shards(task_data, num_shards, split, resolutions)
+    previous, parent_revision = repo.read_manifest()
+    previous_shards = previous['shards'] if previous else {}
+
+    changed = [f for f, shard in shards.items() if previous_shards.get(f, {}).get('hash') != shard['hash']]
+    if previous is None:
+        # E.g. a repo created by push_to_hub: its data files are not in any manifest
+        deletions = [f for f in repo.list_files(parent_revision) if f.startswith('data/') and f not in shards]
+    else:
+        deletions = [f for f in previous_shards if f not in shards]
+
+    manifest = {'split': split, 'num_shards': num_shards, 'num_rows': len(task_data), 'shards': {}}
+    features = dataset_features(task_data, resolutions)
+    previous_card = repo.read_file(CARD_FILENAME, parent_revision)
+    card = dataset_card(previous_card, features, split)
+    with tempfile.TemporaryDirectory(dir=work_dir) as tmp_dir:
+        def write(filename):
+            return filename, write_shard(shards[filename]['rows'], os.path.join(tmp_dir, filename), features, resolutions)
+
+        with ThreadPoolExecutor(max_workers=num_workers) as executor:
+            written = dict(executor.map(write, changed))
+
+        for filename, shard in shards.items():
+            size = written[filename] if filename in written else previous_shards[filename]['size']
+            manifest['shards'][filename] = {'hash': shard['hash'], 'num_rows': len(shard['rows']), 'size': size}
+
+        uploaded_bytes = sum(written.values())
+        total_bytes = sum(s['size'] for s in manifest['shards'].values())
+        revision = parent_revision
+        upload_start = time.time()
+        if changed or deletions or previous is None or card != previous_card:
+            manifest_path = os.path.join(tmp_dir, MANIFEST_FILENAME)
+            with open(manifest_path, 'w') as f:
+                json.dump(manifest, f, indent=4)
+            additions = {filename: os.path.join(tmp_dir, filename) for filename in changed}
+            additions[MANIFEST_FILENAME] = manifest_path
+            if card != previous_card:
+                card_path = os.path.join(tmp_dir, CARD_FILENAME)
+                with open(card_path, 'w') as f:
+                    f.write(card)
+                additions[CARD_FILENAME] = card_path
+            revision = repo.commit(additions, deletions, f"Update {len(changed)} of {num_shards} shards",
+                                   parent_revision=parent_revision, num_workers=num_workers)
+        upload_s = time.time() - upload_start
+
+    elapsed = time.time() - start
+    # Estimate the time a full re-upload would have taken from the observed upload rate
+    rate = uploaded_bytes / upload_s if uploaded_bytes and upload_s else None
+    return {
+        'revision': revision,
+        'num_shards': num_shards,
+        'changed_shards': len(changed),
+        'deleted_shards': len(deletions),
+        'uploaded_bytes': uploaded_bytes,
+        'total_bytes': total_bytes,
+        'saved_bytes': total_bytes - uploaded_bytes,
+        'elapsed_s': elapsed,
+        'estimated_saved_s': (total_bytes - uploaded_bytes) / rate if rate else None,
+    }
+
+
+def format_report(report):
+    saved_s = report['estimated_saved_s']
+    return (f"Uploaded {report['changed_shards']} of {report['num_shards']} shards "
+            f"({report['uploaded_bytes'] / 1e6:.1f} MB of {report['total_bytes'] / 1e6:.1f} MB, "
+            f"{report['saved_bytes'] / 1e6:.1f} MB saved) in {report['elapsed_s']:.1f}s"
+            + (f", about {saved_s:.1f}s saved" if saved_s is not None else ""))
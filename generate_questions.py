@@ -1,107 +1,140 @@
 import os
 import json
-with open("results_with_images_std.json", "r") as f:
-    results = json.load(f)
+import random
+import argparse
+import pandas as pd
+from profiling import traced
+from label_index import LabelIndex
 
-with open(os.path.join('assets', "internal.json"), "r") as f:
-    internal_ideologies = json.load(f)
-internal_ideologies = [sis['Ideology'] for sis in internal_ideologies]
-internal_ideologies_set = set(internal_ideologies)
-assert len(internal_ideologies) == len(internal_ideologies_set)
-internal_ideologies_set = set([rr for r in results for rr in r['Ideology']])
+QUESTION_TEXT = "Answer with one letter (A, B, C, D); do not provide any other text.\nWhich ideology best relates to the following image?\n"
 
-with open(os.path.join('assets', "external.json"), "r") as f:
-    external_ideologies = json.load(f)
-external_ideologies = [sis['Ideology'] for sis in external_ideologies]
-assert len(external_ideologies) == len(set(external_ideologies))
+def load_ideologies(assets_dir='assets'):
+    with open(os.path.join(assets_dir, "internal.json"), "r") as f:
+        internal_ideologies = json.load(f)
+    internal_ideologies = [sis['Ideology'] for sis in internal_ideologies]
+    assert len(internal_ideologies) == len(set(internal_ideologies))
 
-with open(os.path.join('assets', 'image_labels.json'), 'r') as f:
-    image_labels_dict = json.load(f)
+    with open(os.path.join(assets_dir, "external.json"), "r") as f:
+        external_ideologies = json.load(f)
+    external_ideologies = [sis['Ideology'] for sis in external_ideologies]
+    assert len(external_ideologies) == len(set(external_ideologies))
+    return internal_ideologies, external_ideologies
 
-import random
-random.seed(42)
+@traced('generate_questions')
+def generate_task_data(results, external_ideologies, image_labels_dict, seed=42):
+    """
+    Build one multiple-choice question per image: the correct ideology, an incorrect ideology drawn
+    from the scraped results, an incorrect ideology from the external list, and "None of the above".
+    Answer positions are balanced greedily across questions.
+    Returns (task_data, position_counts).
+    """
+    random.seed(seed)
+    # Sorted so that sampling from it is reproducible across runs
+    internal_ideologies = sorted(set([rr for r in results for rr in r['Ideology']]))
 
-# Initialize counters for each answer type in each position
-position_counts = {
-    'correct': {'A': 0, 'B': 0, 'C': 0},
-    'incorrect_internal': {'A': 0, 'B': 0, 'C': 0},
-    'incorrect_external': {'A': 0, 'B': 0, 'C': 0}
-}
+    # Initialize counters for each answer type in each position
+    position_counts = {
+        'correct': {'A': 0, 'B': 0, 'C': 0},
+        'incorrect_internal': {'A': 0, 'B': 0, 'C': 0},
+        'incorrect_external': {'A': 0, 'B': 0, 'C': 0}
+    }
 
-abc = ['A', 'B', 'C']
-task_data = []
-for result in results:
-    for image in result['images']:
-        ideol_incorrect_internal = list(internal_ideologies_set - set(result['Ideology']))
-        ideol_correct = random.sample(result['Ideology'], 1)
-        ideol_incorrect_internal = random.sample(ideol_incorrect_internal, 1)
-        ideol_incorrect_external = random.sample(external_ideologies, 1)
+    abc = ['A', 'B', 'C']
+    task_data = []
+    num_duplicates_skipped = 0
+    for result in results:
+        # Near-duplicates flagged by standardize_images.py --dedup_max_distance collapse onto their canonical image
+        duplicate_of = result.get('duplicate_of', {})
+        for image in result['images']:
+            if image in duplicate_of:
+                num_duplicates_skipped += 1
+                continue
+            ideol_incorrect_internal = [i for i in internal_ideologies if i not in result['Ideology']]
+            ideol_correct = random.sample(result['Ideology'], 1)
+            ideol_incorrect_internal = random.sample(ideol_incorrect_internal, 1)
+            ideol_incorrect_external = random.sample(external_ideologies, 1)
         
-        # Create answer mapping
-        answers = {
-            'correct': ideol_correct[0],
-            'incorrect_internal': ideol_incorrect_internal[0],
-            'incorrect_external': ideol_incorrect_external[0]
-        }
+            # Create answer mapping
+            answers = {
+                'correct': ideol_correct[0],
+                'incorrect_internal': ideol_incorrect_internal[0],
+                'incorrect_external': ideol_incorrect_external[0]
+            }
         
-        # Find the most balanced arrangement
-        min_imbalance = float('inf')
-        best_arrangement = None
+            # Find the most balanced arrangement
+            min_imbalance = float('inf')
+            best_arrangement = None
         
-        for perm in [('correct', 'incorrect_internal', 'incorrect_external'),
-                    ('correct', 'incorrect_external', 'incorrect_internal'),
-                    ('incorrect_internal', 'correct', 'incorrect_external'),
-                    ('incorrect_internal', 'incorrect_external', 'correct'),
-                    ('incorrect_external', 'correct', 'incorrect_internal'),
-                    ('incorrect_external', 'incorrect_internal', 'correct')]:
-            # Calculate imbalance score for this arrangement
-            imbalance = sum(position_counts[ans_type][pos] 
-                          for ans_type, pos in zip(perm, abc))
-            if imbalance < min_imbalance:
-                min_imbalance = imbalance
-                best_arrangement = perm
+            for perm in [('correct', 'incorrect_internal', 'incorrect_external'),
+                        ('correct', 'incorrect_external', 'incorrect_internal'),
+                        ('incorrect_internal', 'correct', 'incorrect_external'),
+                        ('incorrect_internal', 'incorrect_external', 'correct'),
+                        ('incorrect_external', 'correct', 'incorrect_internal'),
+                        ('incorrect_external', 'incorrect_internal', 'correct')]:
+                # Calculate imbalance score for this arrangement
+                imbalance = sum(position_counts[ans_type][pos] 
+                              for ans_type, pos in zip(perm, abc))
+                if imbalance < min_imbalance:
+                    min_imbalance = imbalance
+                    best_arrangement = perm
         
-        # Update position counts and create questions
-        questions = []
-        for ans_type, pos in zip(best_arrangement, abc):
-            position_counts[ans_type][pos] += 1
-            questions.append((pos, answers[ans_type]))
-            if ans_type == 'correct':
-                correct = pos
+            # Update position counts and create questions
+            questions = []
+            for ans_type, pos in zip(best_arrangement, abc):
+                position_counts[ans_type][pos] += 1
+                questions.append((pos, answers[ans_type]))
+                if ans_type == 'correct':
+                    correct = pos
         
-        questions.sort(key=lambda x: x[0])
-        questions += ('D', "None of the above"),
-        question_text = "Answer with one letter (A, B, C, D); do not provide any other text.\nWhich ideology best relates to the following image?\n"
-        question_text += '\n'.join([f'{ans[0]}) {ans[1]}' for ans in questions])
+            questions.sort(key=lambda x: x[0])
+            questions += ('D', "None of the above"),
+            question_text = QUESTION_TEXT
+            question_text += '\n'.join([f'{ans[0]}) {ans[1]}' for ans in questions])
         
-        # Find which positions contain incorrect answers
-        incorrect_internal_pos = next(pos for ans_type, pos in zip(best_arrangement, abc) if ans_type == 'incorrect_internal')
-        incorrect_external_pos = next(pos for ans_type, pos in zip(best_arrangement, abc) if ans_type == 'incorrect_external')
+            # Find which positions contain incorrect answers
+            incorrect_internal_pos = next(pos for ans_type, pos in zip(best_arrangement, abc) if ans_type == 'incorrect_internal')
+            incorrect_external_pos = next(pos for ans_type, pos in zip(best_arrangement, abc) if ans_type == 'incorrect_external')
 
-        image_bn = os.path.basename(image)
-        assert image_bn in image_labels_dict, f"Image {image_bn} not found in image_labels_dict"
-        task_data.append({
-            'question': question_text,
-            'answer_target': correct,
-            'candidate_answers': [q[1] for q in questions],
-            'incorrect_internal_answer': incorrect_internal_pos,
-            'incorrect_external_answer': incorrect_external_pos,
-            'noneoftheabove_answer': 'D',
-            'superset_correct_answers': result['Ideology'],
-            'image_path': image,
-            'source_info': image,
-            'locations': result['Location'],
-            'symbol_title': result['title'],
-            'image_labels': image_labels_dict.get(image_bn)
-        })
+            image_bn = os.path.basename(image)
+            assert image_bn in image_labels_dict, f"Image {image_bn} not found in image_labels_dict"
+            task_data.append({
+                'question': question_text,
+                'answer_target': correct,
+                'candidate_answers': [q[1] for q in questions],
+                'incorrect_internal_answer': incorrect_internal_pos,
+                'incorrect_external_answer': incorrect_external_pos,
+                'noneoftheabove_answer': 'D',
+                'superset_correct_answers': result['Ideology'],
+                'image_path': image,
+                'source_info': image,
+                'locations': result['Location'],
+                'symbol_title': result['title'],
+                'image_labels': image_labels_dict.get(image_bn)
+            })
+    if num_duplicates_skipped:
+        print(f"Skipped {num_duplicates_skipped} near-duplicate images")
+    return task_data, position_counts
 
-import pandas as pd
-print("\nABC distribution for correct answers:", pd.DataFrame([d['answer_target'] for d in task_data]).value_counts())
-print("\nPosition counts for each answer type:")
-for ans_type, counts in position_counts.items():
-    print(f"{ans_type}:", counts)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--results_path", type=str, default="results_with_images_std.json")
+    parser.add_argument("--assets_dir", type=str, default="assets")
+    parser.add_argument("--output_path", type=str, default="task_data.json")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with open(args.results_path, "r") as f:
+        results = json.load(f)
+    _, external_ideologies = load_ideologies(args.assets_dir)
+    image_labels_dict = LabelIndex.from_json(os.path.join(args.assets_dir, 'image_labels.json'))
+
+    task_data, position_counts = generate_task_data(results, external_ideologies, image_labels_dict, seed=args.seed)
+
+    print("\nABC distribution for correct answers:", pd.DataFrame([d['answer_target'] for d in task_data]).value_counts())
+    print("\nPosition counts for each answer type:")
+    for ans_type, counts in position_counts.items():
+        print(f"{ans_type}:", counts)
 
-fn = "task_data.json"
-with open(fn, "w") as f:
-    json.dump(task_data, f, indent=4)
-print(f"\nWrote {fn}")
+    with open(args.output_path, "w") as f:
+        json.dump(task_data, f, indent=4)
+    print(f"\nWrote {args.output_path}")
@@ -0,0 +1,259 @@
+"""
+Perceptual-hash index for finding duplicate and near-duplicate images.
+
+Each image is reduced to a 64-bit perceptual hash (pHash or dHash). Hashes of visually
+similar images differ in only a few bits, so near-duplicates are found by Hamming distance.
+Lookups go through a BK-tree, which prunes most of the index for small distances and keeps
+queries sub-linear on large corpora (100k+ images).
+
+Usage:
+python3 image_dedup.py --images_dir images_std --max_distance 6
+# Outputs: image_hashes.json (hash index) and image_duplicates.json (duplicate groups)
+"""
+
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp', '.gif', '.bmp')
+DEFAULT_MAX_DISTANCE = 6
+
+
+def _dct_matrix(n):
+    """Orthonormal DCT-II basis, so that dct(x) == M @ x."""
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    m = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    m[0, :] = np.sqrt(1.0 / n)
+    return m
+
+_DCT_32 = _dct_matrix(32)
+
+
+def _bits_to_int(bits):
+    value = 0
+    for bit in bits.ravel():
+        value = (value << 1) | int(bit)
+    return value
+
+
+def _load_grayscale(im_path, size):
+    img = Image.open(im_path)
+    # Let JPEG decoders downscale during decode; a large speedup for big photos
+    img.draft('L', (size[0] * 2, size[1] * 2))
+    if img.mode in ('RGBA', 'LA', 'P'):
+        img = img.convert('RGBA')
+        background = Image.new('RGBA', img.size, (255, 255, 255, 255))
+        img = Image.alpha_composite(background, img)
+    return img.convert('L').resize(size, Image.Resampling.LANCZOS)
+
+
+def dhash(im_path):
+    """Difference hash: compares horizontally adjacent pixels of a 9x8 thumbnail."""
+    pixels = np.asarray(_load_grayscale(im_path, (9, 8)), dtype=np.int16)
+    return _bits_to_int(pixels[:, 1:] > pixels[:, :-1])
+
+
+def phash(im_path):
+    """DCT hash: thresholds the low-frequency 8x8 DCT coefficients of a 32x32 thumbnail at their median."""
+    pixels = np.asarray(_load_grayscale(im_path, (32, 32)), dtype=np.float64)
+    dct = _DCT_32 @ pixels @ _DCT_32.T
+    low = dct[:8, :8].ravel()
+    return _bits_to_int(low > np.median(low))
+
+HASH_FUNCTIONS = {'phash': phash, 'dhash': dhash}
+
+
+def hamming_distance(a, b):
+    return (a ^ b).bit_count()
+
+
+class BKTree:
+    """
+    BK-tree over 64-bit hashes with Hamming distance.
+    Items that share an identical hash are stored on the same node.
+    """
+
+    def __init__(self):
+        self.root = None
+        self.size = 0
+
+    def add(self, hash_value, item):
+        self.size += 1
+        if self.root is None:
+            self.root = [hash_value, [item], {}]
+            return
+        node = self.root
+        while True:
+            dist = hamming_distance(hash_value, node[0])
+            if dist == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(dist)
+            if child is None:
+                node[2][dist] = [hash_value, [item], {}]
+                return
+            node = child
+
+    def query(self, hash_value, max_distance):
+        """Return (distance, item) pairs for all items within max_distance of hash_value."""
+        matches = []
+        if self.root is None:
+            return matches
+        stack = [self.root]
+        while stack:
+            node_hash, items, children = stack.pop()
+            dist = hamming_distance(hash_value, node_hash)
+            if dist <= max_distance:
+                matches.extend((dist, item) for item in items)
+            # Triangle inequality: only children at distance within [dist - d, dist + d] can match
+            for child_dist, child in children.items():
+                if dist - max_distance <= child_dist <= dist + max_distance:
+                    stack.append(child)
+        matches.sort(key=lambda m: m[0])
+        return matches
+
+    def __len__(self):
+        return self.size
+
+
+def _hash_file(args):
+    im_path, method = args
+    try:
+        return im_path, HASH_FUNCTIONS[method](im_path), None
+    except Exception as e:
+        return im_path, None, str(e)
+
+
+def list_images(images_dir):
+    return sorted(
+        entry.path for entry in os.scandir(images_dir)
+        if entry.is_file() and entry.name.lower().endswith(IMAGE_EXTENSIONS)
+    )
+
+
+def compute_hashes(image_paths, method='phash', cache=None, num_workers=None, verbose=False):
+    """
+    Hash all images, reusing entries from cache whose file size and mtime are unchanged.
+    cache maps image path -> {'hash': hex, 'size': int, 'mtime_ns': int, 'method': str}.
+    Returns a new cache dict covering exactly image_paths.
+    """
+    cache = cache or {}
+    hashes = {}
+    to_hash = []
+    for im_path in image_paths:
+        st = os.stat(im_path)
+        entry = cache.get(im_path)
+        if (entry and entry.get('method') == method
+                and entry.get('size') == st.st_size and entry.get('mtime_ns') == st.st_mtime_ns):
+            hashes[im_path] = entry
+        else:
+            to_hash.append(im_path)
+
+    if to_hash:
+        chunksize = max(1, len(to_hash) // ((num_workers or os.cpu_count() or 1) * 8))
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            for im_path, value, error in executor.map(_hash_file, [(p, method) for p in to_hash], chunksize=chunksize):
+                if error is not None:
+                    print(f"Error hashing {im_path}: {error}")
+                    continue
+                st = os.stat(im_path)
+                hashes[im_path] = {
+                    'hash': f"{value:016x}",
+                    'size': st.st_size,
+                    'mtime_ns': st.st_mtime_ns,
+                    'method': method,
+                }
+    if verbose:
+        print(f"Hashed {len(to_hash)} images ({len(image_paths) - len(to_hash)} reused from cache)")
+    return {p: hashes[p] for p in image_paths if p in hashes}
+
+
+def build_index(hashes):
+    """Build a BK-tree from a path -> cache-entry (or int hash) mapping."""
+    tree = BKTree()
+    for im_path, entry in hashes.items():
+        tree.add(_as_int(entry), im_path)
+    return tree
+
+
+def _as_int(entry):
+    if isinstance(entry, int):
+        return entry
+    if isinstance(entry, dict):
+        entry = entry['hash']
+    return int(entry, 16)
+
+
+def find_duplicate_groups(hashes, max_distance=DEFAULT_MAX_DISTANCE, tree=None):
+    """
+    Group images whose hashes are within max_distance of each other (transitively).
+    The first image of each group, in the iteration order of hashes, is its canonical image.
+    Returns a list of groups (lists of paths) with more than one member.
+    """
+    order = list(hashes)
+    position = {p: i for i, p in enumerate(order)}
+    parent = list(range(len(order)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    tree = tree or build_index(hashes)
+    for im_path in order:
+        i = position[im_path]
+        for _, other in tree.query(_as_int(hashes[im_path]), max_distance):
+            ri, rj = find(i), find(position[other])
+            if ri != rj:
+                # Keep the earliest image as the root so it becomes the canonical one
+                parent[max(ri, rj)] = min(ri, rj)
+
+    groups = {}
+    for i, im_path in enumerate(order):
+        groups.setdefault(find(i), []).append(im_path)
+    return [group for _, group in sorted(groups.items()) if len(group) > 1]
+
+
+def duplicate_map(groups):
+    """Map every non-canonical image to the canonical (first) image of its group."""
+    return {dup: group[0] for group in groups for dup in group[1:]}
+
+
+def load_hash_index(index_path):
+    if not os.path.exists(index_path):
+        return {}
+    with open(index_path, 'r') as f:
+        return json.load(f)
+
+
+def save_hash_index(hashes, index_path):
+    with open(index_path, 'w') as f:
+        json.dump(hashes, f, indent=4)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--images_dir", type=str, default="images_std")
+    parser.add_argument("--index_path", type=str, default="image_hashes.json")
+    parser.add_argument("--duplicates_path", type=str, default="image_duplicates.json")
+    parser.add_argument("--method", type=str, choices=list(HASH_FUNCTIONS), default="phash")
+    parser.add_argument("--max_distance", type=int, default=DEFAULT_MAX_DISTANCE)
+    parser.add_argument("--num_workers", type=int, default=None)
+    args = parser.parse_args()
+
+    image_paths = list_images(args.images_dir)
+    hashes = compute_hashes(image_paths, method=args.method, cache=load_hash_index(args.index_path),
+                            num_workers=args.num_workers, verbose=True)
+    save_hash_index(hashes, args.index_path)
+
+    groups = find_duplicate_groups(hashes, max_distance=args.max_distance)
+    with open(args.duplicates_path, 'w') as f:
+        json.dump(groups, f, indent=4)
+    print(f"Found {len(groups)} duplicate groups covering {sum(len(g) for g in groups)} of {len(hashes)} images")
+    print(f"Wrote {args.index_path} and {args.duplicates_path}")
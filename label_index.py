@@ -0,0 +1,140 @@
+"""
+Set-based inverted index of image labels (label -> files and file -> labels).
+
+Labels come from the LABELS/ directory, where each subdirectory is a label and holds copies of
+the images carrying that label. The index is built with a single os.scandir pass per label
+directory, and sync() only rescans label directories whose mtime changed since the stored
+snapshot (adding or removing a file updates its directory's mtime).
+
+It can also be loaded from assets/image_labels.json, which is how generate_questions.py and
+the analysis scripts query labels.
+"""
+
+import os
+import json
+
+EXCLUDED_LABELS = ('other',)
+
+
+class LabelIndex:
+    def __init__(self):
+        self.label_to_files = {}
+        self.file_to_labels = {}
+
+    def add(self, file, label):
+        self.label_to_files.setdefault(label, set()).add(file)
+        self.file_to_labels.setdefault(file, set()).add(label)
+
+    def _set_label_files(self, label, files):
+        """Replace the files of one label, keeping file_to_labels consistent."""
+        for file in self.label_to_files.pop(label, set()) - set(files):
+            labels = self.file_to_labels[file]
+            labels.discard(label)
+            if not labels:
+                del self.file_to_labels[file]
+        for file in files:
+            self.add(file, label)
+        if not files:
+            self.label_to_files.pop(label, None)
+
+    @classmethod
+    def from_dict(cls, image_labels):
+        """Build from a file -> [labels] mapping (the format of assets/image_labels.json)."""
+        index = cls()
+        for file, labels in image_labels.items():
+            index.file_to_labels.setdefault(file, set())
+            for label in labels:
+                index.add(file, label)
+        return index
+
+    @classmethod
+    def from_json(cls, path=os.path.join('assets', 'image_labels.json')):
+        with open(path, 'r') as f:
+            return cls.from_dict(json.load(f))
+
+    @classmethod
+    def build(cls, labels_dir='LABELS'):
+        index = cls()
+        index.sync(labels_dir)
+        return index
+
+    def sync(self, labels_dir='LABELS', snapshot_path=None):
+        """
+        Bring the index up to date with labels_dir. With a snapshot, only label directories whose
+        mtime changed are rescanned; the snapshot is rewritten afterwards.
+        Returns the names of the rescanned labels.
+        """
+        snapshot = {}
+        if snapshot_path and os.path.exists(snapshot_path):
+            with open(snapshot_path, 'r') as f:
+                snapshot = json.load(f)
+            for label, entry in snapshot.items():
+                if label not in self.label_to_files:
+                    self._set_label_files(label, entry['files'])
+
+        new_snapshot = {}
+        rescanned = []
+        with os.scandir(labels_dir) as entries:
+            label_dirs = sorted((e for e in entries if e.is_dir()), key=lambda e: e.name)
+        for entry in label_dirs:
+            mtime_ns = entry.stat().st_mtime_ns
+            previous = snapshot.get(entry.name)
+            if previous and previous['mtime_ns'] == mtime_ns:
+                files = previous['files']
+            else:
+                with os.scandir(entry.path) as label_entries:
+                    files = sorted(e.name for e in label_entries if e.is_file())
+                self._set_label_files(entry.name, files)
+                rescanned.append(entry.name)
+            new_snapshot[entry.name] = {'mtime_ns': mtime_ns, 'files': files}
+
+        for label in set(self.label_to_files) - set(new_snapshot):
+            self._set_label_files(label, [])
+
+        if snapshot_path:
+            with open(snapshot_path, 'w') as f:
+                json.dump(new_snapshot, f)
+        return rescanned
+
+    def labels(self):
+        return sorted(self.label_to_files)
+
+    def files(self):
+        return sorted(self.file_to_labels)
+
+    def labels_of(self, file, exclude=()):
+        return sorted(self.file_to_labels.get(file, set()) - set(exclude))
+
+    def files_with(self, label):
+        return self.label_to_files.get(label, set())
+
+    def files_with_all(self, labels):
+        sets = sorted((self.files_with(label) for label in labels), key=len)
+        return set.intersection(*sets) if sets else set()
+
+    def files_with_any(self, labels):
+        return set().union(*(self.files_with(label) for label in labels))
+
+    def label_counts(self):
+        return {label: len(files) for label, files in sorted(self.label_to_files.items())}
+
+    def files_with_only(self, labels):
+        """Files whose labels are all within the given labels (e.g. only 'other')."""
+        labels = set(labels)
+        return {file for file, file_labels in self.file_to_labels.items() if file_labels and file_labels <= labels}
+
+    def to_dict(self, exclude=EXCLUDED_LABELS):
+        """file -> sorted labels, the format of assets/image_labels.json."""
+        return {file: self.labels_of(file, exclude) for file in self.files()}
+
+    # Mapping-style access so the index can stand in for the image_labels dict
+    def __contains__(self, file):
+        return file in self.file_to_labels
+
+    def get(self, file, default=None):
+        if file not in self.file_to_labels:
+            return default
+        return self.labels_of(file)
+
+    def __len__(self):
+        return len(self.file_to_labels)
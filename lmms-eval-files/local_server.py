@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+
+"""
+Local OpenAI-compatible chat completions server for offline evaluation runs.
+
+Serves a small CPU model (by default a deterministic stub) behind /v1/chat/completions so the
+openai_compatible lmms-eval backend can run without network access. Concurrent requests are
+grouped into batches of up to --batch_size before being passed to the model, and throughput
+and latency are reported at /metrics.
+
+lmms_eval's openai_compatible backend sends one request at a time, so evaluation runs use the
+openai_concurrent backend (mmbeliefs_models plugin), which keeps several requests in flight.
+
+# Serve the stub model
+python3 local_server.py --port 8000 --model hash --batch_size 8
+
+# Benchmark the server with concurrent requests built from task data
+python3 local_server.py --bench task_data.json --concurrency 8
+"""
+
+import re
+import json
+import time
+import base64
+import hashlib
+import argparse
+import threading
+import queue
+import urllib.request
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DATA_URL_RE = re.compile(r'^data:[^;]+;base64,')
+
+
+def parse_messages(messages):
+    """Split OpenAI chat messages into the prompt text and a list of raw image bytes."""
+    texts, images = [], []
+    for message in messages:
+        content = message.get('content')
+        if isinstance(content, str):
+            texts.append(content)
+            continue
+        for part in content or []:
+            if part.get('type') == 'text':
+                texts.append(part['text'])
+            elif part.get('type') == 'image_url':
+                url = part['image_url']['url'] if isinstance(part['image_url'], dict) else part['image_url']
+                if DATA_URL_RE.match(url):
+                    images.append(base64.b64decode(DATA_URL_RE.sub('', url, count=1)))
+                else:
+                    images.append(url.encode())
+    return '\n'.join(texts), images
+
+
+def hash_model(batch):
+    """
+    Deterministic stub: answers A-D from a hash of the prompt and images.
+    Gives reproducible, roughly chance-level accuracy for exercising the scoring pipeline.
+    """
+    outputs = []
+    for prompt, images in batch:
+        h = hashlib.sha256(prompt.encode())
+        for image in images:
+            h.update(image)
+        outputs.append('ABCD'[h.digest()[0] % 4])
+    return outputs
+
+
+def constant_model(batch):
+    """Stub that always answers 'A'."""
+    return ['A'] * len(batch)
+
+# Batched models: take a list of (prompt, [image bytes]) and return one completion string per entry
+MODELS = {
+    'hash': hash_model,
+    'constant': constant_model,
+}
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, int(round(q / 100 * (len(values) - 1)))))
+    return values[index]
+
+
+class Batcher:
+    """
+    Collects requests from handler threads into batches of up to batch_size, waiting at most
+    max_wait_ms for a batch to fill, and runs the model on one batch at a time.
+    """
+
+    def __init__(self, model_fn, batch_size=8, max_wait_ms=10):
+        self.model_fn = model_fn
+        self.batch_size = batch_size
+        self.max_wait_s = max_wait_ms / 1000
+        self.requests = queue.Queue()
+        self.lock = threading.Lock()
+        self.num_requests = 0
+        self.num_batches = 0
+        self.busy_s = 0.0
+        self.latencies_s = []
+        self.started_at = time.time()
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+    def submit(self, prompt, images):
+        future = Future()
+        self.requests.put((time.time(), prompt, images, future))
+        return future
+
+    def _loop(self):
+        while True:
+            batch = [self.requests.get()]
+            deadline = time.time() + self.max_wait_s
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self.requests.get(timeout=timeout))
+                except queue.Empty:
+                    break
+
+            start = time.time()
+            try:
+                outputs = self.model_fn([(prompt, images) for _, prompt, images, _ in batch])
+                error = None
+                if len(outputs) != len(batch):
+                    # Outputs cannot be matched to requests, so no caller gets one
+                    raise RuntimeError(f"Model returned {len(outputs)} outputs for a batch of {len(batch)}")
+            except Exception as e:
+                outputs, error = [None] * len(batch), e
+            end = time.time()
+
+            with self.lock:
+                self.num_requests += len(batch)
+                self.num_batches += 1
+                self.busy_s += end - start
+                self.latencies_s.extend(end - submitted for submitted, _, _, _ in batch)
+            for (_, _, _, future), output in zip(batch, outputs):
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(output)
+
+    def metrics(self):
+        with self.lock:
+            elapsed = time.time() - self.started_at
+            return {
+                'num_requests': self.num_requests,
+                'num_batches': self.num_batches,
+                'batch_size': self.batch_size,
+                'mean_batch_size': self.num_requests / self.num_batches if self.num_batches else 0.0,
+                'model_busy_s': self.busy_s,
+                'uptime_s': elapsed,
+                'requests_per_s': self.num_requests / elapsed if elapsed else 0.0,
+                'model_requests_per_s': self.num_requests / self.busy_s if self.busy_s else 0.0,
+                'latency_p50_s': percentile(self.latencies_s, 50),
+                'latency_p95_s': percentile(self.latencies_s, 95),
+            }
+
+
+def make_handler(batcher, model_name):
+    class Handler(BaseHTTPRequestHandler):
+        def _send_json(self, status, obj):
+            body = json.dumps(obj).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path.rstrip('/') in ('/metrics', '/v1/metrics'):
+                self._send_json(200, batcher.metrics())
+            elif self.path.rstrip('/') in ('/health', '/v1/models'):
+                self._send_json(200, {'object': 'list', 'data': [{'id': model_name, 'object': 'model'}]})
+            else:
+                self._send_json(404, {'error': {'message': f"Unknown path {self.path}"}})
+
+        def do_POST(self):
+            if self.path.rstrip('/') not in ('/chat/completions', '/v1/chat/completions'):
+                self._send_json(404, {'error': {'message': f"Unknown path {self.path}"}})
+                return
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                prompt, images = parse_messages(request.get('messages', []))
+            except Exception as e:
+                self._send_json(400, {'error': {'message': f"Invalid request: {e}"}})
+                return
+            try:
+                content = batcher.submit(prompt, images).result()
+            except Exception as e:
+                self._send_json(500, {'error': {'message': str(e)}})
+                return
+            prompt_tokens = len(prompt.split())
+            completion_tokens = len(content.split())
+            self._send_json(200, {
+                'id': f"chatcmpl-{hashlib.md5((prompt + content).encode()).hexdigest()}",
+                'object': 'chat.completion',
+                'created': int(time.time()),
+                'model': request.get('model', model_name),
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content},
+                             'finish_reason': 'stop'}],
+                'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                          'total_tokens': prompt_tokens + completion_tokens},
+            })
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def make_server(host='127.0.0.1', port=8000, model='hash', batch_size=8, max_wait_ms=10):
+    batcher = Batcher(MODELS[model], batch_size=batch_size, max_wait_ms=max_wait_ms)
+    server = ThreadingHTTPServer((host, port), make_handler(batcher, model))
+    server.daemon_threads = True
+    server.batcher = batcher
+    return server
+
+
+def benchmark(api_base, task_data_path, concurrency=8, limit=None):
+    """Send every task as a chat request with its image, concurrency at a time, and report throughput."""
+    with open(task_data_path, 'r') as f:
+        task_data = json.load(f)
+    if limit:
+        task_data = task_data[:limit]
+
+    def send(task):
+        with open(task['image_path'], 'rb') as f:
+            image_b64 = base64.b64encode(f.read()).decode()
+        payload = {'model': 'local', 'messages': [{'role': 'user', 'content': [
+            {'type': 'text', 'text': task['question']},
+            {'type': 'image_url', 'image_url': {'url': f"data:image/png;base64,{image_b64}"}},
+        ]}]}
+        request = urllib.request.Request(f"{api_base.rstrip('/')}/chat/completions", data=json.dumps(payload).encode(),
+                                         headers={'Content-Type': 'application/json'})
+        start = time.time()
+        with urllib.request.urlopen(request) as response:
+            json.load(response)
+        return time.time() - start
+
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(send, task_data))
+    elapsed = time.time() - start
+    return {
+        'num_requests': len(latencies),
+        'concurrency': concurrency,
+        'elapsed_s': elapsed,
+        'requests_per_s': len(latencies) / elapsed if elapsed else 0.0,
+        'latency_p50_s': percentile(latencies, 50),
+        'latency_p95_s': percentile(latencies, 95),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local OpenAI-compatible server for offline evaluation')
+    parser.add_argument('--host', type=str, default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--model', type=str, choices=list(MODELS), default='hash')
+    parser.add_argument('--batch_size', type=int, default=8)
+    parser.add_argument('--max_wait_ms', type=int, default=10)
+    parser.add_argument('--bench', type=str, default=None, help='Benchmark a running server using this task data file')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--limit', type=int, default=None)
+    args = parser.parse_args()
+
+    if args.bench:
+        api_base = f"http://{args.host}:{args.port}/v1"
+        print(json.dumps(benchmark(api_base, args.bench, args.concurrency, args.limit), indent=4))
+        with urllib.request.urlopen(f"{api_base}/metrics") as response:
+            print(json.dumps(json.load(response), indent=4))
+        return
+
+    server = make_server(args.host, args.port, args.model, args.batch_size, args.max_wait_ms)
+    print(f"Serving {args.model} on http://{args.host}:{args.port}/v1 (batch_size={args.batch_size})", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
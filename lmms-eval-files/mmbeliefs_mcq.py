@@ -9,83 +9,163 @@ python3 mmbeliefs_mcq.py --models mistral claude
 
 # Run a single model
 python3 mmbeliefs_mcq.py --models gpt4
+
+# Run the offline local stub model (no network or API keys needed for the model)
+python3 mmbeliefs_mcq.py --models local-stub
+
+# Evaluate on the dataset saved by create_hfdataset.py --save_to_disk instead of the Hub copy
+python3 mmbeliefs_mcq.py --models local-stub --local_dataset
+
+# Compare latency, retries, tokens and cost of all recorded runs
+python3 telemetry_proxy.py --report ./mmbeliefs_mcq_results
 """
 
 import os
+import sys
+import json
+import time
 import argparse
 import logging
+import subprocess
+import re
+import glob
+import hashlib
+import datetime
+import urllib.request
 from typing import List, Dict
 
+import telemetry_proxy
+
+def find_repo_root(start=os.path.dirname(os.path.abspath(__file__))):
+    """Nearest directory at or above start holding profiling.py (this file may be copied into lmms-eval)."""
+    path = start
+    while not os.path.exists(os.path.join(path, 'profiling.py')):
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None
+        path = parent
+    return path
+
+REPO_ROOT = find_repo_root()
+if REPO_ROOT is not None and REPO_ROOT not in sys.path:
+    sys.path.append(REPO_ROOT)
+
+try:
+    # profiling.py from the repository root; spans are no-ops when the runner is copied outside of it
+    from profiling import span
+except ImportError:
+    from contextlib import nullcontext as _nullcontext
+    def span(name, **attrs):
+        return _nullcontext()
+
+LOCAL_SERVER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'local_server.py')
+# dataset_path of the mmbeliefs_mcq_val_local task, relative to the working directory
+LOCAL_DATASET_PATH = 'mmbeliefs_mcq_local'
+HUB_TASK = 'mmbeliefs_mcq'
+LOCAL_TASK = 'mmbeliefs_mcq_val_local'
+TEMPLATE_YAML = os.path.join('mmbeliefs_mcq', '_default_template_mmbeliefs_yaml')
+FINGERPRINT_FILENAME = 'dataset_fingerprint.json'
+# Directory the gemini_telemetry backend records requests.jsonl in
+TELEMETRY_DIR_ENV = 'MMBELIEFS_TELEMETRY_DIR'
+# lmms_eval backends that send OpenAI chat requests to OPENAI_API_BASE
+OPENAI_BACKENDS = ('openai_compatible', 'openai_concurrent')
+# Backends from the mmbeliefs_models plugin next to this file
+PLUGIN_PACKAGE = 'mmbeliefs_models'
+PLUGIN_BACKENDS = ('openai_concurrent', 'gemini_telemetry')
+# SDK backends that bypass the telemetry proxy -> plugin backend recording their calls
+SDK_TELEMETRY_BACKENDS = {'gemini_api': 'gemini_telemetry'}
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 
-# Define model configurations
+# Define model configurations. price_per_1m_* are the providers' list prices in USD per million tokens
+# (text prompts up to 200k tokens, as of June 2025), used for the cost in telemetry metrics; update them
+# when providers change pricing.
 MODEL_CONFIGS = {
     'mistral-small-3.1': {
         'lmms_model':"openai_compatible",
         'api_base': "https://router.huggingface.co/nebius/v1",
         'model_version': "mistralai/Mistral-Small-3.1-24B-Instruct-2503",
         'api_key_env': 'HF_TOKEN',
-        'output_dir': "mistral-small-3.1-24b-instruct-2503_api"
+        'output_dir': "mistral-small-3.1-24b-instruct-2503_api",
+        'price_per_1m_input_tokens': 0.10,
+        'price_per_1m_output_tokens': 0.30
     },
     'gemini-2.5-pro': {
         'lmms_model':"gemini_api",
         'api_base': "https://generativelanguage.googleapis.com/v1beta/openai/",
         'model_version': "gemini-2.5-pro-preview-03-25",
         'api_key_env': 'GOOGLE_API_KEY',
-        'output_dir': "gemini-2.5-pro_api"
+        'output_dir': "gemini-2.5-pro_api",
+        'price_per_1m_input_tokens': 1.25,
+        'price_per_1m_output_tokens': 10.00
     },
     'gemini-2.5-flash': {
         'lmms_model':"gemini_api",
         'api_base': "https://generativelanguage.googleapis.com/v1beta/openai/",
         'model_version': "gemini-2.5-flash-preview-05-20",
         'api_key_env': 'GOOGLE_API_KEY',
-        'output_dir': "gemini-2.5-flash_api"
+        'output_dir': "gemini-2.5-flash_api",
+        'price_per_1m_input_tokens': 0.15,
+        # Thinking output price; thinking is on by default
+        'price_per_1m_output_tokens': 3.50
     },
     'gemini-2.0-flash': {
         'lmms_model':"gemini_api",
         'api_base': "https://generativelanguage.googleapis.com/v1beta/openai/",
         'model_version': "gemini-2.0-flash",
         'api_key_env': 'GOOGLE_API_KEY',
-        'output_dir': "gemini-2.0-flash_api"
+        'output_dir': "gemini-2.0-flash_api",
+        'price_per_1m_input_tokens': 0.10,
+        'price_per_1m_output_tokens': 0.40
     },
     'claude-opus-4': {
         'lmms_model':"openai_compatible",
         'api_base': "https://api.anthropic.com/v1/",
         'model_version': "claude-opus-4-20250514",
         'api_key_env': 'ANTHROPIC_API_KEY',
-        'output_dir': "claude-opus-4-20250514_api"
+        'output_dir': "claude-opus-4-20250514_api",
+        'price_per_1m_input_tokens': 15.00,
+        'price_per_1m_output_tokens': 75.00
     },
     'claude-3.7-sonnet': {
         'lmms_model':"openai_compatible",
         'api_base': "https://api.anthropic.com/v1/",
         'model_version': "claude-3-7-sonnet-20250219",
         'api_key_env': 'ANTHROPIC_API_KEY',
-        'output_dir': "claude-3-7-sonnet-20250219_api"
+        'output_dir': "claude-3-7-sonnet-20250219_api",
+        'price_per_1m_input_tokens': 3.00,
+        'price_per_1m_output_tokens': 15.00
     },
     'llama-4-maverick': {
         'lmms_model':"openai_compatible",
         'api_base': "https://api.groq.com/openai/v1",
         'model_version': "meta-llama/llama-4-maverick-17b-128e-instruct",
         'api_key_env': 'GROQ_API_KEY',
-        'output_dir': "llama4_maverick_17b_128e_instruct_api"
+        'output_dir': "llama4_maverick_17b_128e_instruct_api",
+        'price_per_1m_input_tokens': 0.20,
+        'price_per_1m_output_tokens': 0.60
     },
     'llama-4-scout': {
         'lmms_model':"openai_compatible",
         'api_base': "https://router.huggingface.co/together/v1",
         'model_version': "meta-llama/Llama-4-Scout-17B-16E-Instruct",
         'api_key_env': 'HF_TOKEN',
-        'output_dir': "llama4_scout_17b_16e_instruct_api"
+        'output_dir': "llama4_scout_17b_16e_instruct_api",
+        'price_per_1m_input_tokens': 0.18,
+        'price_per_1m_output_tokens': 0.59
     },
     'qwen-2.5-vl': {
         'lmms_model':"openai_compatible",
         'api_base': "https://router.huggingface.co/hyperbolic/v1",
         'model_version': "Qwen/Qwen2.5-VL-7B-Instruct",
         'api_key_env': 'HF_TOKEN',
-        'output_dir': "qwen2_5_vl_7b_api"
+        'output_dir': "qwen2_5_vl_7b_api",
+        'price_per_1m_input_tokens': 0.20,
+        'price_per_1m_output_tokens': 0.20
     },
     'gpt-4o': {
         'lmms_model':"openai_compatible",
@@ -93,72 +173,354 @@ MODEL_CONFIGS = {
         'model_version': "gpt-4o-2024-11-20",
         'api_key_env': 'OPENAI_API_KEY',
         'output_dir': "gpt-4o-2024-11-20",
-        'extra_args': 'azure_openai=False'
+        'extra_args': 'azure_openai=False',
+        'price_per_1m_input_tokens': 2.50,
+        'price_per_1m_output_tokens': 10.00
+    },
+    'local-stub': {
+        # openai_compatible with num_concurrent requests in flight, so the server can batch them
+        'lmms_model':"openai_concurrent",
+        'api_base': "http://127.0.0.1:8000/v1",
+        'model_version': "hash",
+        'api_key_env': None,
+        'output_dir': "local_stub",
+        'extra_args': 'num_concurrent=8',
+        'batch_size': 8,
+        'price_per_1m_input_tokens': 0.0,
+        'price_per_1m_output_tokens': 0.0,
+        # Started by the runner for the duration of the evaluation; see local_server.py
+        'local_server': {'port': 8000, 'model': 'hash', 'batch_size': 8}
     }
 }
 
-def check_required_env_vars():
-    """Check if required environment variables are set."""
-    required_vars = {'HF_TOKEN', 'OPENAI_API_KEY'}
-    missing_vars = [var for var in required_vars if not os.getenv(var)]
+def check_required_env_vars(models_to_run: List[str], local_dataset: bool = False):
+    """Check if the environment variables needed by the selected models (and the Hub dataset) are set."""
+    required_vars = set() if local_dataset else {'HF_TOKEN'}
+    for model_name in models_to_run:
+        if MODEL_CONFIGS[model_name]['api_key_env']:
+            required_vars.add(MODEL_CONFIGS[model_name]['api_key_env'])
+        if model_name.startswith('gpt'):
+            required_vars.add('OPENAI_API_KEY')
+    missing_vars = [var for var in sorted(required_vars) if not os.getenv(var)]
     if missing_vars:
         raise EnvironmentError(f"Missing required environment variables: {', '.join(missing_vars)}")
     
     # Backup the original OpenAI API key
-    os.environ['ORIGINAL_OPENAI_API_KEY'] = os.getenv('OPENAI_API_KEY')
+    os.environ['ORIGINAL_OPENAI_API_KEY'] = os.getenv('OPENAI_API_KEY', '')
+
+
+def start_local_server(server_config: Dict, timeout: float = 30.0):
+    """Start local_server.py in a subprocess and wait until it answers health checks."""
+    port = server_config.get('port', 8000)
+    cmd = [
+        sys.executable, LOCAL_SERVER_PATH,
+        '--port', str(port),
+        '--model', server_config.get('model', 'hash'),
+        '--batch_size', str(server_config.get('batch_size', 8)),
+    ]
+    logging.info(f"Starting local server: {' '.join(cmd)}")
+    proc = subprocess.Popen(cmd)
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"Local server exited with code {proc.returncode}")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1):
+                return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError(f"Local server did not start within {timeout}s")
+
+
+def stop_local_server(proc, server_config: Dict, metrics_path: str):
+    """Save the server's throughput metrics and shut it down."""
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server_config.get('port', 8000)}/metrics", timeout=5) as response:
+            metrics = json.load(response)
+        os.makedirs(os.path.dirname(metrics_path), exist_ok=True)
+        with open(metrics_path, 'w') as f:
+            json.dump(metrics, f, indent=4)
+        logging.info(f"Local server: {metrics['num_requests']} requests in {metrics['num_batches']} batches, "
+                     f"{metrics['model_requests_per_s']:.1f} requests/s of model time")
+    except OSError as e:
+        logging.warning(f"Could not fetch local server metrics: {e}")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def checkpoint_folder(config: Dict) -> str:
+    return f"./mmbeliefs_mcq_results/{config['output_dir']}/checkpoints"
+
+
+def checkpoint_path(config: Dict) -> str:
+    """
+    Per-sample response cache written by lmms_eval in continual mode (openai_compatible,
+    openai_concurrent and gemini_api): a JSON dict of "<task>___<split>___<doc_id>" -> response, saved after every sample.
+    """
+    return os.path.join(checkpoint_folder(config), f"{config['model_version']}_response.json")
+
+
+def prune_failed_responses(path: str):
+    """
+    Drop empty responses (what lmms_eval caches for a request that failed after its retries) so
+    the next run re-queries them. Returns (num_kept, num_pruned).
+    """
+    if not os.path.exists(path):
+        return 0, 0
+    with open(path, 'r') as f:
+        try:
+            responses = json.load(f)
+        except json.JSONDecodeError:
+            # Interrupted mid-write; the samples in it will be re-queried
+            logging.warning(f"Discarding unreadable checkpoint {path}")
+            responses = {}
+    kept = {k: v for k, v in responses.items() if isinstance(v, str) and v.strip()}
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(kept, f)
+    os.replace(tmp_path, path)
+    return len(kept), len(responses) - len(kept)
 
 
-def run_model_evaluation(model_name: str, config: Dict):
-    """Run evaluation for a specific model."""
+def hub_dataset_path() -> str:
+    """dataset_path of the task template, from the installed lmms_eval tasks or the copy next to this file."""
+    candidates = [os.path.join(os.path.dirname(os.path.abspath(__file__)), TEMPLATE_YAML)]
+    try:
+        import lmms_eval
+        candidates.insert(0, os.path.join(os.path.dirname(lmms_eval.__file__), 'tasks', TEMPLATE_YAML))
+    except ImportError:
+        pass
+    for path in candidates:
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                match = re.search(r'^dataset_path:\s*(\S+)', f.read(), re.MULTILINE)
+            if match:
+                return match.group(1)
+    raise FileNotFoundError(f"No {TEMPLATE_YAML} with a dataset_path in {', '.join(candidates)}")
+
+
+def dataset_fingerprint(task: str) -> str:
+    """
+    Identifies the dataset version a task evaluates: the content hash of the local Arrow files
+    for the local task, the current Hub revision otherwise.
+    """
+    if task == LOCAL_TASK:
+        h = hashlib.sha256()
+        for path in sorted(glob.glob(os.path.join(LOCAL_DATASET_PATH, '**', '*.arrow'), recursive=True)):
+            h.update(os.path.relpath(path, LOCAL_DATASET_PATH).encode())
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    h.update(chunk)
+        return f"local:{h.hexdigest()}"
+    from huggingface_hub import HfApi
+    repo_id = hub_dataset_path()
+    return f"hub:{repo_id}@{HfApi().dataset_info(repo_id).sha}"
+
+
+def check_checkpoint_fingerprint(config: Dict, task: str, fingerprint: str) -> bool:
+    """
+    Discard the model's cached responses if they were made on a different dataset version (or
+    task), then record the current one. Returns True if the cache was discarded.
+    """
+    folder = checkpoint_folder(config)
+    path = os.path.join(folder, FINGERPRINT_FILENAME)
+    current = {'task': task, 'fingerprint': fingerprint}
+    previous = None
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            previous = json.load(f)
+    cache_path = checkpoint_path(config)
+    discarded = previous != current and os.path.exists(cache_path)
+    if discarded:
+        logging.warning(f"Dataset changed since the checkpoint in {folder} was written "
+                        f"({previous['fingerprint'] if previous else 'unknown version'} -> {fingerprint}); "
+                        f"discarding its cached responses")
+        os.remove(cache_path)
+    os.makedirs(folder, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(current, f, indent=4)
+    return discarded
+
+
+def telemetry_run_dir(config: Dict, run: str) -> str:
+    return f"./mmbeliefs_mcq_results/{config['output_dir']}/telemetry/{run}"
+
+
+def run_model_evaluation(model_name: str, config: Dict, checkpoint: bool = True, max_attempts: int = 3,
+                         retry_wait_s: float = 30.0, telemetry: bool = True, task: str = HUB_TASK,
+                         fingerprint: str = None) -> bool:
+    """
+    Run evaluation for a specific model.
+
+    With checkpointing, every response is cached under the model's output_dir as it arrives. If
+    lmms_eval fails or some samples failed, it is re-run (up to max_attempts) and only the missing
+    or failed samples are queried again; the final run scores all samples from the cache.
+    The cache is discarded if fingerprint (see dataset_fingerprint) differs from the one it was made with.
+
+    With telemetry, requests of OpenAI-compatible backends go through telemetry_proxy.py, and
+    gemini_api models run as gemini_telemetry, which records their SDK calls the same way. The run's
+    latency, retry, token and cost metrics are written to telemetry/<run>/metrics.json.
+    """
     logging.info(f"Starting evaluation for {model_name}")
     
     # For GPT-4, use the original API key, for others use their specific API keys
     if model_name.startswith('gpt'):
         os.environ['OPENAI_API_KEY'] = os.environ['ORIGINAL_OPENAI_API_KEY']
+    elif config['api_key_env'] is None:
+        os.environ['OPENAI_API_KEY'] = 'EMPTY'  # Local servers do not check the key
     else:
         os.environ['OPENAI_API_KEY'] = os.getenv(config['api_key_env'])
     
     os.environ['OPENAI_API_BASE'] = config['api_base']
+    # Image column served to the model; the dataset must be built with create_hfdataset.py --resolutions
+    if config.get('image_resolution'):
+        os.environ['MMBELIEFS_IMAGE_RESOLUTION'] = config['image_resolution']
+    else:
+        os.environ.pop('MMBELIEFS_IMAGE_RESOLUTION', None)
     
     # Construct command
     extra_args = f",{config.get('extra_args', '')}" if config.get('extra_args') else ''
+    if checkpoint:
+        cache_path = checkpoint_path(config)
+        # model_version may contain '/', which lmms_eval treats as a subdirectory of the folder
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        if fingerprint is not None:
+            check_checkpoint_fingerprint(config, task, fingerprint)
+        extra_args += f",continual_mode=True,response_persistent_folder={checkpoint_folder(config)}"
+
+    server = start_local_server(config['local_server']) if config.get('local_server') else None
+    lmms_model = config['lmms_model']
+    proxy = run_dir = None
+    if telemetry and (lmms_model in OPENAI_BACKENDS or lmms_model in SDK_TELEMETRY_BACKENDS):
+        run = datetime.datetime.now().strftime('%Y-%m-%d-%H-%M-%S')
+        run_dir = telemetry_run_dir(config, run)
+        if lmms_model in OPENAI_BACKENDS:
+            proxy = telemetry_proxy.start_proxy(config['api_base'], run_dir)
+            os.environ['OPENAI_API_BASE'] = f"http://127.0.0.1:{proxy.server_port}"
+        else:
+            lmms_model = SDK_TELEMETRY_BACKENDS[lmms_model]
+            os.makedirs(run_dir, exist_ok=True)
+            os.environ[TELEMETRY_DIR_ENV] = os.path.abspath(run_dir)
+        logging.info(f"Recording telemetry for {model_name} in {run_dir}")
+    elif telemetry:
+        logging.info(f"No telemetry for {model_name}: the {lmms_model} backend is not recorded")
+
+    if lmms_model in PLUGIN_BACKENDS:
+        plugin_dir = os.path.dirname(os.path.abspath(__file__))
+        os.environ['LMMS_EVAL_PLUGINS'] = PLUGIN_PACKAGE
+        if plugin_dir not in os.environ.get('PYTHONPATH', '').split(os.pathsep):
+            os.environ['PYTHONPATH'] = os.pathsep.join(p for p in [plugin_dir, os.environ.get('PYTHONPATH')] if p)
     cmd = (
         f"python3 -m lmms_eval "
-        f"--model {config['lmms_model']} "
+        f"--model {lmms_model} "
         f"--model_args model_version={config['model_version']}{extra_args} "
-        f"--tasks mmbeliefs_mcq "
-        f"--batch_size 1 "
+        f"--tasks {task} "
+        f"--batch_size {config.get('batch_size', 1)} "
         f"--log_samples "
         f"--output_path ./mmbeliefs_mcq_results/{config['output_dir']} "
     )
+    start = time.time()
+    success = False
+    attempt = 0
+    try:
+        for attempt in range(1, (max_attempts if checkpoint else 1) + 1):
+            if checkpoint:
+                num_kept, num_pruned = prune_failed_responses(cache_path)
+                if attempt > 1 or num_kept or num_pruned:
+                    logging.info(f"Attempt {attempt} for {model_name}: resuming with {num_kept} cached samples, "
+                                 f"retrying {num_pruned} failed samples")
+            logging.info(f"Executing command: {cmd}")
+            with span('model_run', model=model_name, attempt=attempt):
+                exit_code = os.system(cmd)
+
+            num_failed = prune_failed_responses(cache_path)[1] if checkpoint else 0
+            if exit_code == 0 and num_failed == 0:
+                success = True
+                break
+            if exit_code == 0:
+                logging.warning(f"{num_failed} samples failed for {model_name}")
+            else:
+                logging.warning(f"lmms_eval exited with code {exit_code} for {model_name}")
+            if checkpoint and attempt < max_attempts:
+                time.sleep(retry_wait_s * attempt)
+    finally:
+        if proxy is not None:
+            telemetry_proxy.stop_proxy(proxy)
+        os.environ.pop(TELEMETRY_DIR_ENV, None)
+        if run_dir is not None:
+            metrics = telemetry_proxy.write_metrics(
+                run_dir,
+                {'model': model_name, 'model_version': config['model_version'], 'run': run,
+                 'batch_size': config.get('batch_size', 1), 'attempts': attempt, 'success': success},
+                config.get('price_per_1m_input_tokens'), config.get('price_per_1m_output_tokens'))
+            logging.info(f"Telemetry for {model_name}: {metrics['num_requests']} requests, "
+                         f"{metrics['num_errors']} errors, {metrics['num_retries']} retries, "
+                         f"p50 {metrics['latency_p50_s'] or 0:.2f}s, p95 {metrics['latency_p95_s'] or 0:.2f}s")
+        if server is not None:
+            metrics_path = f"./mmbeliefs_mcq_results/{config['output_dir']}/server_metrics.json"
+            stop_local_server(server, config['local_server'], metrics_path)
+    logging.info(f"Evaluation for {model_name} took {time.time() - start:.1f}s")
     
-    logging.info(f"Executing command: {cmd}")
-    exit_code = os.system(cmd)
-    
-    if exit_code == 0:
+    if success:
         logging.info(f"Successfully completed evaluation for {model_name}")
     else:
         logging.error(f"Failed to complete evaluation for {model_name}")
+    return success
 
 def main():
     parser = argparse.ArgumentParser(description='Run model evaluations on mmbeliefs_mcq_fc dataset')
     parser.add_argument('--models', nargs='+', choices=list(MODEL_CONFIGS.keys()) + ['all'],
                       default=['all'], help='List of models to evaluate')
+    parser.add_argument('--no_checkpoint', action='store_true',
+                      help='Disable per-sample response checkpoints and resume')
+    parser.add_argument('--max_attempts', type=int, default=3,
+                      help='Runs per model; later runs only query samples that are missing or failed')
+    parser.add_argument('--no_telemetry', action='store_true',
+                      help='Do not route requests through the telemetry proxy')
+    parser.add_argument('--local_dataset', action='store_true',
+                      help=f'Evaluate {LOCAL_TASK} on the dataset in ./{LOCAL_DATASET_PATH} '
+                           '(create_hfdataset.py --save_to_disk) without contacting the Hub')
     args = parser.parse_args()
     
+    # Determine which models to run; local models are only run when asked for explicitly
+    if 'all' in args.models:
+        models_to_run = [name for name, config in MODEL_CONFIGS.items() if not config.get('local_server')]
+    else:
+        models_to_run = args.models
+
     # Check environment variables
-    check_required_env_vars()
-    
-    # Determine which models to run
-    models_to_run = list(MODEL_CONFIGS.keys()) if 'all' in args.models else args.models
+    check_required_env_vars(models_to_run, local_dataset=args.local_dataset)
+
+    task = HUB_TASK
+    if args.local_dataset:
+        if not os.path.isdir(LOCAL_DATASET_PATH):
+            raise FileNotFoundError(f"No local dataset at ./{LOCAL_DATASET_PATH}; "
+                                    f"run create_hfdataset.py --save_to_disk {LOCAL_DATASET_PATH}")
+        task = LOCAL_TASK
+        # Inherited by every lmms_eval process: never resolve datasets through the Hub
+        os.environ['HF_DATASETS_OFFLINE'] = '1'
+
+    fingerprint = None
+    if not args.no_checkpoint:
+        try:
+            fingerprint = dataset_fingerprint(task)
+            logging.info(f"Dataset version: {fingerprint}")
+        except Exception as e:
+            logging.warning(f"Could not determine the dataset version ({e}); "
+                            f"existing checkpoints are reused without checking that the dataset is unchanged")
     
     logging.info(f"Starting evaluation for models: {', '.join(models_to_run)}")
     
     # Run evaluations
     for model_name in models_to_run:
-        run_model_evaluation(model_name, MODEL_CONFIGS[model_name])
+        run_model_evaluation(model_name, MODEL_CONFIGS[model_name], checkpoint=not args.no_checkpoint,
+                             max_attempts=args.max_attempts, telemetry=not args.no_telemetry, task=task, fingerprint=fingerprint)
     
     logging.info("All evaluations completed")
+    if not args.no_telemetry:
+        print(telemetry_proxy.format_report(telemetry_proxy.comparison_report('./mmbeliefs_mcq_results')))
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
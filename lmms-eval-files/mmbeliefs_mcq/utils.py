@@ -1,10 +1,16 @@
+import atexit
 import datetime
+import io
 import json
+import os
 import re
 import string
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 from loguru import logger as eval_logger
-import lmms_eval.tasks._task_utils.file_utils as file_utils
+from PIL import Image
 
 
 def normalize_text(s):
@@ -58,9 +64,164 @@ def multiple_choice_accuracy(response, candidate_answers, superset_correct_answe
     return 1.0 if norm_pred in norm_gts else 0.0
 
 
+def open_image(value):
+    """Open an image column value: a PIL image, or an undecoded {'bytes', 'path'} dict (see mmbeliefs_process_docs)."""
+    if isinstance(value, dict):
+        return Image.open(io.BytesIO(value["bytes"])) if value.get("bytes") is not None else Image.open(value["path"])
+    return value
+
+
+def decode_visual(doc):
+    """
+    Decode a document's image to RGB.
+    If MMBELIEFS_IMAGE_RESOLUTION is set (e.g. "336x336"), the image_<WxH> column for that
+    resolution is used instead of the default image; a dataset without it is an error.
+
+    Args:
+        doc (dict): Input document.
+
+    Returns:
+        List[Image]: A list containing a single RGB image.
+    """
+    resolution = os.getenv("MMBELIEFS_IMAGE_RESOLUTION")
+    column = f"image_{resolution}" if resolution else "image"
+    if doc.get(column) is None:
+        raise ValueError(f"MMBELIEFS_IMAGE_RESOLUTION={resolution} but the document has no {column} column; "
+                         f"build the dataset with create_hfdataset.py --resolutions {resolution}")
+    image = doc[column]
+    image = open_image(image).convert("RGB")
+    image.load()
+    return [image]
+
+
+class DocPrefetcher:
+    """
+    Decodes the images of upcoming documents on a background thread pool.
+
+    Documents are identified by their image_path. When the model asks for the visual of the
+    document at position i, decoding is scheduled for positions i..i+window, so decoding overlaps
+    with in-flight API requests. At most `window` decoded documents are held at a time.
+
+    Stats distinguish CPU-bound runs (the model often waits on a decode: high stall time, low
+    occupancy) from network-bound ones (decodes are ready before they are needed).
+    """
+
+    def __init__(self, dataset, num_workers=4, window=16, decode_fn=decode_visual):
+        self.dataset = dataset
+        self.window = window
+        self.decode_fn = decode_fn
+        self.positions = {key: i for i, key in enumerate(dataset["image_path"])}
+        self.executor = ThreadPoolExecutor(max_workers=num_workers, thread_name_prefix="mmbeliefs-prefetch")
+        self.futures = {}
+        self.lock = threading.Lock()
+        self.num_requests = 0
+        self.num_hits = 0
+        self.num_misses = 0
+        self.occupancy_total = 0
+        self.stall_s = 0.0
+
+    def _decode_position(self, position):
+        return self.decode_fn(self.dataset[position])
+
+    def get(self, doc):
+        position = self.positions.get(doc.get("image_path"))
+        if position is None:
+            with self.lock:
+                self.num_misses += 1
+            return self.decode_fn(doc)
+
+        with self.lock:
+            # Drop decodes that were skipped over, then top the window up
+            for stale in [p for p in self.futures if p < position or p >= position + self.window]:
+                self.futures.pop(stale).cancel()
+            for p in range(position, min(position + self.window, len(self.dataset))):
+                if p not in self.futures:
+                    self.futures[p] = self.executor.submit(self._decode_position, p)
+            future = self.futures.pop(position)
+            self.num_requests += 1
+            self.num_hits += future.done()
+            self.occupancy_total += sum(f.done() for f in self.futures.values())
+
+        start = time.perf_counter()
+        visual = future.result()
+        with self.lock:
+            self.stall_s += time.perf_counter() - start
+        if self.num_requests % 100 == 0:
+            eval_logger.info(self.format_stats())
+        return visual
+
+    def stats(self):
+        with self.lock:
+            n = self.num_requests
+            return {
+                "requests": n,
+                "ready_on_request": self.num_hits / n if n else 0.0,
+                "mean_queue_occupancy": self.occupancy_total / n if n else 0.0,
+                "window": self.window,
+                "stall_s": self.stall_s,
+                "mean_stall_ms": 1000 * self.stall_s / n if n else 0.0,
+                "unknown_docs": self.num_misses,
+            }
+
+    def format_stats(self):
+        s = self.stats()
+        return (
+            f"Prefetch: {s['requests']} docs, {100 * s['ready_on_request']:.0f}% decoded before requested, "
+            f"mean queue occupancy {s['mean_queue_occupancy']:.1f}/{s['window']}, "
+            f"stalled {s['stall_s']:.2f}s ({s['mean_stall_ms']:.1f} ms/doc)"
+        )
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+_prefetcher = None
+
+
+def _close_prefetcher():
+    if _prefetcher is not None and _prefetcher.num_requests:
+        eval_logger.info(_prefetcher.format_stats())
+        _prefetcher.close()
+
+
+atexit.register(_close_prefetcher)
+
+
+def mmbeliefs_process_docs(dataset):
+    """
+    Sort delta-published datasets by their row_id column, and register the evaluation documents
+    with the background prefetcher.
+    Image columns are switched to undecoded bytes, so reading a document (as lmms_eval does on
+    the request path) does not decode its image; decoding happens once, in decode_visual.
+    Configured with MMBELIEFS_PREFETCH_WORKERS (default 4, 0 disables) and MMBELIEFS_PREFETCH_WINDOW (default 16).
+
+    Args:
+        dataset (Dataset): Documents of the evaluated split.
+
+    Returns:
+        Dataset: The documents, in an order that does not depend on how rows are sharded.
+    """
+    global _prefetcher
+    if "row_id" in dataset.column_names:
+        # Delta-published shards (delta_publish.py): order by row content hash, so doc_ids do not depend on sharding
+        dataset = dataset.sort("row_id")
+    from datasets import Image as ImageFeature
+    for column, feature in dataset.features.items():
+        if isinstance(feature, ImageFeature) and feature.decode:
+            dataset = dataset.cast_column(column, ImageFeature(decode=False))
+    num_workers = int(os.getenv("MMBELIEFS_PREFETCH_WORKERS", "4"))
+    window = int(os.getenv("MMBELIEFS_PREFETCH_WINDOW", "16"))
+    if _prefetcher is not None:
+        _prefetcher.close()
+        _prefetcher = None
+    if num_workers > 0 and window > 0 and "image_path" in dataset.column_names:
+        _prefetcher = DocPrefetcher(dataset, num_workers=num_workers, window=window)
+    return dataset
+
+
 def mmbeliefs_doc_to_visual(doc):
     """
-    Extract image input for the model.
+    Extract image input for the model, using the prefetched decode when available.
 
     Args:
         doc (dict): Input document.
@@ -68,7 +229,9 @@ def mmbeliefs_doc_to_visual(doc):
     Returns:
         List[Image]: A list containing a single RGB image.
     """
-    return [doc["image"].convert("RGB")]
+    if _prefetcher is not None:
+        return _prefetcher.get(doc)
+    return decode_visual(doc)
 
 
 def mmbeliefs_doc_to_text(doc, lmms_eval_specific_kwargs=None):
@@ -159,6 +322,9 @@ def mmbeliefs_aggregate_submissions(results, args):
     Returns:
         None
     """
+    # Imported here so the scoring functions can be used without lmms_eval installed
+    import lmms_eval.tasks._task_utils.file_utils as file_utils
+
     now = datetime.datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
     filename = f"mmbeliefs-test-submission-{now}.json"
     output_path = file_utils.generate_submission_file(filename, args)
@@ -0,0 +1 @@
+"""lmms_eval plugin with the mmbeliefs model backends; enabled with LMMS_EVAL_PLUGINS=mmbeliefs_models."""
@@ -0,0 +1,5 @@
+# Model name -> class, looked up by lmms_eval as mmbeliefs_models.models.<name>.<class>
+AVAILABLE_MODELS = {
+    "openai_concurrent": "OpenAIConcurrent",
+    "gemini_telemetry": "GeminiTelemetry",
+}
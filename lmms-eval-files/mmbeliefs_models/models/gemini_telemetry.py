@@ -0,0 +1,56 @@
+"""
+gemini_api with every generate_content call recorded for telemetry.
+
+gemini_api calls Google's SDK, not OPENAI_API_BASE, so the telemetry proxy never sees it. This
+backend wraps the SDK model and records each call (latency, status, retries of an identical
+request, token usage) with telemetry_proxy.record_call into $MMBELIEFS_TELEMETRY_DIR/requests.jsonl,
+the same file and format the proxy writes. Without MMBELIEFS_TELEMETRY_DIR it is plain gemini_api.
+"""
+
+import os
+import hashlib
+
+from PIL import Image
+
+import telemetry_proxy
+from lmms_eval.models.gemini_api import GeminiAPI
+
+TELEMETRY_DIR_ENV = "MMBELIEFS_TELEMETRY_DIR"
+
+
+def request_key(message):
+    """Bytes identifying a generate_content message (text and image parts), for retry counting."""
+    h = hashlib.sha256()
+    for part in message if isinstance(message, list) else [message]:
+        h.update(part.tobytes() if isinstance(part, Image.Image) else str(part).encode())
+    return h.digest()
+
+
+def usage(response):
+    metadata = response.usage_metadata
+    return metadata.prompt_token_count or 0, metadata.candidates_token_count or 0
+
+
+class RecordedModel:
+    """Forwards to a genai.GenerativeModel, recording generate_content calls."""
+
+    def __init__(self, model, recorder, path):
+        self._model = model
+        self._recorder = recorder
+        self._path = path
+
+    def generate_content(self, message, **kwargs):
+        return telemetry_proxy.record_call(self._recorder, self._path, request_key(message),
+                                           lambda: self._model.generate_content(message, **kwargs), usage)
+
+    def __getattr__(self, name):
+        return getattr(self._model, name)
+
+
+class GeminiTelemetry(GeminiAPI):
+    def __init__(self, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.recorder = None
+        if os.getenv(TELEMETRY_DIR_ENV):
+            self.recorder = telemetry_proxy.Recorder(os.path.join(os.environ[TELEMETRY_DIR_ENV], telemetry_proxy.REQUESTS_FILENAME))
+            self.model = RecordedModel(self.model, self.recorder, f"/models/{self.model_version}:generateContent")
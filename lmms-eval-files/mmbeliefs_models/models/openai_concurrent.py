@@ -0,0 +1,88 @@
+"""
+openai_compatible with up to num_concurrent requests in flight.
+
+lmms_eval's openai_compatible backend sends one request at a time, so a server that batches
+concurrent requests (local_server.py) never sees more than one. This backend sends the same
+requests from a thread pool. Responses are returned in request order and, in continual mode,
+cached as they arrive, exactly like openai_compatible.
+
+python3 -m lmms_eval --model openai_concurrent --model_args model_version=hash,num_concurrent=8 ...
+"""
+
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from loguru import logger as eval_logger
+from PIL import Image
+from tqdm import tqdm
+
+from lmms_eval.models.openai_compatible import OpenAICompatible
+
+
+class OpenAIConcurrent(OpenAICompatible):
+    def __init__(self, num_concurrent: int = 8, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.num_concurrent = int(num_concurrent)
+        self.cache_lock = threading.Lock()
+
+    def _payload(self, contexts, gen_kwargs, visuals):
+        content = [{"type": "text", "text": contexts}]
+        for visual in visuals:
+            if isinstance(visual, (str, Image.Image)):
+                content.append({"type": "image_url", "image_url": {"url": f"data:image/png;base64,{self.encode_image(visual)}"}})
+        return {
+            "model": self.model_version,
+            "messages": [{"role": "user", "content": content}],
+            "max_tokens": min(gen_kwargs.get("max_new_tokens", 1024), 4096),
+            "temperature": gen_kwargs.get("temperature", 0),
+        }
+
+    def _respond(self, payload):
+        """Response text, or "" if every attempt failed (the runner retries those samples)."""
+        for attempt in range(self.max_retries):
+            try:
+                response = self.client.chat.completions.create(**payload)
+                return response.choices[0].message.content
+            except Exception as e:
+                eval_logger.info(f"Attempt {attempt + 1}/{self.max_retries} failed with error: {e}")
+                if attempt == self.max_retries - 1:
+                    eval_logger.error(f"All {self.max_retries} attempts failed. Last error: {e}")
+                else:
+                    time.sleep(self.timeout)
+        return ""
+
+    def generate_until(self, requests) -> List[str]:
+        res = [None] * len(requests)
+        pending = []
+        for i, request in enumerate(requests):
+            _, _, _, doc_id, task, split = request.args
+            cached = self.response_cache.get(f"{task}___{split}___{doc_id}") if self.continual_mode else None
+            if cached:
+                res[i] = cached
+            else:
+                pending.append(i)
+        pbar = tqdm(total=len(requests), initial=len(requests) - len(pending), disable=(self.rank != 0),
+                    desc="Model Responding")
+
+        def respond(i):
+            contexts, gen_kwargs, doc_to_visual, doc_id, task, split = requests[i].args
+            visuals = doc_to_visual(self.task_dict[task][split][doc_id])
+            visuals = [] if visuals is None or None in visuals else self.flatten([visuals])
+            response_text = self._respond(self._payload(contexts, gen_kwargs, visuals))
+            if self.continual_mode:
+                with self.cache_lock:
+                    self.response_cache[f"{task}___{split}___{doc_id}"] = response_text
+                    with open(self.response_persistent_file, "w") as f:
+                        json.dump(self.response_cache, f)
+            return response_text
+
+        with ThreadPoolExecutor(max_workers=self.num_concurrent) as executor:
+            futures = {i: executor.submit(respond, i) for i in pending}
+            for i, future in futures.items():
+                res[i] = future.result()
+                pbar.update(1)
+        pbar.close()
+        return res
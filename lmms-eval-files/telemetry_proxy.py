@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+
+"""
+Recording proxy for OpenAI-compatible APIs, used to collect per-provider telemetry during evaluation.
+
+The runner starts the proxy in front of a model's api_base and points lmms_eval at it. Every
+request is forwarded unchanged and recorded (latency, HTTP status, retry of an identical request,
+token usage) as one line of requests.jsonl. After the run the log is summarized into metrics.json
+with latency percentiles, error and retry counts, tokens and, if the model config has prices, cost.
+
+Models run with the gemini_api backend use Google's SDK instead of OPENAI_API_BASE. The runner
+evaluates them with gemini_telemetry (mmbeliefs_models plugin), which records every SDK call with
+record_call into the same requests.jsonl, so they get the same metrics.
+
+# Forward to a provider and record to a directory
+python3 telemetry_proxy.py --upstream https://api.openai.com/v1 --port 8100 --run_dir telemetry/run
+
+# Compare metrics across models and runs
+python3 telemetry_proxy.py --report ./mmbeliefs_mcq_results
+"""
+
+import os
+import json
+import glob
+import time
+import hashlib
+import argparse
+import threading
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REQUESTS_FILENAME = 'requests.jsonl'
+METRICS_FILENAME = 'metrics.json'
+
+# Hop-by-hop and recomputed headers are not forwarded
+SKIPPED_HEADERS = {'host', 'content-length', 'connection', 'accept-encoding', 'keep-alive',
+                   'transfer-encoding', 'proxy-connection'}
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, int(round(q / 100 * (len(values) - 1)))))
+    return values[index]
+
+
+class Recorder:
+    """Appends one JSON line per request and tracks in-flight requests and repeated payloads."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.seen = {}
+        self.in_flight = 0
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.file = open(path, 'a')
+
+    def begin(self, path, body):
+        """Returns (attempt, concurrency): attempt > 1 means an identical request was sent before."""
+        key = hashlib.sha256(path.encode() + (body or b'')).hexdigest()
+        with self.lock:
+            self.seen[key] = self.seen.get(key, 0) + 1
+            self.in_flight += 1
+            return self.seen[key], self.in_flight
+
+    def end(self, record):
+        with self.lock:
+            self.in_flight -= 1
+            self.file.write(json.dumps(record) + '\n')
+            self.file.flush()
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+
+def record_call(recorder, path, body, call, usage_fn=None):
+    """
+    Run call() and record it like a proxied request, for clients that do not use HTTP through the
+    proxy. body identifies the request for retry counting; usage_fn(result) returns
+    (prompt_tokens, completion_tokens). Exceptions are recorded with the error's HTTP code if it has one.
+    """
+    attempt, concurrency = recorder.begin(path, body)
+    record = {'start': time.time(), 'method': 'POST', 'path': path, 'attempt': attempt, 'concurrency': concurrency,
+              'prompt_tokens': 0, 'completion_tokens': 0}
+    start = time.perf_counter()
+    try:
+        result = call()
+    except Exception as e:
+        code = getattr(e, 'code', None)
+        record.update(latency_s=time.perf_counter() - start, status=code if isinstance(code, int) else 500,
+                      error=f"{type(e).__name__}: {e}")
+        recorder.end(record)
+        raise
+    record.update(latency_s=time.perf_counter() - start, status=200)
+    if usage_fn is not None:
+        try:
+            record['prompt_tokens'], record['completion_tokens'] = usage_fn(result)
+        except Exception:
+            pass  # Usage is optional; the request is still recorded
+    recorder.end(record)
+    return result
+
+
+def make_handler(upstream, recorder, timeout_s):
+    class Handler(BaseHTTPRequestHandler):
+        def _forward(self, method):
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0))) if method == 'POST' else None
+            attempt, concurrency = recorder.begin(self.path, body)
+            headers = {k: v for k, v in self.headers.items() if k.lower() not in SKIPPED_HEADERS}
+            request = urllib.request.Request(upstream.rstrip('/') + self.path, data=body, headers=headers,
+                                             method=method)
+            record = {'start': time.time(), 'method': method, 'path': self.path, 'attempt': attempt,
+                      'concurrency': concurrency}
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=timeout_s) as response:
+                    status, response_headers, response_body = response.status, response.headers, response.read()
+            except urllib.error.HTTPError as e:
+                status, response_headers, response_body = e.code, e.headers, e.read()
+            except Exception as e:
+                status, response_headers = 502, {}
+                response_body = json.dumps({'error': {'message': f"Proxy could not reach upstream: {e}"}}).encode()
+                record['error'] = f"{type(e).__name__}: {e}"
+            record['latency_s'] = time.perf_counter() - start
+            record['status'] = status
+
+            try:
+                usage = json.loads(response_body).get('usage') or {}
+            except (ValueError, AttributeError):
+                usage = {}
+            record['prompt_tokens'] = usage.get('prompt_tokens') or usage.get('input_tokens') or 0
+            record['completion_tokens'] = usage.get('completion_tokens') or usage.get('output_tokens') or 0
+            recorder.end(record)
+
+            self.send_response(status)
+            for key, value in response_headers.items():
+                if key.lower() not in SKIPPED_HEADERS | {'content-encoding', 'date', 'server'}:
+                    self.send_header(key, value)
+            self.send_header('Content-Length', str(len(response_body)))
+            self.end_headers()
+            self.wfile.write(response_body)
+
+        def do_GET(self):
+            self._forward('GET')
+
+        def do_POST(self):
+            self._forward('POST')
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def make_proxy(upstream, run_dir, host='127.0.0.1', port=0, timeout_s=600):
+    """Create (but do not start) a proxy server; port 0 picks a free port (see server.server_port)."""
+    recorder = Recorder(os.path.join(run_dir, REQUESTS_FILENAME))
+    server = ThreadingHTTPServer((host, port), make_handler(upstream, recorder, timeout_s))
+    server.daemon_threads = True
+    server.recorder = recorder
+    return server
+
+
+def start_proxy(upstream, run_dir, host='127.0.0.1', port=0):
+    """Start a proxy on a background thread; returns the server (stop with stop_proxy)."""
+    server = make_proxy(upstream, run_dir, host, port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def stop_proxy(server):
+    server.shutdown()
+    server.server_close()
+    server.recorder.close()
+
+
+def load_records(run_dir):
+    path = os.path.join(run_dir, REQUESTS_FILENAME)
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def summarize(records, price_per_1m_input_tokens=None, price_per_1m_output_tokens=None):
+    """Aggregate request records into run metrics; cost is None unless both prices are given."""
+    latencies = [r['latency_s'] for r in records]
+    succeeded = [r for r in records if 200 <= r['status'] < 300]
+    prompt_tokens = sum(r['prompt_tokens'] for r in records)
+    completion_tokens = sum(r['completion_tokens'] for r in records)
+    elapsed = (max(r['start'] + r['latency_s'] for r in records) - min(r['start'] for r in records)) if records else 0.0
+    status_counts = {}
+    for r in records:
+        status_counts[str(r['status'])] = status_counts.get(str(r['status']), 0) + 1
+    cost = None
+    if price_per_1m_input_tokens is not None and price_per_1m_output_tokens is not None:
+        cost = (prompt_tokens * price_per_1m_input_tokens + completion_tokens * price_per_1m_output_tokens) / 1e6
+    return {
+        'num_requests': len(records),
+        'num_succeeded': len(succeeded),
+        'num_errors': len(records) - len(succeeded),
+        'num_retries': sum(1 for r in records if r['attempt'] > 1),
+        'status_counts': status_counts,
+        'latency_p50_s': percentile(latencies, 50),
+        'latency_p95_s': percentile(latencies, 95),
+        'latency_p99_s': percentile(latencies, 99),
+        'latency_max_s': max(latencies) if latencies else None,
+        'max_concurrency': max((r['concurrency'] for r in records), default=0),
+        'elapsed_s': elapsed,
+        'requests_per_s': len(records) / elapsed if elapsed else 0.0,
+        'prompt_tokens': prompt_tokens,
+        'completion_tokens': completion_tokens,
+        'cost_usd': cost,
+    }
+
+
+def write_metrics(run_dir, info, price_per_1m_input_tokens=None, price_per_1m_output_tokens=None):
+    """Summarize run_dir/requests.jsonl into run_dir/metrics.json; info (model, run, ...) is stored alongside."""
+    metrics = {**info, **summarize(load_records(run_dir), price_per_1m_input_tokens, price_per_1m_output_tokens)}
+    with open(os.path.join(run_dir, METRICS_FILENAME), 'w') as f:
+        json.dump(metrics, f, indent=4)
+    return metrics
+
+
+def comparison_report(results_dir):
+    """One row per run found under results_dir, sorted by model then run."""
+    rows = []
+    for path in glob.glob(os.path.join(results_dir, '**', METRICS_FILENAME), recursive=True):
+        with open(path, 'r') as f:
+            rows.append(json.load(f))
+    return sorted(rows, key=lambda r: (r.get('model', ''), r.get('run', '')))
+
+
+def format_report(rows):
+    def fmt(value, spec):
+        return format(value, spec) if value is not None else '-'
+
+    header = (f"{'model':<22} {'run':<20} {'reqs':>6} {'err':>5} {'retry':>5} {'conc':>5} {'p50 s':>7} "
+              f"{'p95 s':>7} {'p99 s':>7} {'req/s':>6} {'tokens in':>10} {'tokens out':>10} {'cost $':>8}")
+    lines = [header, '-' * len(header)]
+    for r in rows:
+        lines.append(f"{r.get('model', '?'):<22} {r.get('run', '?'):<20} {r['num_requests']:>6} {r['num_errors']:>5} "
+                     f"{r['num_retries']:>5} {r['max_concurrency']:>5} {fmt(r['latency_p50_s'], '7.2f')} "
+                     f"{fmt(r['latency_p95_s'], '7.2f')} {fmt(r['latency_p99_s'], '7.2f')} "
+                     f"{r['requests_per_s']:>6.2f} {r['prompt_tokens']:>10} {r['completion_tokens']:>10} "
+                     f"{fmt(r['cost_usd'], '8.2f')}")
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Telemetry proxy for OpenAI-compatible APIs')
+    parser.add_argument('--upstream', type=str, help='API base to forward to')
+    parser.add_argument('--run_dir', type=str, default='telemetry')
+    parser.add_argument('--host', type=str, default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8100)
+    parser.add_argument('--report', type=str, default=None,
+                        help='Print a comparison of all metrics.json files under this directory')
+    args = parser.parse_args()
+
+    if args.report:
+        print(format_report(comparison_report(args.report)))
+        return
+    if not args.upstream:
+        parser.error('--upstream is required unless --report is given')
+
+    server = make_proxy(args.upstream, args.run_dir, args.host, args.port)
+    print(f"Recording http://{args.host}:{server.server_port} -> {args.upstream} in {args.run_dir}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.recorder.close()
+        print(json.dumps(write_metrics(args.run_dir, {'upstream': args.upstream}), indent=4))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+
+"""
+Run the data-preparation pipeline as a DAG of stages with declared inputs and outputs.
+
+A stage is skipped (make-style) when the content hashes of its inputs and outputs match
+the ones recorded after its last successful run. Stages whose dependencies are satisfied
+run in parallel. Every run writes a manifest with per-stage status, timing and hashes.
+
+# Run every default stage (standardize -> generate -> verify; scrape only if its outputs are missing)
+python3 pipeline.py
+
+# Re-scrape the live site
+python3 pipeline.py scrape
+
+# Run a stage and whatever it depends on
+python3 pipeline.py generate
+
+# Publish to the Hub (never run by default)
+python3 pipeline.py publish
+
+# Show what would run without running it
+python3 pipeline.py --dry_run
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import datetime
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+PYTHON = sys.executable or "python3"
+
+# create_hfdataset.py and the modules it imports, directly or through delta_publish/standardize_images
+HFDATASET_MODULES = ['create_hfdataset.py', 'delta_publish.py', 'standardize_images.py', 'svg_rasterizer.py',
+                     'image_dedup.py', 'profiling.py']
+
+# Stage dependencies are inferred: a stage depends on every stage that produces one of its inputs.
+# Inputs list every local module a stage's script imports, so editing one re-runs the stage.
+STAGES = {
+    'scrape': {
+        'cmd': [PYTHON, 'scraper.py', '--results_path', 'results.json',
+                '--images_dir', 'images', '--output_path', 'results_with_images.json'],
+        'inputs': ['scraper.py', 'profiling.py'],
+        'outputs': ['results_with_images.json', 'images'],
+        'default': False,  # Crawls the live site with a browser; existing results are kept unless asked for
+    },
+    'standardize': {
+        'cmd': [PYTHON, 'standardize_images.py', '--results_input_path', 'results_with_images.json',
+                '--results_output_path', 'results_with_images_std.json', '--images_output_dir', 'images_std',
+                # Flags near-duplicate images, which generate_questions.py skips
+                '--dedup_max_distance', '6', '--hash_index_path', 'image_hashes.json'],
+        'inputs': ['standardize_images.py', 'svg_rasterizer.py', 'image_dedup.py', 'profiling.py',
+                   'results_with_images.json', 'images'],
+        'outputs': ['results_with_images_std.json', 'images_std', 'svg_quarantine.json', 'image_hashes.json'],
+    },
+    'generate': {
+        'cmd': [PYTHON, 'generate_questions.py', '--results_path', 'results_with_images_std.json',
+                '--assets_dir', 'assets', '--output_path', 'task_data.json'],
+        'inputs': ['generate_questions.py', 'label_index.py', 'profiling.py', 'results_with_images_std.json', 'assets'],
+        'outputs': ['task_data.json'],
+    },
+    'verify': {
+        'cmd': [PYTHON, 'verify_corpus.py', '--images_dir', 'images_std', '--task_data_path', 'task_data.json',
+                '--manifest_path', 'corpus_manifest.json', '--report_path', 'corpus_report.json'],
+        'inputs': ['verify_corpus.py', 'image_dedup.py', 'label_index.py', 'images_std', 'task_data.json', 'assets'],
+        'outputs': ['corpus_manifest.json', 'corpus_report.json'],
+    },
+    'local_dataset': {
+        'cmd': [PYTHON, 'create_hfdataset.py', '--task_data_path', 'task_data.json',
+                '--save_to_disk', 'mmbeliefs_mcq_local'],
+        'inputs': HFDATASET_MODULES + ['task_data.json', 'images_std'],
+        'outputs': ['mmbeliefs_mcq_local'],
+        'default': False,  # Only needed for lmms_eval runs with --local_dataset
+    },
+    'publish': {
+        'cmd': [PYTHON, 'create_hfdataset.py', '--task_data_path', 'task_data.json'],
+        'inputs': HFDATASET_MODULES + ['task_data.json', 'images_std', 'corpus_report.json'],
+        'outputs': [],
+        'default': False,  # Pushes to the Hub; only run when asked for explicitly
+    },
+}
+
+
+class PipelineError(Exception):
+    pass
+
+
+class FileHasher:
+    """SHA-256 of files and directory trees, cached by (size, mtime) so unchanged files are not re-read."""
+
+    def __init__(self, cache=None):
+        self.cache = cache if cache is not None else {}
+
+    def hash_file(self, path):
+        st = os.stat(path)
+        key = os.path.abspath(path)
+        entry = self.cache.get(key)
+        if entry and entry['size'] == st.st_size and entry['mtime_ns'] == st.st_mtime_ns:
+            return entry['sha256']
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+        digest = h.hexdigest()
+        self.cache[key] = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'sha256': digest}
+        return digest
+
+    def hash_path(self, path):
+        """Hash a file or a directory tree; returns None if path does not exist."""
+        if os.path.isfile(path):
+            return self.hash_file(path)
+        if not os.path.isdir(path):
+            return None
+        h = hashlib.sha256()
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                file_path = os.path.join(root, name)
+                h.update(os.path.relpath(file_path, path).encode())
+                h.update(self.hash_file(file_path).encode())
+        return h.hexdigest()
+
+    def hash_paths(self, paths):
+        return {p: self.hash_path(p) for p in paths}
+
+
+def combined_hash(path_hashes, extra=''):
+    h = hashlib.sha256(extra.encode())
+    for path in sorted(path_hashes):
+        h.update(f"{path}:{path_hashes[path]}\n".encode())
+    return h.hexdigest()
+
+
+def stage_dependencies(stages):
+    """Map each stage to the set of stages producing one of its inputs."""
+    producers = {}
+    for name, stage in stages.items():
+        for output in stage['outputs']:
+            if output in producers:
+                raise PipelineError(f"Output {output} is produced by both {producers[output]} and {name}")
+            producers[output] = name
+    return {
+        name: {producers[i] for i in stage['inputs'] if i in producers and producers[i] != name}
+        for name, stage in stages.items()
+    }
+
+
+def topological_order(stages, deps):
+    order, state = [], {}
+
+    def visit(name, path):
+        if state.get(name) == 'done':
+            return
+        if state.get(name) == 'visiting':
+            raise PipelineError(f"Dependency cycle: {' -> '.join(path + [name])}")
+        state[name] = 'visiting'
+        for dep in sorted(deps[name]):
+            visit(dep, path + [name])
+        state[name] = 'done'
+        order.append(name)
+
+    for name in stages:
+        visit(name, [])
+    return order
+
+
+def select_stages(stages, deps, targets=None):
+    """
+    Targets plus everything upstream of them; defaults to all stages not marked 'default': False.
+    An upstream stage marked 'default': False is only included if one of its outputs is missing.
+    """
+    if not targets:
+        targets = [name for name, stage in stages.items() if stage.get('default', True)]
+    unknown = [t for t in targets if t not in stages]
+    if unknown:
+        raise PipelineError(f"Unknown stages: {', '.join(unknown)}")
+    selected, stack = set(), list(targets)
+    while stack:
+        name = stack.pop()
+        if name not in selected:
+            selected.add(name)
+            stack.extend(dep for dep in deps[name] if stages[dep].get('default', True)
+                         or not all(os.path.exists(output) for output in stages[dep]['outputs']))
+    return [name for name in topological_order(stages, deps) if name in selected]
+
+
+def load_json(path, default):
+    if not os.path.exists(path):
+        return default
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def write_json(obj, path):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(obj, f, indent=4)
+    os.replace(tmp_path, path)
+
+
+def is_up_to_date(stage, record, hasher):
+    """Return (up_to_date, input_hash) for a stage given its last successful run record."""
+    input_hash = combined_hash(hasher.hash_paths(stage['inputs']), extra=json.dumps(stage['cmd']))
+    if not record or record.get('input_hash') != input_hash:
+        return False, input_hash
+    output_hashes = hasher.hash_paths(stage['outputs'])
+    if any(h is None for h in output_hashes.values()):
+        return False, input_hash
+    return record.get('output_hash') == combined_hash(output_hashes), input_hash
+
+
+def run_stage(name, stage, log_dir):
+    start = time.time()
+    log_path = os.path.join(log_dir, f"{name}.log")
+    with open(log_path, 'w') as log:
+        proc = subprocess.run(stage['cmd'], stdout=log, stderr=subprocess.STDOUT, cwd=stage.get('cwd'))
+    return proc.returncode, time.time() - start, log_path
+
+
+def run_pipeline(stages=STAGES, targets=None, state_dir='.pipeline', jobs=None, force=False, dry_run=False):
+    """
+    Run the selected stages, skipping those that are up to date.
+    Returns the run manifest; raises PipelineError if any stage failed.
+    """
+    deps = stage_dependencies(stages)
+    order = select_stages(stages, deps, targets)
+    log_dir = os.path.join(state_dir, 'logs')
+    runs_dir = os.path.join(state_dir, 'runs')
+    os.makedirs(log_dir, exist_ok=True)
+    os.makedirs(runs_dir, exist_ok=True)
+
+    state_path = os.path.join(state_dir, 'state.json')
+    state = load_json(state_path, {'stages': {}, 'file_hashes': {}})
+    hasher = FileHasher(state['file_hashes'])
+
+    started_at = datetime.datetime.now()
+    manifest = {'started_at': started_at.isoformat(), 'targets': targets or [], 'stages': {}}
+    pending = list(order)
+    running = {}
+    status = {}
+    run_start = time.time()
+
+    def finish(name, result):
+        manifest['stages'][name] = result
+        status[name] = result['status']
+        print(f"[{name}] {result['status']} ({result['duration_s']:.2f}s)")
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        while pending or running:
+            for name in list(pending):
+                dep_status = [status.get(d) for d in deps[name] if d in order]
+                if any(s in ('failed', 'blocked') for s in dep_status):
+                    pending.remove(name)
+                    finish(name, {'status': 'blocked', 'duration_s': 0.0})
+                    continue
+                if not all(s in ('skipped', 'succeeded', 'dry_run') for s in dep_status):
+                    continue
+                pending.remove(name)
+                stage = stages[name]
+                check_start = time.time()
+                up_to_date, input_hash = is_up_to_date(stage, state['stages'].get(name), hasher)
+                if up_to_date and not force:
+                    finish(name, {'status': 'skipped', 'duration_s': time.time() - check_start,
+                                  'input_hash': input_hash})
+                elif dry_run:
+                    finish(name, {'status': 'dry_run', 'duration_s': 0.0, 'cmd': stage['cmd']})
+                else:
+                    print(f"[{name}] running: {' '.join(stage['cmd'])}")
+                    running[executor.submit(run_stage, name, stage, log_dir)] = (name, input_hash)
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, input_hash = running.pop(future)
+                returncode, duration, log_path = future.result()
+                result = {'status': 'succeeded' if returncode == 0 else 'failed', 'duration_s': duration,
+                          'returncode': returncode, 'log': log_path, 'cmd': stages[name]['cmd'],
+                          'input_hash': input_hash}
+                if returncode == 0:
+                    # Inputs are re-hashed so a stage that rewrites its own inputs is not re-run next time
+                    _, input_hash = is_up_to_date(stages[name], None, hasher)
+                    result['input_hash'] = input_hash
+                    result['output_hash'] = combined_hash(hasher.hash_paths(stages[name]['outputs']))
+                    state['stages'][name] = {'input_hash': input_hash, 'output_hash': result['output_hash'],
+                                             'finished_at': datetime.datetime.now().isoformat()}
+                    write_json(state, state_path)
+                finish(name, result)
+
+    manifest['duration_s'] = time.time() - run_start
+    write_json(state, state_path)
+    manifest_path = os.path.join(runs_dir, f"{started_at.strftime('%Y-%m-%d-%H-%M-%S')}.json")
+    write_json(manifest, manifest_path)
+    write_json(manifest, os.path.join(state_dir, 'last_run.json'))
+
+    print("\nStage timing:")
+    for name in order:
+        result = manifest['stages'][name]
+        print(f"  {name:<12} {result['status']:<10} {result['duration_s']:8.2f}s")
+    print(f"Total: {manifest['duration_s']:.2f}s. Run manifest: {manifest_path}")
+
+    failed = [name for name in order if status[name] in ('failed', 'blocked')]
+    if failed:
+        raise PipelineError(f"Stages did not complete: {', '.join(failed)}")
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the mmbeliefs data-preparation pipeline')
+    parser.add_argument('stages', nargs='*', help=f"Stages to run (with their dependencies): {', '.join(STAGES)}")
+    parser.add_argument('--state_dir', type=str, default='.pipeline')
+    parser.add_argument('--jobs', type=int, default=None, help='Maximum number of stages run in parallel')
+    parser.add_argument('--force', action='store_true', help='Run stages even if they are up to date')
+    parser.add_argument('--dry_run', action='store_true', help='Report what would run without running it')
+    args = parser.parse_args()
+
+    try:
+        run_pipeline(STAGES, targets=args.stages, state_dir=args.state_dir, jobs=args.jobs,
+                     force=args.force, dry_run=args.dry_run)
+    except PipelineError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""
+Lightweight timing spans for the data-preparation and evaluation scripts.
+
+Spans are no-ops until tracing is enabled, either with enable() or through environment variables:
+
+MMBELIEFS_TRACE=trace.jsonl python3 standardize_images.py      # one JSON object per span
+MMBELIEFS_TRACE=trace.json python3 standardize_images.py       # Chrome trace (chrome://tracing, Perfetto)
+MMBELIEFS_PROFILE=cprofile MMBELIEFS_PROFILE_SPANS=prepare_dataset python3 standardize_images.py
+MMBELIEFS_PROFILE=tracemalloc python3 create_hfdataset.py
+
+A per-span summary is printed when the process exits. Saved traces can be summarized with:
+python3 profiling.py trace.jsonl
+"""
+
+import os
+import sys
+import json
+import time
+import atexit
+import cProfile
+import argparse
+import functools
+import threading
+import tracemalloc
+from contextlib import nullcontext
+
+_NULL_SPAN = nullcontext()
+_tracer = None
+
+
+class Tracer:
+    def __init__(self, path=None, fmt=None, profile=None, profile_spans=None, profile_dir='profiles'):
+        if fmt is None:
+            fmt = 'chrome' if path and path.endswith('.json') else 'jsonl'
+        if fmt not in ('jsonl', 'chrome'):
+            raise ValueError(f"Unknown trace format {fmt}")
+        if profile not in (None, 'cprofile', 'tracemalloc'):
+            raise ValueError(f"Unknown profiler {profile}")
+        self.path = path
+        self.fmt = fmt
+        self.profile = profile
+        self.profile_spans = set(profile_spans) if profile_spans else None
+        self.profile_dir = profile_dir
+        self.events = []
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.profiling = False
+        self.pid = os.getpid()
+        self.origin = time.perf_counter()
+        self.started_tracemalloc = profile == 'tracemalloc' and not tracemalloc.is_tracing()
+        if self.started_tracemalloc:
+            tracemalloc.start()
+
+    def should_profile(self, name, depth):
+        if self.profile is None:
+            return False
+        if self.profile_spans is None:
+            return depth == 0
+        return name in self.profile_spans
+
+    def record(self, name, start, duration, attrs):
+        event = {
+            'name': name,
+            'start_s': start - self.origin,
+            'duration_s': duration,
+            'pid': self.pid,
+            'tid': threading.get_ident(),
+        }
+        if attrs:
+            event['args'] = attrs
+        with self.lock:
+            self.events.append(event)
+
+    def write(self, path=None):
+        path = path or self.path
+        if not path:
+            return None
+        with self.lock:
+            events = list(self.events)
+        with open(path, 'w') as f:
+            if self.fmt == 'chrome':
+                json.dump({'traceEvents': [{
+                    'name': e['name'], 'ph': 'X', 'ts': e['start_s'] * 1e6, 'dur': e['duration_s'] * 1e6,
+                    'pid': e['pid'], 'tid': e['tid'], 'args': e.get('args', {}),
+                } for e in events]}, f)
+            else:
+                for e in events:
+                    f.write(json.dumps(e) + '\n')
+        return path
+
+
+class _Span:
+    __slots__ = ('tracer', 'name', 'attrs', 'start', 'profiler', 'mem_start', 'mem_peak')
+
+    def __init__(self, tracer, name, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self.profiler = None
+        self.mem_start = None
+        self.mem_peak = 0
+
+    def __enter__(self):
+        tracer = self.tracer
+        depth = getattr(tracer.local, 'depth', 0)
+        tracer.local.depth = depth + 1
+        if tracer.should_profile(self.name, depth):
+            if tracer.profile == 'cprofile' and not tracer.profiling:
+                # cProfile cannot nest, so only the outermost matching span is profiled
+                tracer.profiling = True
+                self.profiler = cProfile.Profile()
+                self.profiler.enable()
+            elif tracer.profile == 'tracemalloc':
+                # The tracemalloc peak is process-wide: keep the enclosing span's peak so far, then
+                # reset it so this span reports its own peak rather than the highest since startup
+                self.mem_start, peak = tracemalloc.get_traced_memory()
+                stack = tracer.local.__dict__.setdefault('mem_spans', [])
+                if stack:
+                    stack[-1].mem_peak = max(stack[-1].mem_peak, peak)
+                stack.append(self)
+                tracemalloc.reset_peak()
+        self.start = time.perf_counter()
+        return self
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        tracer = self.tracer
+        tracer.local.depth -= 1
+        if self.profiler is not None:
+            self.profiler.disable()
+            tracer.profiling = False
+            os.makedirs(tracer.profile_dir, exist_ok=True)
+            prof_path = os.path.join(tracer.profile_dir, f"{self.name}-{os.getpid()}-{int(time.time() * 1000)}.prof")
+            self.profiler.dump_stats(prof_path)
+            self.attrs['cprofile'] = prof_path
+        if self.mem_start is not None:
+            current, peak = tracemalloc.get_traced_memory()
+            peak = max(self.mem_peak, peak)
+            self.attrs['mem_delta_bytes'] = current - self.mem_start
+            self.attrs['mem_peak_bytes'] = peak
+            stack = tracer.local.mem_spans
+            stack.pop()
+            if stack:
+                stack[-1].mem_peak = max(stack[-1].mem_peak, peak)
+        if exc_type is not None:
+            self.attrs['error'] = exc_type.__name__
+        tracer.record(self.name, self.start, end - self.start, self.attrs)
+        return False
+
+
+def span(name, **attrs):
+    """Context manager timing a block of code. Does nothing unless tracing is enabled."""
+    if _tracer is None:
+        return _NULL_SPAN
+    return _Span(_tracer, name, attrs)
+
+
+def traced(name=None):
+    """Decorator wrapping every call of a function in a span (named after the function by default)."""
+    def decorator(fn):
+        span_name = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return fn(*args, **kwargs)
+            with _Span(_tracer, span_name, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def is_enabled():
+    return _tracer is not None
+
+
+def enable(path=None, fmt=None, profile=None, profile_spans=None, report=True):
+    """Start recording spans; the trace is written and a summary printed at exit (or on disable())."""
+    global _tracer
+    _tracer = Tracer(path, fmt, profile, profile_spans)
+    if report:
+        atexit.register(_finish_at_exit, _tracer)
+    return _tracer
+
+
+def disable(report=True):
+    """Stop recording, write the trace file and return the summary."""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    if tracer is None:
+        return {}
+    return _finish(tracer, report)
+
+
+def _finish(tracer, report):
+    if tracer.started_tracemalloc:
+        tracemalloc.stop()
+    tracer.write()
+    stats = summarize(tracer.events)
+    if report:
+        print_summary(stats, file=sys.stderr)
+        if tracer.path:
+            print(f"Trace written to {tracer.path}", file=sys.stderr)
+    return stats
+
+
+def _finish_at_exit(tracer):
+    # Skip tracers that were already disabled or replaced, and forked child processes
+    if _tracer is tracer and tracer.pid == os.getpid():
+        _finish(tracer, report=True)
+
+
+def _percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(round(q / 100 * (len(sorted_values) - 1))))]
+
+
+def summarize(events):
+    """Aggregate span events by name: count, total, mean, p50, p95 and max duration in seconds."""
+    durations = {}
+    for e in events:
+        durations.setdefault(e['name'], []).append(e['duration_s'])
+    stats = {}
+    for name, values in durations.items():
+        values.sort()
+        stats[name] = {
+            'count': len(values),
+            'total_s': sum(values),
+            'mean_s': sum(values) / len(values),
+            'p50_s': _percentile(values, 50),
+            'p95_s': _percentile(values, 95),
+            'max_s': values[-1],
+        }
+    return dict(sorted(stats.items(), key=lambda kv: -kv[1]['total_s']))
+
+
+def print_summary(stats, file=None):
+    file = file or sys.stdout
+    print(f"{'span':<32} {'count':>8} {'total_s':>10} {'mean_ms':>10} {'p50_ms':>10} {'p95_ms':>10} {'max_ms':>10}", file=file)
+    for name, s in stats.items():
+        print(f"{name:<32} {s['count']:>8} {s['total_s']:>10.3f} {s['mean_s'] * 1e3:>10.2f} "
+              f"{s['p50_s'] * 1e3:>10.2f} {s['p95_s'] * 1e3:>10.2f} {s['max_s'] * 1e3:>10.2f}", file=file)
+
+
+def load_events(path):
+    """Read span events back from a JSONL or Chrome trace file."""
+    with open(path, 'r') as f:
+        if path.endswith('.json'):
+            return [{'name': e['name'], 'start_s': e['ts'] / 1e6, 'duration_s': e['dur'] / 1e6,
+                     'pid': e['pid'], 'tid': e['tid'], 'args': e.get('args', {})}
+                    for e in json.load(f)['traceEvents'] if e.get('ph') == 'X']
+        return [json.loads(line) for line in f if line.strip()]
+
+
+if os.getenv('MMBELIEFS_TRACE') or os.getenv('MMBELIEFS_PROFILE'):
+    enable(
+        path=os.getenv('MMBELIEFS_TRACE') or None,
+        profile=os.getenv('MMBELIEFS_PROFILE') or None,
+        profile_spans=[s for s in os.getenv('MMBELIEFS_PROFILE_SPANS', '').split(',') if s],
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Summarize a span trace file')
+    parser.add_argument('trace_path', type=str)
+    args = parser.parse_args()
+    print_summary(summarize(load_events(args.trace_path)))
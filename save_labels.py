@@ -10,36 +10,26 @@ The labeling process has already been performed, you don't need to reuse this sc
 
 import json
 import os
-
-label_cats = {}
-all_files = []
-for subdir in os.listdir('./LABELS'):
-    print(subdir)
-    label_cats[subdir] = os.listdir(f'./LABELS/{subdir}')
-    all_files += label_cats[subdir]
-all_files = list(set(all_files))
-
-file_to_cats = {}
-for file in all_files:
-    file_to_cats[file] = []
-    for subdir in label_cats:
-        if file in label_cats[subdir]:
-            file_to_cats[file].append(subdir)
-
-only_other = []
-for k,v in file_to_cats.items():
-    if len(v) == 1 and v[0] == 'other':
-        only_other.append(k)
-assert len(only_other) == 0, "There are some images that are only labeled as other"
-
-file_to_cats = {}
-for file in all_files:
-    file_to_cats[file] = []
-    for subdir in label_cats:
-        if file in label_cats[subdir]:
-            if subdir != 'other':
-                file_to_cats[file].append(subdir)
-
-os.makedirs('assets', exist_ok=True)
-with open(os.path.join('assets', 'image_labels.json'), 'w') as f:
-    json.dump(file_to_cats, f, indent=4)
+import argparse
+from label_index import LabelIndex
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--labels_dir", type=str, default="LABELS")
+    parser.add_argument("--snapshot_path", type=str, default=".label_index.json",
+                        help="Snapshot used to rescan only label directories that changed")
+    parser.add_argument("--output_path", type=str, default=os.path.join('assets', 'image_labels.json'))
+    args = parser.parse_args()
+
+    index = LabelIndex()
+    rescanned = index.sync(args.labels_dir, snapshot_path=args.snapshot_path)
+    print(f"Rescanned {len(rescanned)} of {len(index.labels())} label directories: {', '.join(rescanned)}")
+    for label, count in index.label_counts().items():
+        print(f"{label}: {count}")
+
+    only_other = index.files_with_only(['other'])
+    assert len(only_other) == 0, "There are some images that are only labeled as other"
+
+    os.makedirs(os.path.dirname(args.output_path) or '.', exist_ok=True)
+    with open(args.output_path, 'w') as f:
+        json.dump(index.to_dict(), f, indent=4)
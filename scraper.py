@@ -1,6 +1,9 @@
+import re
 import time
 import json
+import asyncio
 from playwright.sync_api import sync_playwright
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.firefox.service import Service
@@ -10,11 +13,20 @@ from selenium.common.exceptions import ElementClickInterceptedException
 from bs4 import BeautifulSoup
 import tqdm
 import os
+import argparse
 import requests
+from profiling import span, traced
 
 driver_path = "/snap/bin/geckodriver"
-options = webdriver.FirefoxOptions()
-driver = webdriver.Firefox(service=Service(executable_path=driver_path), options=options)
+
+# Selectors of the database page used by the partitioned crawl. The card selector is the one get_card_info
+# parses; the filter markup is assumed (not verified against the live page): one FILTER_GROUP_SELECTOR
+# element per facet, holding a <p> with the facet name followed by its MuiChip-root chips. If the page
+# differs, crawl_partitioned fails with an error naming the selector and the unpartitioned crawl still works.
+CARD_SELECTOR = 'div.list-item-wrapper'
+SEE_MORE_SELECTOR = 'button:has-text("See More")'
+FILTER_GROUP_SELECTOR = 'div.filter-wrapper'
+FILTER_WAIT_MS = 30000
 
 def save_results(results, fn='results.json'):
     with open(fn, 'w') as f:
@@ -29,6 +41,9 @@ def get_content(url, headless=False, fn='results.json'):
     #     options.add_argument("--headless")
     # options.add_argument("--no-sandbox")
 
+    # Created here rather than at import time so the parsing helpers can be imported without a browser
+    options = webdriver.FirefoxOptions()
+    driver = webdriver.Firefox(service=Service(executable_path=driver_path), options=options)
     driver.get(url)
 
     # Wait for initial page load
@@ -121,7 +136,124 @@ def get_card_info(html):
         res['images'] = res_image_urls
     return results
 
-def scrape_gpahe_symbols(fn='results.json'):
+def facet_values(html, facet):
+    """Values of the filter chips of a facet (e.g. 'Ideology') on the database page."""
+    soup = BeautifulSoup(html, 'html.parser')
+    for group in soup.select(FILTER_GROUP_SELECTOR):
+        name = group.find('p')
+        if name is not None and name.text.strip() == facet:
+            return list(dict.fromkeys(chip.text.strip() for chip in group.select('div.MuiChip-root')))
+    return []
+
+def merge_results(partitions):
+    """
+    Merge the card lists of several partitions into one, deduplicating by title.
+    List fields (chips, images) are unioned in order of appearance; other fields keep the first value.
+    """
+    merged = {}
+    for cards in partitions:
+        for card in cards:
+            if card['title'] not in merged:
+                merged[card['title']] = {k: list(v) if isinstance(v, list) else v for k, v in card.items()}
+                continue
+            existing = merged[card['title']]
+            for key, value in card.items():
+                if key not in existing:
+                    existing[key] = list(value) if isinstance(value, list) else value
+                elif isinstance(value, list) and isinstance(existing[key], list):
+                    existing[key] += [v for v in value if v not in existing[key]]
+    return list(merged.values())
+
+async def load_all_cards(page, settle_ms=3000, max_steps=10000):
+    """Click "See More" until it disappears or stops adding cards; returns the parsed cards."""
+    for _ in range(max_steps):
+        button = page.locator(SEE_MORE_SELECTOR)
+        if await button.count() == 0:
+            break
+        num_cards = await page.locator(CARD_SELECTOR).count()
+        await button.first.scroll_into_view_if_needed()
+        await button.first.click()
+        try:
+            await page.wait_for_function(f"n => document.querySelectorAll({json.dumps(CARD_SELECTOR)}).length > n",
+                                         arg=num_cards, timeout=settle_ms)
+        except PlaywrightTimeoutError:
+            break  # No new cards loaded
+    return get_card_info(await page.content())
+
+async def crawl_partition(browser, url, facet, value, settle_ms=3000):
+    """Crawl the cards matching one filter chip in a separate browser context."""
+    context = await browser.new_context()
+    try:
+        page = await context.new_page()
+        await page.goto(url)
+        await page.wait_for_selector(FILTER_GROUP_SELECTOR)
+        group = page.locator(FILTER_GROUP_SELECTOR).filter(has=page.locator('p', has_text=facet))
+        chip = group.locator('div.MuiChip-root').filter(has_text=re.compile(rf'^\s*{re.escape(value)}\s*$'))
+        await chip.first.click()
+        await page.wait_for_timeout(settle_ms)  # Let the filtered list render
+        return await load_all_cards(page, settle_ms=settle_ms)
+    finally:
+        await context.close()
+
+async def crawl_partitioned(url, facets=('Ideology',), max_contexts=4, headless=True, settle_ms=3000,
+                            browser_type='firefox', max_attempts=3):
+    """
+    Crawl the database split by the filter chips of the given facets, up to max_contexts partitions
+    at a time, each in its own browser context. Cards in several partitions are merged by title.
+    Cards without any chip of these facets are not reached; partitioning by several facets narrows that gap.
+    The filter markup is assumed (see FILTER_GROUP_SELECTOR); a page without it raises RuntimeError.
+    A failing partition is retried up to max_attempts times; if any still fails, RuntimeError is raised
+    rather than returning a crawl missing its cards.
+    Returns (results, stats) where stats has the card count and attempts of every partition.
+    """
+    async with async_playwright() as p:
+        browser = await getattr(p, browser_type).launch(headless=headless)
+        try:
+            page = await browser.new_page()
+            await page.goto(url)
+            try:
+                await page.wait_for_selector(FILTER_GROUP_SELECTOR, timeout=FILTER_WAIT_MS)
+            except PlaywrightTimeoutError:
+                raise RuntimeError(f"No filter groups matching {FILTER_GROUP_SELECTOR!r} on {url}; the page markup "
+                                   f"differs from what the partitioned crawl assumes, crawl without --partition_by")
+            html = await page.content()
+            await page.close()
+            partitions = [(facet, value) for facet in facets for value in facet_values(html, facet)]
+            if not partitions:
+                raise RuntimeError(f"No filter chips matching {FILTER_GROUP_SELECTOR!r} found for facets "
+                                   f"{', '.join(facets)} on {url}")
+            print(f"Crawling {len(partitions)} partitions with up to {max_contexts} browser contexts")
+
+            semaphore = asyncio.Semaphore(max_contexts)
+            stats = {}
+
+            async def run(facet, value):
+                async with semaphore:
+                    start = time.time()
+                    for attempt in range(1, max_attempts + 1):
+                        try:
+                            cards = await crawl_partition(browser, url, facet, value, settle_ms=settle_ms)
+                            break
+                        except Exception as e:
+                            print(f"Error crawling {facet}={value} (attempt {attempt}/{max_attempts}): {e}")
+                            stats[f"{facet}={value}"] = {'error': str(e), 'attempts': attempt}
+                    else:
+                        return []
+                    stats[f"{facet}={value}"] = {'cards': len(cards), 'attempts': attempt,
+                                                 'duration_s': time.time() - start}
+                    print(f"{facet}={value}: {len(cards)} cards in {time.time() - start:.1f}s")
+                    return cards
+
+            partition_results = await asyncio.gather(*(run(facet, value) for facet, value in partitions))
+        finally:
+            await browser.close()
+    failed = [name for name, s in stats.items() if 'error' in s]
+    if failed:
+        raise RuntimeError(f"{len(failed)} of {len(stats)} partitions failed after {max_attempts} attempts: "
+                           + '; '.join(f"{name}: {stats[name]['error']}" for name in failed))
+    return merge_results(partition_results), stats
+
+def scrape_gpahe_symbols(fn='results.json', partition_by=None, max_contexts=4):
     with sync_playwright() as p:
         browser = p.firefox.launch(headless=False)
         # browser = p.chromium.launch(headless=False)
@@ -155,11 +287,25 @@ def scrape_gpahe_symbols(fn='results.json'):
             print("❌ Unexpected page structure.")
             return
 
-        print("Getting content...")
-        results = get_content(content_page_url, headless=True, fn=fn)
-        browser.close()
+        if partition_by:
+            browser.close()
+        else:
+            print("Getting content...")
+            results = get_content(content_page_url, headless=True, fn=fn)
+            browser.close()
+            return results
+
+    # The async crawl runs outside the sync Playwright session, which owns its own event loop
+    print(f"Getting content partitioned by {', '.join(partition_by)}...")
+    with span('crawl_partitioned'):
+        results, stats = asyncio.run(crawl_partitioned(content_page_url, facets=partition_by,
+                                                       max_contexts=max_contexts))
+    print(f"Merged {sum(s['cards'] for s in stats.values())} cards from {len(stats)} partitions "
+          f"into {len(results)} unique cards")
+    save_results(results, fn=fn)
     return results
 
+@traced()
 def download_images(results, images_dir='images', output_fn='results_with_images.json'):
     os.makedirs(images_dir, exist_ok=True)
 
@@ -167,7 +313,8 @@ def download_images(results, images_dir='images', output_fn='results_with_images
         images = result['images']
         for img_index, image in enumerate(images):
             try:
-                response = requests.get(image)
+                with span('download_image', url=image):
+                    response = requests.get(image)
                 response.raise_for_status()  # Raise an exception for bad status codes
                 
                 # Try to get content type from headers, default to 'png' if not found
@@ -193,5 +340,16 @@ def download_images(results, images_dir='images', output_fn='results_with_images
         json.dump(results, f, indent=4)
 
 if __name__ == "__main__":
-    results = scrape_gpahe_symbols(fn='results.json')
-    download_images(results, images_dir='images', output_fn='results_with_images.json')
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--results_path", type=str, default="results.json")
+    parser.add_argument("--images_dir", type=str, default="images")
+    parser.add_argument("--output_path", type=str, default="results_with_images.json")
+    parser.add_argument("--partition_by", type=str, nargs='*', default=None,
+                        help="Crawl the database split by these filter facets (e.g. Ideology Location) in parallel")
+    parser.add_argument("--max_contexts", type=int, default=4,
+                        help="Browser contexts crawling partitions at the same time")
+    args = parser.parse_args()
+
+    results = scrape_gpahe_symbols(fn=args.results_path, partition_by=args.partition_by,
+                                   max_contexts=args.max_contexts)
+    download_images(results, images_dir=args.images_dir, output_fn=args.output_path)
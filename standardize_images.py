@@ -1,13 +1,16 @@
 import json
 import argparse
 from PIL import Image
-import cairosvg
 from datasets import Dataset, DatasetDict
 from huggingface_hub import create_repo, delete_repo
 import os
 import shutil
 import numpy as np
+import image_dedup
+import svg_rasterizer
+from profiling import span, traced
 
+@traced()
 def compress_image(in_path, max_size_mb=5):
     quality = 95
     MAX_SIZE_BYTES = max_size_mb * 1024 * 1024
@@ -68,11 +71,30 @@ def resize_with_padding(im_path, images_output_dir, target_size=(448, 448), fill
     The other dimension will be padded if needed to reach the target size.
     No cropping is performed.
     """
+    return resize_with_padding_multi(im_path, [(target_size, images_output_dir)], fill_color=fill_color)[0]
+
+@traced('resize_with_padding')
+def resize_with_padding_multi(im_path, outputs, fill_color=None):
+    """
+    Like resize_with_padding, for several (target_size, images_output_dir) outputs from a single decode.
+    Sizes are produced from largest to smallest, each downscaled from the previous scaled image when it
+    is large enough, so the full-size original is only resampled once.
+    Returns the output paths in the order of outputs.
+    """
     img = Image.open(im_path)
-    if img.size == target_size:
+    img.load()  # The source may be overwritten by one of the outputs
+    output_paths = {}
+
+    pending = []
+    for target_size, images_output_dir in outputs:
         output_path = os.path.join(images_output_dir, os.path.basename(im_path))
-        img.save(output_path)
-        return output_path
+        if img.size == tuple(target_size):
+            img.save(output_path)
+            output_paths[tuple(target_size), images_output_dir] = output_path
+        else:
+            pending.append((tuple(target_size), images_output_dir, output_path))
+    if not pending:
+        return [output_paths[tuple(size), out_dir] for size, out_dir in outputs]
     
     # If fill_color is not specified, choose it based on image content
     if fill_color is None and (img.mode == 'RGBA' or img.mode == 'LA'):
@@ -91,40 +113,116 @@ def resize_with_padding(im_path, images_output_dir, target_size=(448, 448), fill
             background.paste(img.convert('L'), mask=img.split()[1])
         img = background
     
-    # Calculate scaling ratios for both dimensions
-    ratio_w = target_size[0] / img.size[0]
-    ratio_h = target_size[1] / img.size[1]
-    # Use the smaller ratio to ensure the image fits in the target size
-    # This will scale up small images and scale down large images
-    ratio = min(ratio_w, ratio_h)
-    
-    new_size = tuple(int(dim * ratio) for dim in img.size)
-    img = img.resize(new_size, Image.Resampling.LANCZOS)
-    
-    new_img = Image.new("RGB", target_size, fill_color)
-    left = (target_size[0] - new_size[0]) // 2
-    top = (target_size[1] - new_size[1]) // 2
-    new_img.paste(img, (left, top))
-    
-    output_path = os.path.join(images_output_dir, os.path.basename(im_path))
-    new_img.save(output_path)
-    return output_path
+    scaled = img
+    for target_size, images_output_dir, output_path in sorted(pending, key=lambda p: -p[0][0] * p[0][1]):
+        # Calculate scaling ratios for both dimensions
+        ratio_w = target_size[0] / img.size[0]
+        ratio_h = target_size[1] / img.size[1]
+        # Use the smaller ratio to ensure the image fits in the target size
+        # This will scale up small images and scale down large images
+        ratio = min(ratio_w, ratio_h)
+        
+        new_size = tuple(int(dim * ratio) for dim in img.size)
+        # Downscale from the previous (larger) output when possible rather than from the original
+        source = scaled if scaled.size[0] >= new_size[0] and scaled.size[1] >= new_size[1] else img
+        scaled = source.resize(new_size, Image.Resampling.LANCZOS)
+        
+        new_img = Image.new("RGB", target_size, fill_color)
+        left = (target_size[0] - new_size[0]) // 2
+        top = (target_size[1] - new_size[1]) // 2
+        new_img.paste(scaled, (left, top))
+        
+        new_img.save(output_path)
+        output_paths[target_size, images_output_dir] = output_path
+    return [output_paths[tuple(size), out_dir] for size, out_dir in outputs]
+
+def resolution_name(target_size):
+    """'WxH' for a (width, height) size; a 'WxH' string is returned as is."""
+    if isinstance(target_size, str):
+        return target_size
+    return f"{target_size[0]}x{target_size[1]}"
+
+def parse_resolution(name):
+    width, height = name.lower().split('x')
+    return (int(width), int(height))
+
+def resolution_output_dir(images_output_dir, target_size):
+    """Directory for an additional resolution, e.g. images_std_336x336."""
+    return f"{images_output_dir.rstrip('/')}_{resolution_name(target_size)}"
+
+def resolution_results_path(results_output_path, target_size):
+    """Manifest for an additional resolution, e.g. results_with_images_std_336x336.json."""
+    stem, ext = os.path.splitext(results_output_path)
+    return f"{stem}_{resolution_name(target_size)}{ext}"
+
+@traced()
+def flag_duplicate_images(results, max_distance=image_dedup.DEFAULT_MAX_DISTANCE, hash_index_path=None):
+    """
+    Find near-duplicate standardized images across all results using a perceptual-hash index.
+    Each item containing duplicates gets a 'duplicate_of' dict mapping its duplicate image paths
+    to the canonical (first-seen) image path. Returns the list of duplicate groups.
+    """
+    image_paths = list(dict.fromkeys(p for item in results for p in item['images']))
+    cache = image_dedup.load_hash_index(hash_index_path) if hash_index_path else None
+    hashes = image_dedup.compute_hashes(image_paths, cache=cache)
+    if hash_index_path:
+        image_dedup.save_hash_index(hashes, hash_index_path)
+
+    groups = image_dedup.find_duplicate_groups(hashes, max_distance=max_distance)
+    canonical = image_dedup.duplicate_map(groups)
+    for item in results:
+        duplicate_of = {p: canonical[p] for p in item['images'] if p in canonical}
+        if duplicate_of:
+            item['duplicate_of'] = duplicate_of
+        else:
+            item.pop('duplicate_of', None)
+    return groups
+
+@traced()
+def prepare_dataset(results_input_path, results_output_path, images_output_dir, max_size_mb=5, verbose=False,
+                    dedup_max_distance=None, hash_index_path=None, target_sizes=((448, 448),),
+                    svg_timeout_s=svg_rasterizer.DEFAULT_TIMEOUT_S,
+                    svg_memory_limit_mb=svg_rasterizer.DEFAULT_MEMORY_LIMIT_MB,
+                    svg_cache_dir=svg_rasterizer.DEFAULT_CACHE_DIR, quarantine_path=None, num_workers=None):
+    """
+    Standardize all images of the scraped results. The first of target_sizes is written to
+    images_output_dir and results_output_path; every additional size gets its own directory and
+    results manifest (see resolution_output_dir and resolution_results_path).
+    SVGs are rasterized up front in sandboxed worker processes (see svg_rasterizer.py); those that
+    fail are dropped from their item and listed in the quarantine report.
+    """
+    target_sizes = [tuple(size) for size in target_sizes]
+    outputs = [(target_sizes[0], images_output_dir)]
+    outputs += [(size, resolution_output_dir(images_output_dir, size)) for size in target_sizes[1:]]
+    for _, output_dir in outputs[1:]:
+        os.makedirs(output_dir, exist_ok=True)
 
-def prepare_dataset(results_input_path, results_output_path, images_output_dir, max_size_mb=5, verbose=False):
     with open(results_input_path, "r") as f:
         results = json.load(f)
 
-    all_new_image_paths = []
+    def svg_output_path(image_path):
+        return images_output_dir + '/' + os.path.basename(image_path.replace('.svg', '.png'))
+
+    # Render SVGs straight to the largest output size; padding is still applied by resize_with_padding_multi
+    svg_paths = list(dict.fromkeys(p for item in results for p in item['images'] if p.endswith('.svg')))
+    with span('rasterize_svgs', count=len(svg_paths)):
+        report = svg_rasterizer.rasterize_svgs(
+            [(p, svg_output_path(p)) for p in svg_paths], max(target_sizes, key=lambda s: s[0] * s[1]),
+            num_workers=num_workers, timeout_s=svg_timeout_s, memory_limit_mb=svg_memory_limit_mb,
+            cache_dir=svg_cache_dir)
+    if quarantine_path:
+        svg_rasterizer.save_quarantine_report(report, quarantine_path)
+    if svg_paths:
+        print(f"Rasterized {len(report['rendered'])} SVGs ({len(report['cached'])} more from cache), "
+              f"quarantined {len(report['quarantined'])}.")
+
     for item in results:
         new_image_paths = []
         for image_path in item['images']:
-            # if SVG, convert to PNG
+            if image_path in report['quarantined']:
+                continue
             if image_path.endswith('.svg'):
-                if verbose:
-                    print(f"Converting {image_path} to PNG")
-                new_path = os.path.join(images_output_dir, os.path.basename(image_path.replace('.svg', '.png')))
-                cairosvg.svg2png(url=image_path, write_to=new_path)
-                new_image_paths.append(images_output_dir + '/' + os.path.basename(new_path))
+                new_image_paths.append(svg_output_path(image_path))
                 if verbose:
                     print(f"Converted {image_path} to {new_image_paths[-1]}")
             else:
@@ -135,14 +233,30 @@ def prepare_dataset(results_input_path, results_output_path, images_output_dir,
         item['images'] = new_image_paths
 
         for image_path in item['images']:
-            resize_with_padding(image_path, images_output_dir)
+            resize_with_padding_multi(image_path, outputs)
 
             if not check_valid_image_size(image_path):
                 print(f"Warning: Image {image_path} is > {max_size_mb}MB.")
+
+    if dedup_max_distance is not None:
+        groups = flag_duplicate_images(results, max_distance=dedup_max_distance, hash_index_path=hash_index_path)
+        print(f"Flagged {sum(len(g) - 1 for g in groups)} near-duplicate images in {len(groups)} groups.")
  
     with open(results_output_path, "w") as f:
         json.dump(results, f, indent=4)
 
+    for target_size, output_dir in outputs[1:]:
+        def relocate(image_path):
+            return output_dir + '/' + os.path.basename(image_path)
+        resolution_results = []
+        for item in results:
+            item = dict(item, images=[relocate(p) for p in item['images']])
+            if 'duplicate_of' in item:
+                item['duplicate_of'] = {relocate(k): relocate(v) for k, v in item['duplicate_of'].items()}
+            resolution_results.append(item)
+        with open(resolution_results_path(results_output_path, target_size), "w") as f:
+            json.dump(resolution_results, f, indent=4)
+
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
@@ -150,7 +264,25 @@ if __name__ == "__main__":
     parser.add_argument("--results_output_path", type=str, default="results_with_images_std.json")
     parser.add_argument("--images_output_dir", type=str, default="images_std")
     parser.add_argument("--max_size_mb", type=int, default=5)
+    parser.add_argument("--dedup_max_distance", type=int, default=None,
+                        help="Flag images within this perceptual-hash Hamming distance as duplicates")
+    parser.add_argument("--hash_index_path", type=str, default="image_hashes.json")
+    parser.add_argument("--target_sizes", type=str, nargs='+', default=["448x448"],
+                        help="Output resolutions; the first goes to --images_output_dir, others to <dir>_<WxH>")
+    parser.add_argument("--svg_timeout_s", type=float, default=svg_rasterizer.DEFAULT_TIMEOUT_S,
+                        help="Wall-clock limit for rasterizing a single SVG")
+    parser.add_argument("--svg_memory_limit_mb", type=int, default=svg_rasterizer.DEFAULT_MEMORY_LIMIT_MB,
+                        help="Memory limit of each SVG rasterization worker")
+    parser.add_argument("--svg_cache_dir", type=str, default=svg_rasterizer.DEFAULT_CACHE_DIR)
+    parser.add_argument("--quarantine_path", type=str, default="svg_quarantine.json",
+                        help="Report of SVGs that failed to rasterize")
+    parser.add_argument("--num_workers", type=int, default=None)
     args = parser.parse_args()
 
     os.makedirs(args.images_output_dir, exist_ok=True)
-    prepare_dataset(args.results_input_path, args.results_output_path, args.images_output_dir, args.max_size_mb)
+    prepare_dataset(args.results_input_path, args.results_output_path, args.images_output_dir, args.max_size_mb,
+                    dedup_max_distance=args.dedup_max_distance, hash_index_path=args.hash_index_path,
+                    target_sizes=[parse_resolution(size) for size in args.target_sizes],
+                    svg_timeout_s=args.svg_timeout_s, svg_memory_limit_mb=args.svg_memory_limit_mb,
+                    svg_cache_dir=args.svg_cache_dir, quarantine_path=args.quarantine_path,
+                    num_workers=args.num_workers)
@@ -0,0 +1,205 @@
+"""
+Sandboxed rasterization of SVG images to PNG.
+
+Every SVG is rendered in its own worker process with a wall-clock timeout and an address-space
+cap, so a pathological file is killed instead of stalling or exhausting the whole stage. Up to
+num_workers renders run at once. SVGs are rendered straight to the target size (aspect ratio
+preserved, fitting inside it), and results are cached by SVG content hash so unchanged files
+are not rendered again. Files that fail, time out or exceed the memory cap are listed in a
+quarantine report instead of aborting the run.
+
+Usage:
+python3 svg_rasterizer.py --images_dir images --output_dir images_std --target_size 448 448
+# Outputs: PNGs in images_std/ and svg_quarantine.json
+"""
+
+import os
+import re
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import multiprocessing
+import multiprocessing.connection
+import xml.etree.ElementTree as ET
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; renders then run without a memory cap
+    resource = None
+
+DEFAULT_TIMEOUT_S = 30.0
+DEFAULT_MEMORY_LIMIT_MB = 1024
+DEFAULT_CACHE_DIR = '.svg_cache'
+
+
+def svg_size(svg_path):
+    """Intrinsic (width, height) of an SVG from its width/height attributes or viewBox; None if unknown."""
+    root = ET.parse(svg_path).getroot()
+
+    def length(value):
+        match = re.match(r'\s*([0-9.]+)\s*(px)?\s*$', value or '')
+        return float(match.group(1)) if match else None
+
+    width, height = length(root.get('width')), length(root.get('height'))
+    if width and height:
+        return width, height
+    view_box = re.split(r'[\s,]+', (root.get('viewBox') or '').strip())
+    if len(view_box) == 4:
+        vb_width, vb_height = float(view_box[2]), float(view_box[3])
+        if vb_width > 0 and vb_height > 0:
+            return vb_width, vb_height
+    return None
+
+
+def render_svg(svg_path, output_path, target_size):
+    """Render an SVG to a PNG that fits inside target_size with the SVG's aspect ratio."""
+    import cairosvg
+    size = svg_size(svg_path)
+    if size is None or size[0] / size[1] >= target_size[0] / target_size[1]:
+        cairosvg.svg2png(url=svg_path, write_to=output_path, output_width=target_size[0])
+    else:
+        cairosvg.svg2png(url=svg_path, write_to=output_path, output_height=target_size[1])
+
+
+def _address_space_bytes():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[0]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return 0
+
+
+def _render_worker(render_fn, svg_path, output_path, target_size, memory_limit_mb, conn):
+    if resource is not None and memory_limit_mb:
+        # The cap is on top of what the worker inherited from the parent
+        limit = _address_space_bytes() + memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    try:
+        render_fn(svg_path, output_path, target_size)
+        conn.send(None)
+    except MemoryError:
+        conn.send(f"Exceeded memory limit of {memory_limit_mb}MB")
+    except Exception as e:
+        conn.send(f"{type(e).__name__}: {e}")
+    finally:
+        conn.close()
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def rasterize_svgs(jobs, target_size=(448, 448), num_workers=None, timeout_s=DEFAULT_TIMEOUT_S,
+                   memory_limit_mb=DEFAULT_MEMORY_LIMIT_MB, cache_dir=DEFAULT_CACHE_DIR, render_fn=render_svg):
+    """
+    Rasterize (svg_path, output_path) jobs. Returns a report with the rendered and cached output
+    paths and a 'quarantined' dict of svg_path -> {'sha256', 'error'} for files that failed.
+    render_fn(svg_path, output_path, target_size) runs in a separate process per file.
+    """
+    num_workers = num_workers or os.cpu_count() or 1
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+    ctx = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else None)
+    report = {'rendered': [], 'cached': [], 'quarantined': {}}
+
+    def cache_path(sha256):
+        return os.path.join(cache_dir, f"{sha256}_{target_size[0]}x{target_size[1]}.png") if cache_dir else None
+
+    def quarantine(svg_path, sha256, error):
+        report['quarantined'][svg_path] = {'sha256': sha256, 'error': error}
+        print(f"Warning: quarantined {svg_path}: {error}")
+
+    def finish(task, error):
+        process, conn, svg_path, output_path, sha256, _ = task
+        conn.close()
+        process.join()
+        if error is None and (process.exitcode != 0 or not os.path.exists(output_path)):
+            error = f"Worker exited with code {process.exitcode} without rendering {output_path}"
+        if error is not None:
+            if os.path.exists(output_path):
+                os.remove(output_path)
+            quarantine(svg_path, sha256, error)
+            return
+        if cache_dir:
+            shutil.copyfile(output_path, cache_path(sha256))
+        report['rendered'].append(output_path)
+
+    pending = []
+    for svg_path, output_path in jobs:
+        try:
+            sha256 = file_sha256(svg_path)
+        except OSError as e:
+            quarantine(svg_path, None, f"Cannot read file: {e}")
+            continue
+        if cache_dir and os.path.exists(cache_path(sha256)):
+            shutil.copyfile(cache_path(sha256), output_path)
+            report['cached'].append(output_path)
+        else:
+            pending.append((svg_path, output_path, sha256))
+
+    running = []
+    while pending or running:
+        while pending and len(running) < num_workers:
+            svg_path, output_path, sha256 = pending.pop(0)
+            parent_conn, child_conn = ctx.Pipe(duplex=False)
+            process = ctx.Process(target=_render_worker, daemon=True,
+                                  args=(render_fn, svg_path, output_path, tuple(target_size), memory_limit_mb, child_conn))
+            process.start()
+            child_conn.close()
+            running.append((process, parent_conn, svg_path, output_path, sha256, time.monotonic() + timeout_s))
+
+        multiprocessing.connection.wait([task[1] for task in running], timeout=0.05)
+        still_running = []
+        for task in running:
+            process, conn, _, _, _, deadline = task
+            if conn.poll():
+                try:
+                    error = conn.recv()
+                except EOFError:  # Killed without reporting back, e.g. by the OS
+                    error = None
+                finish(task, error)
+            elif not process.is_alive():
+                finish(task, None)
+            elif time.monotonic() > deadline:
+                process.kill()
+                finish(task, f"Timed out after {timeout_s}s")
+            else:
+                still_running.append(task)
+        running = still_running
+    return report
+
+
+def save_quarantine_report(report, path):
+    with open(path, 'w') as f:
+        json.dump(report['quarantined'], f, indent=4)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rasterize SVG images in sandboxed worker processes')
+    parser.add_argument('--images_dir', type=str, default='images')
+    parser.add_argument('--output_dir', type=str, default='images_std')
+    parser.add_argument('--target_size', type=int, nargs=2, default=[448, 448])
+    parser.add_argument('--num_workers', type=int, default=None)
+    parser.add_argument('--timeout_s', type=float, default=DEFAULT_TIMEOUT_S)
+    parser.add_argument('--memory_limit_mb', type=int, default=DEFAULT_MEMORY_LIMIT_MB)
+    parser.add_argument('--cache_dir', type=str, default=DEFAULT_CACHE_DIR)
+    parser.add_argument('--quarantine_path', type=str, default='svg_quarantine.json')
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    jobs = [(os.path.join(args.images_dir, name), os.path.join(args.output_dir, name[:-len('.svg')] + '.png'))
+            for name in sorted(os.listdir(args.images_dir)) if name.lower().endswith('.svg')]
+    report = rasterize_svgs(jobs, args.target_size, args.num_workers, args.timeout_s, args.memory_limit_mb,
+                            args.cache_dir)
+    save_quarantine_report(report, args.quarantine_path)
+    print(f"Rendered {len(report['rendered'])}, cached {len(report['cached'])}, "
+          f"quarantined {len(report['quarantined'])} of {len(jobs)} SVGs")
+
+if __name__ == "__main__":
+    main()
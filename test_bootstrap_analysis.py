@@ -0,0 +1,56 @@
+import os
+import json
+import time
+import numpy as np
+from bootstrap_analysis import (analyze, bootstrap_accuracies, correctness_matrix, find_sample_files, load_samples,
+                                resample_counts, slice_matrix)
+
+def test_matches_naive_bootstrap():
+    rng = np.random.default_rng(1)
+    correct = (rng.random((3, 200)) < [[0.8], [0.5], [0.5]]).astype(float)
+    docs = [{'locations': ['Germany' if j % 3 else 'India'], 'image_labels': ['logo'] if j % 2 else [],
+             'superset_correct_answers': ['Nazi']} for j in range(200)]
+    names, membership = slice_matrix(docs)
+    assert names == ['all', 'ideology:Nazi', 'label:logo', 'location:Germany', 'location:India']
+
+    counts = resample_counts(200, 50, seed=3)
+    assert (counts.sum(axis=1) == 200).all()
+    boot = bootstrap_accuracies(correct, membership, counts)
+    # Same resamples evaluated one at a time
+    indices = np.random.default_rng(3).integers(0, 200, size=(50, 200))
+    for b in [0, 17, 49]:
+        for s in range(len(names)):
+            drawn = indices[b][membership[s, indices[b]]]
+            assert np.allclose(boot[b, s], correct[:, drawn].mean(axis=1), atol=1e-6)
+
+    report = analyze(['good', 'a', 'b'], correct, names, membership, num_resamples=500)
+    assert report == analyze(['good', 'a', 'b'], correct, names, membership, num_resamples=500)
+    overall = report['slices']['all']
+    assert overall['models']['good']['ci_low'] < overall['models']['good']['accuracy'] < overall['models']['good']['ci_high']
+    assert overall['pairs']['good vs a']['p_value'] < 0.01
+    assert overall['pairs']['a vs b']['p_value'] > 0.01
+
+def test_load_samples(tmp_path):
+    for model, scores in [('m1', [1, 0, 1]), ('m2', [0, 0])]:
+        with open(tmp_path / f'{model}.jsonl', 'w') as f:
+            for doc_id, score in enumerate(scores):
+                f.write(json.dumps({'doc_id': doc_id, 'doc': {}, 'exact_match': score}) + '\n')
+    samples = {m: load_samples(tmp_path / f'{m}.jsonl') for m in ['m1', 'm2']}
+    models, doc_ids, correct = correctness_matrix(samples)
+    assert doc_ids == [0, 1] and correct.tolist() == [[1, 0], [0, 0]]
+
+def test_find_sample_files_keeps_tasks_apart(tmp_path):
+    paths = {}
+    for model, name in [('m1', '20250101_samples_mmbeliefs_mcq_val.jsonl'),
+                        ('m1', '20250102_samples_mmbeliefs_mcq_val_local.jsonl'),
+                        ('m2', '20250101_samples_mmbeliefs_mcq_val_local.jsonl')]:
+        path = tmp_path / model / 'run' / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text('')
+        paths[(model, name)] = str(path)
+    # The newer _local file of m1 must not replace its Hub task samples
+    os.utime(paths[('m1', '20250102_samples_mmbeliefs_mcq_val_local.jsonl')], (time.time() + 10, time.time() + 10))
+    assert find_sample_files(str(tmp_path)) == {'m1': paths[('m1', '20250101_samples_mmbeliefs_mcq_val.jsonl')]}
+    assert find_sample_files(str(tmp_path), 'mmbeliefs_mcq_val_local') == {
+        'm1': paths[('m1', '20250102_samples_mmbeliefs_mcq_val_local.jsonl')],
+        'm2': paths[('m2', '20250101_samples_mmbeliefs_mcq_val_local.jsonl')]}
@@ -0,0 +1,41 @@
+import os
+import json
+from PIL import Image
+from datasets import load_from_disk
+from create_hfdataset import prepare_dataset, save_dataset_to_disk
+
+
+def make_task_data(tmp_path, colors):
+    task_data = []
+    for i, color in enumerate(colors):
+        image_path = str(tmp_path / f'{i}.png')
+        Image.new('RGB', (8, 8), color).save(image_path)
+        task_data.append({'question': f'Question {i}', 'image_path': image_path,
+                          'superset_correct_answers': json.dumps(['Nazi'])})
+    return task_data
+
+
+def test_save_to_disk_round_trip(tmp_path):
+    path = str(tmp_path / 'mmbeliefs_mcq_local')
+    save_dataset_to_disk(prepare_dataset(make_task_data(tmp_path, ['red', 'blue'])), path)
+    first = load_from_disk(path)['validation']
+    assert first['question'] == ['Question 0', 'Question 1']
+    assert first[1]['image'].convert('RGB').getpixel((0, 0)) == (0, 0, 255)
+
+    # Replacing the copy repoints the symlink and removes the previous copy; an open copy stays readable
+    save_dataset_to_disk(prepare_dataset(make_task_data(tmp_path, ['green'])), path)
+    assert os.path.islink(path)
+    assert sorted(p.name for p in tmp_path.iterdir() if p.is_dir()) == \
+        sorted(['mmbeliefs_mcq_local', os.path.basename(os.path.realpath(path))])
+    assert load_from_disk(path)['validation']['question'] == ['Question 0']
+    assert first['question'] == ['Question 0', 'Question 1']
+
+
+def test_save_to_disk_replaces_a_plain_directory(tmp_path):
+    # Copies saved before path was a symlink are swapped out once
+    path = str(tmp_path / 'mmbeliefs_mcq_local')
+    prepare_dataset(make_task_data(tmp_path, ['red'])).save_to_disk(path)
+    save_dataset_to_disk(prepare_dataset(make_task_data(tmp_path, ['green', 'blue'])), path)
+    assert os.path.islink(path)
+    assert len(load_from_disk(path)['validation']) == 2
+    assert len([p for p in tmp_path.iterdir() if p.is_dir()]) == 2
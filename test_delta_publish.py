@@ -0,0 +1,121 @@
+import os
+import glob
+import pytest
+from PIL import Image
+from datasets import load_dataset
+from delta_publish import LocalRepo, publish_delta, image_columns, MANIFEST_FILENAME, ROW_ID_COLUMN
+
+def _task_data(images_dir, num_rows):
+    task_data = []
+    for i in range(num_rows):
+        image_path = os.path.join(images_dir, f'{i}_0.png')
+        Image.new('RGB', (32, 32), (i % 256, 0, 0)).save(image_path)
+        task_data.append({'question': f'Question {i}', 'answer_target': 'ABC'[i % 3], 'image_path': image_path,
+                          'candidate_answers': ['a', 'b', 'c', 'None of the above'],
+                          'image_labels': ['logo'] if i % 2 else None})
+    return task_data
+
+def test_only_changed_shards_are_uploaded(tmp_path):
+    images_dir = os.path.join(tmp_path, 'images_std')
+    os.makedirs(images_dir)
+    task_data = _task_data(images_dir, 40)
+    repo = LocalRepo(os.path.join(tmp_path, 'repo'))
+
+    report = publish_delta(task_data, repo, num_shards=4)
+    assert report['changed_shards'] == 4
+    assert report['saved_bytes'] == 0
+    first_revision = report['revision']
+
+    # Nothing changed: no commit, nothing uploaded
+    report = publish_delta(task_data, repo, num_shards=4)
+    assert report['changed_shards'] == 0 and report['uploaded_bytes'] == 0
+    assert report['revision'] == first_revision
+
+    # One edited row changes exactly the shard that held it and the one it moves to (possibly the same)
+    task_data[5]['question'] = 'Edited question'
+    report = publish_delta(task_data, repo, num_shards=4)
+    assert 1 <= report['changed_shards'] <= 2
+    assert report['saved_bytes'] > 0
+    assert report['revision'] != first_revision
+
+    # The published revision loads as a regular parquet dataset with every row
+    shard_paths = sorted(glob.glob(os.path.join(repo.current, 'data', 'validation-*.parquet')))
+    dataset = load_dataset('parquet', data_files={'validation': shard_paths})['validation']
+    assert len(dataset) == 40
+    assert 'Edited question' in dataset['question']
+    assert len(set(dataset[ROW_ID_COLUMN])) == 40
+    assert dataset[0]['image'].size == (32, 32)
+    assert os.path.exists(os.path.join(repo.current, MANIFEST_FILENAME))
+
+    # Inserting and removing rows does not touch the shards of the other rows
+    new_row = _task_data(images_dir, 41)[40]
+    report = publish_delta([new_row] + task_data[:10] + task_data[11:], repo, num_shards=4)
+    assert 1 <= report['changed_shards'] <= 2
+
+def test_stale_parent_revision_is_rejected(tmp_path):
+    images_dir = os.path.join(tmp_path, 'images_std')
+    os.makedirs(images_dir)
+    repo = LocalRepo(os.path.join(tmp_path, 'repo'))
+    publish_delta(_task_data(images_dir, 4), repo, num_shards=2)
+    with pytest.raises(RuntimeError):
+        repo.commit({}, [], 'concurrent publish', parent_revision=None)
+
+def test_relative_root(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('images_std')
+    task_data = _task_data('images_std', 8)
+    repo = LocalRepo('./hf_local_repo')
+    publish_delta(task_data, repo, num_shards=2)
+    task_data[0]['question'] = 'Edited question'
+    report = publish_delta(task_data, LocalRepo('./hf_local_repo'), num_shards=2)
+    assert 1 <= report['changed_shards'] <= 2
+    assert os.path.exists(os.path.join('hf_local_repo', 'current', MANIFEST_FILENAME))
+
+OLD_CARD = '''---
+dataset_info:
+  features:
+  - name: question
+    dtype: string
+  - name: image
+    dtype: image
+  splits:
+  - name: validation
+    num_bytes: 3
+    num_examples: 1
+configs:
+- config_name: default
+  data_files:
+  - split: validation
+    path: data/validation-*
+---
+# MMBeliefs MCQ
+'''
+
+def test_first_delta_publish_replaces_a_full_publish(tmp_path):
+    images_dir = os.path.join(tmp_path, 'images_std')
+    os.makedirs(images_dir)
+    repo = LocalRepo(os.path.join(tmp_path, 'repo'))
+    # A repo as left by push_to_hub: one data file, a card describing its schema and no manifest
+    old_shard, old_card = os.path.join(tmp_path, 'old.parquet'), os.path.join(tmp_path, 'README.md')
+    open(old_shard, 'wb').write(b'old')
+    open(old_card, 'w').write(OLD_CARD)
+    repo.commit({'data/validation-00000-of-00001.parquet': old_shard, 'README.md': old_card}, [], 'push_to_hub')
+
+    report = publish_delta(_task_data(images_dir, 4), repo, num_shards=2)
+    assert report['deleted_shards'] == 1
+    files = os.listdir(os.path.join(repo.current, 'data'))
+    assert 'validation-00000-of-00001.parquet' not in files
+    card = open(os.path.join(repo.current, 'README.md')).read()
+    assert '# MMBeliefs MCQ' in card and ROW_ID_COLUMN in card and 'num_examples' not in card
+
+    # The snapshot loads as a Hub dataset repo would, through its card
+    dataset = load_dataset(repo.current)['validation']
+    assert len(dataset) == 4 and ROW_ID_COLUMN in dataset.column_names
+
+    # An unchanged card is not re-uploaded
+    revision = repo.revision()
+    assert publish_delta(_task_data(images_dir, 4), repo, num_shards=2)['revision'] == revision
+
+def test_resolution_columns():
+    columns = image_columns({'image_path': 'images_std/1_0.png'}, ['336x336'])
+    assert columns == {'image': 'images_std/1_0.png', 'image_336x336': os.path.join('images_std_336x336', '1_0.png')}
@@ -0,0 +1,101 @@
+import os
+import sys
+import json
+import glob
+import subprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lmms-eval-files'))
+import mmbeliefs_mcq
+from mmbeliefs_mcq import (check_checkpoint_fingerprint, checkpoint_path, hub_dataset_path, prune_failed_responses,
+                           run_model_evaluation)
+
+CONFIG = {'lmms_model': 'openai_compatible', 'api_base': 'http://127.0.0.1:9/v1', 'model_version': 'org/model',
+          'api_key_env': None, 'output_dir': 'test_model'}
+
+def _write(path, responses):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(responses, f)
+
+def test_prune_failed_responses(tmp_path):
+    path = os.path.join(tmp_path, 'cache.json')
+    assert prune_failed_responses(path) == (0, 0)
+    _write(path, {'t___validation___0': 'A', 't___validation___1': '', 't___validation___2': '  ', 't___validation___3': None})
+    assert prune_failed_responses(path) == (1, 3)
+    assert json.load(open(path)) == {'t___validation___0': 'A'}
+    open(path, 'w').write('{"t___validation___0": "A", "t___valid')  # Interrupted write
+    assert prune_failed_responses(path) == (0, 0)
+
+def test_retry_resumes_failed_samples(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    calls = []
+
+    def fake_lmms_eval(cmd):
+        # First run: sample 1 fails and the process errors; second run only queries sample 1
+        cache = json.load(open(checkpoint_path(CONFIG))) if os.path.exists(checkpoint_path(CONFIG)) else {}
+        calls.append(sorted(cache))
+        cache.update({'mmbeliefs_mcq___validation___0': 'A', 'mmbeliefs_mcq___validation___1': 'B' if calls[1:] else ''})
+        _write(checkpoint_path(CONFIG), cache)
+        return 0 if calls[1:] else 256
+
+    monkeypatch.setattr(mmbeliefs_mcq.os, 'system', fake_lmms_eval)
+    assert run_model_evaluation('test', CONFIG, max_attempts=3, retry_wait_s=0, telemetry=False)
+    assert calls == [[], ['mmbeliefs_mcq___validation___0']]
+
+    monkeypatch.setattr(mmbeliefs_mcq.os, 'system', lambda cmd: 256)
+    assert not run_model_evaluation('test', CONFIG, max_attempts=2, retry_wait_s=0, telemetry=False)
+
+def test_checkpoint_discarded_when_dataset_changes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert not check_checkpoint_fingerprint(CONFIG, 'mmbeliefs_mcq', 'hub:repo@1')
+    _write(checkpoint_path(CONFIG), {'mmbeliefs_mcq___validation___0': 'A'})
+    assert not check_checkpoint_fingerprint(CONFIG, 'mmbeliefs_mcq', 'hub:repo@1')
+    assert os.path.exists(checkpoint_path(CONFIG))
+    assert check_checkpoint_fingerprint(CONFIG, 'mmbeliefs_mcq', 'hub:repo@2')
+    assert not os.path.exists(checkpoint_path(CONFIG))
+
+def test_hub_dataset_path():
+    assert hub_dataset_path() == 'Kamel0/mmbeliefs_mcq'
+
+def test_every_model_has_prices():
+    for name, config in mmbeliefs_mcq.MODEL_CONFIGS.items():
+        assert config.get('price_per_1m_input_tokens') is not None, name
+        assert config.get('price_per_1m_output_tokens') is not None, name
+
+def test_gemini_runs_are_recorded(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv('LMMS_EVAL_PLUGINS', raising=False)
+    monkeypatch.delenv('PYTHONPATH', raising=False)
+    config = dict(CONFIG, lmms_model='gemini_api', price_per_1m_input_tokens=1.0, price_per_1m_output_tokens=2.0)
+    runs = []
+
+    def fake_lmms_eval(cmd):
+        # gemini_telemetry writes the proxy's request log into the run directory
+        runs.append(cmd)
+        run_dir = os.environ.get(mmbeliefs_mcq.TELEMETRY_DIR_ENV)
+        if run_dir is None:
+            return 0
+        assert os.environ['LMMS_EVAL_PLUGINS'] == 'mmbeliefs_models'
+        with open(os.path.join(run_dir, 'requests.jsonl'), 'w') as f:
+            f.write(json.dumps({'start': 0, 'latency_s': 1.0, 'status': 200, 'attempt': 1, 'concurrency': 1,
+                                'prompt_tokens': 100, 'completion_tokens': 10}) + '\n')
+        return 0
+
+    monkeypatch.setattr(mmbeliefs_mcq.os, 'system', fake_lmms_eval)
+    assert run_model_evaluation('gemini', config, checkpoint=False)
+    assert '--model gemini_telemetry ' in runs[0]
+    assert mmbeliefs_mcq.TELEMETRY_DIR_ENV not in os.environ
+    [metrics_path] = glob.glob(os.path.join('mmbeliefs_mcq_results', 'test_model', 'telemetry', '*', 'metrics.json'))
+    metrics = json.load(open(metrics_path))
+    assert metrics['num_requests'] == 1 and abs(metrics['cost_usd'] - 120 / 1e6) < 1e-12
+
+    # Without telemetry the stock backend runs
+    assert run_model_evaluation('gemini', config, checkpoint=False, telemetry=False)
+    assert '--model gemini_api ' in runs[1]
+
+def test_runner_spans_are_real(tmp_path):
+    # Run from elsewhere, with only the runner's directory on the path, as `python3 mmbeliefs_mcq.py` does
+    code = ("import sys; sys.path.insert(0, sys.argv[1]); import mmbeliefs_mcq, profiling; "
+            "assert mmbeliefs_mcq.span is profiling.span, mmbeliefs_mcq.span")
+    runner_dir = os.path.dirname(mmbeliefs_mcq.__file__)
+    subprocess.run([sys.executable, '-I', '-c', code, runner_dir], cwd=tmp_path, check=True)
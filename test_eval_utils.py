@@ -0,0 +1,45 @@
+import os
+import sys
+import pytest
+from PIL import Image
+from datasets import Dataset, Features, Image as ImageFeature, Value
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lmms-eval-files', 'mmbeliefs_mcq'))
+import utils
+
+def _dataset(num_rows):
+    rows = [{'image': Image.new('RGBA', (32, 32), (i, 0, 0, 255)), 'image_path': f'images_std/{i}_0.png',
+             'row_id': f'{num_rows - 1 - i:04d}'} for i in range(num_rows)]
+    features = Features({'image': ImageFeature(), 'image_path': Value('string'), 'row_id': Value('string')})
+    return Dataset.from_list(rows, features=features)
+
+def test_prefetched_docs_are_decoded_once(monkeypatch):
+    monkeypatch.setenv('MMBELIEFS_PREFETCH_WORKERS', '2')
+    monkeypatch.setenv('MMBELIEFS_PREFETCH_WINDOW', '4')
+    docs = utils.mmbeliefs_process_docs(_dataset(10))
+    try:
+        # Sorted by row_id, and reading a document does not decode its image
+        assert docs['row_id'] == [f'{i:04d}' for i in range(10)]
+        assert isinstance(docs[0]['image'], dict) and docs[0]['image']['bytes']
+
+        visuals = [utils.mmbeliefs_doc_to_visual(docs[i]) for i in range(10)]
+        assert [v[0].getpixel((0, 0)) for v in visuals] == [(9 - i, 0, 0) for i in range(10)]
+        assert all(v[0].mode == 'RGB' for v in visuals)
+        stats = utils._prefetcher.stats()
+        assert stats['requests'] == 10 and stats['unknown_docs'] == 0
+    finally:
+        utils._prefetcher.close()
+
+def test_decode_without_prefetcher(monkeypatch):
+    monkeypatch.setenv('MMBELIEFS_PREFETCH_WORKERS', '0')
+    docs = utils.mmbeliefs_process_docs(_dataset(2))
+    assert utils._prefetcher is None
+    assert utils.mmbeliefs_doc_to_visual(docs[1])[0].getpixel((0, 0)) == (0, 0, 0)
+
+def test_missing_resolution_column_is_an_error(monkeypatch):
+    monkeypatch.setenv('MMBELIEFS_IMAGE_RESOLUTION', '336x336')
+    doc = {'image': Image.new('RGB', (448, 448))}
+    with pytest.raises(ValueError):
+        utils.decode_visual(doc)
+    doc['image_336x336'] = Image.new('RGB', (336, 336))
+    assert utils.decode_visual(doc)[0].size == (336, 336)
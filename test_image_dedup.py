@@ -0,0 +1,50 @@
+import os
+import random
+from PIL import Image, ImageDraw
+from image_dedup import BKTree, hamming_distance, compute_hashes, find_duplicate_groups, duplicate_map
+
+def _make_image(path, seed, size=(448, 448), shift=0):
+    rng = random.Random(seed)
+    img = Image.new('RGB', size, 'white')
+    draw = ImageDraw.Draw(img)
+    for _ in range(12):
+        x0, y0 = rng.randint(0, size[0] - 100), rng.randint(0, size[1] - 100)
+        draw.rectangle((x0 + shift, y0, x0 + shift + rng.randint(20, 100), y0 + rng.randint(20, 100)),
+                       fill=(rng.randint(0, 255), rng.randint(0, 255), rng.randint(0, 255)))
+    img.save(path)
+    return path
+
+def test_bktree_matches_linear_scan():
+    rng = random.Random(0)
+    hashes = [rng.getrandbits(64) for _ in range(2000)]
+    tree = BKTree()
+    for i, h in enumerate(hashes):
+        tree.add(h, i)
+    assert len(tree) == len(hashes)
+
+    for query in hashes[:20] + [rng.getrandbits(64) for _ in range(5)]:
+        for max_distance in (0, 4, 20):
+            expected = sorted(i for i, h in enumerate(hashes) if hamming_distance(h, query) <= max_distance)
+            found = sorted(i for _, i in tree.query(query, max_distance))
+            assert found == expected
+
+def test_near_duplicates_are_grouped(tmp_path):
+    original = _make_image(os.path.join(tmp_path, '0_0.png'), seed=1)
+    different = _make_image(os.path.join(tmp_path, '1_0.png'), seed=2)
+    # Same content re-encoded as JPEG at a different size is a near-duplicate
+    resized = os.path.join(tmp_path, '2_0.jpg')
+    Image.open(original).resize((300, 300)).save(resized, quality=80)
+
+    hashes = compute_hashes([original, different, resized], num_workers=1)
+    groups = find_duplicate_groups(hashes, max_distance=6)
+    assert groups == [[original, resized]]
+    assert duplicate_map(groups) == {resized: original}
+
+def test_hash_cache_is_reused(tmp_path):
+    path = _make_image(os.path.join(tmp_path, '0_0.png'), seed=3)
+    hashes = compute_hashes([path], num_workers=1)
+    cached = {path: dict(hashes[path], hash='0' * 16)}
+    # Unchanged file: the cached entry is returned without re-hashing
+    assert compute_hashes([path], cache=cached, num_workers=1)[path]['hash'] == '0' * 16
+    # Different method: the cache entry is ignored
+    assert compute_hashes([path], method='dhash', cache=cached, num_workers=1)[path]['method'] == 'dhash'
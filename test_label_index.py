@@ -0,0 +1,57 @@
+import os
+import json
+from label_index import LabelIndex
+
+def _touch(labels_dir, label, file):
+    os.makedirs(os.path.join(labels_dir, label), exist_ok=True)
+    open(os.path.join(labels_dir, label, file), 'w').close()
+
+def _bump_mtime(path):
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+def test_build_and_queries(tmp_path):
+    labels_dir = os.path.join(tmp_path, 'LABELS')
+    for label, files in {'logo': ['1_0.png', '2_0.jpg'], 'photo': ['2_0.jpg', '3_0.jpg'],
+                         'other': ['3_0.jpg']}.items():
+        for file in files:
+            _touch(labels_dir, label, file)
+
+    index = LabelIndex.build(labels_dir)
+    assert index.labels() == ['logo', 'other', 'photo']
+    assert index.labels_of('2_0.jpg') == ['logo', 'photo']
+    assert index.files_with('photo') == {'2_0.jpg', '3_0.jpg'}
+    assert index.files_with_all(['logo', 'photo']) == {'2_0.jpg'}
+    assert index.files_with_any(['logo', 'other']) == {'1_0.png', '2_0.jpg', '3_0.jpg'}
+    assert index.files_with_only(['other']) == set()
+    assert index.label_counts() == {'logo': 2, 'other': 1, 'photo': 2}
+    assert index.to_dict() == {'1_0.png': ['logo'], '2_0.jpg': ['logo', 'photo'], '3_0.jpg': ['photo']}
+
+    # Round-trips through the image_labels.json format and works as a dict stand-in
+    loaded = LabelIndex.from_dict(index.to_dict())
+    assert '1_0.png' in loaded and '4_0.png' not in loaded
+    assert loaded.get('2_0.jpg') == ['logo', 'photo']
+    assert loaded.get('4_0.png') is None
+
+def test_incremental_sync(tmp_path):
+    labels_dir = os.path.join(tmp_path, 'LABELS')
+    snapshot_path = os.path.join(tmp_path, 'snapshot.json')
+    _touch(labels_dir, 'logo', '1_0.png')
+    _touch(labels_dir, 'photo', '2_0.jpg')
+    assert sorted(LabelIndex().sync(labels_dir, snapshot_path)) == ['logo', 'photo']
+
+    # Unchanged directories come from the snapshot without being rescanned
+    index = LabelIndex()
+    assert index.sync(labels_dir, snapshot_path) == []
+    assert index.to_dict() == {'1_0.png': ['logo'], '2_0.jpg': ['photo']}
+
+    # Moving a file between labels only rescans the two affected directories
+    os.remove(os.path.join(labels_dir, 'photo', '2_0.jpg'))
+    _touch(labels_dir, 'logo', '2_0.jpg')
+    _bump_mtime(os.path.join(labels_dir, 'photo'))
+    _bump_mtime(os.path.join(labels_dir, 'logo'))
+    assert sorted(index.sync(labels_dir, snapshot_path)) == ['logo', 'photo']
+    assert index.to_dict() == {'1_0.png': ['logo'], '2_0.jpg': ['logo']}
+    assert 'photo' not in index.labels()
+    with open(snapshot_path) as f:
+        assert json.load(f)['photo']['files'] == []
@@ -0,0 +1,112 @@
+import os
+import sys
+import json
+import time
+import base64
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lmms-eval-files'))
+from local_server import Batcher, hash_model, make_server, parse_messages
+
+
+def test_parse_messages():
+    image = b'\x89PNG fake image bytes'
+    messages = [
+        {'role': 'system', 'content': 'Answer with a letter.'},
+        {'role': 'user', 'content': [
+            {'type': 'text', 'text': 'Which ideology?'},
+            {'type': 'image_url', 'image_url': {'url': f"data:image/png;base64,{base64.b64encode(image).decode()}"}},
+            {'type': 'image_url', 'image_url': 'https://example.org/symbol.png'},
+        ]},
+    ]
+    prompt, images = parse_messages(messages)
+    assert prompt == 'Answer with a letter.\nWhich ideology?'
+    assert images == [image, b'https://example.org/symbol.png']
+
+
+def test_concurrent_requests_are_batched():
+    batch_sizes = []
+
+    def slow_model(batch):
+        batch_sizes.append(len(batch))
+        time.sleep(0.05)
+        return [prompt.upper() for prompt, _ in batch]
+
+    batcher = Batcher(slow_model, batch_size=8, max_wait_ms=20)
+    prompts = [f"prompt {i}" for i in range(32)]
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        outputs = list(executor.map(lambda p: batcher.submit(p, []).result(timeout=10), prompts))
+
+    # Every caller gets the output for its own prompt, whichever batch it landed in
+    assert outputs == [p.upper() for p in prompts]
+    metrics = batcher.metrics()
+    assert metrics['num_requests'] == 32
+    assert max(batch_sizes) <= 8
+    assert metrics['mean_batch_size'] > 1
+
+
+def test_model_errors_reach_every_caller():
+    def failing_model(batch):
+        raise RuntimeError('model crashed')
+
+    batcher = Batcher(failing_model, batch_size=4, max_wait_ms=1)
+    with pytest.raises(RuntimeError, match='model crashed'):
+        batcher.submit('prompt', []).result(timeout=10)
+
+
+def test_server_round_trip():
+    server = make_server(port=0, model='hash', batch_size=4)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        api_base = f"http://127.0.0.1:{server.server_port}/v1"
+        payload = {'model': 'hash', 'messages': [{'role': 'user', 'content': 'Which ideology?'}]}
+        request = urllib.request.Request(f"{api_base}/chat/completions", data=json.dumps(payload).encode(),
+                                         headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request) as response:
+            content = json.load(response)['choices'][0]['message']['content']
+        assert content == hash_model([('Which ideology?', [])])[0]
+        with urllib.request.urlopen(f"{api_base}/metrics") as response:
+            assert json.load(response)['num_requests'] == 1
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_wrong_number_of_outputs_fails_the_batch():
+    batcher = Batcher(lambda batch: ['A'] * (len(batch) - 1), batch_size=4, max_wait_ms=50)
+    futures = [batcher.submit(f'prompt {i}', []) for i in range(3)]
+    for future in futures:
+        with pytest.raises(RuntimeError, match='outputs for a batch'):
+            future.result(timeout=10)
+
+
+def test_concurrent_backend_batches_eval_requests(monkeypatch, tmp_path):
+    pytest.importorskip('lmms_eval')
+    from mmbeliefs_models.models.openai_concurrent import OpenAIConcurrent
+
+    server = make_server(port=0, model='hash', batch_size=8, max_wait_ms=20)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        monkeypatch.setenv('OPENAI_API_KEY', 'EMPTY')
+        monkeypatch.setenv('OPENAI_API_BASE', f"http://127.0.0.1:{server.server_port}/v1")
+        model = OpenAIConcurrent(model_version='hash', num_concurrent=8, continual_mode=True,
+                                 response_persistent_folder=str(tmp_path))
+        docs = [{'question': f'Question {i}'} for i in range(32)]
+        model.task_dict = {'task': {'validation': docs}}
+
+        class Request:
+            def __init__(self, i):
+                self.args = (docs[i]['question'], {}, lambda doc: [None], i, 'task', 'validation')
+
+        responses = model.generate_until([Request(i) for i in range(32)])
+        assert responses == [hash_model([(doc['question'], [])])[0] for doc in docs]
+        assert server.batcher.metrics()['mean_batch_size'] > 1
+        with open(model.response_persistent_file) as f:
+            assert len(json.load(f)) == 32
+    finally:
+        server.shutdown()
+        server.server_close()
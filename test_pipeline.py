@@ -0,0 +1,77 @@
+import os
+import sys
+import pytest
+from pipeline import run_pipeline, select_stages, stage_dependencies, PipelineError
+
+def _copy_stage(src, dst, extra_inputs=()):
+    code = f"import shutil; shutil.copy({src!r}, {dst!r}); open('calls.txt', 'a').write({dst!r} + '\\n')"
+    return {'cmd': [sys.executable, '-c', code], 'inputs': [src, *extra_inputs], 'outputs': [dst]}
+
+@pytest.fixture
+def stages(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with open('source.txt', 'w') as f:
+        f.write('v1')
+    return {
+        'a': _copy_stage('source.txt', 'a.txt'),
+        'b': _copy_stage('a.txt', 'b.txt'),
+        'c': _copy_stage('a.txt', 'c.txt'),
+        'd': {**_copy_stage('b.txt', 'd.txt', extra_inputs=['c.txt']), 'default': False},
+    }
+
+def _calls():
+    with open('calls.txt') as f:
+        return sorted(f.read().split())
+
+def test_dependencies_and_selection(stages):
+    deps = stage_dependencies(stages)
+    assert deps == {'a': set(), 'b': {'a'}, 'c': {'a'}, 'd': {'b', 'c'}}
+    assert select_stages(stages, deps) == ['a', 'b', 'c']
+    assert select_stages(stages, deps, ['b']) == ['a', 'b']
+    assert select_stages(stages, deps, ['d'])[-1] == 'd'
+    with pytest.raises(PipelineError):
+        select_stages(stages, deps, ['missing'])
+
+def test_non_default_upstream_stage_runs_only_without_outputs(stages):
+    # Like scrape: skipped once its outputs exist, even on a first run with no recorded state
+    stages['e'] = _copy_stage('d.txt', 'e.txt')
+    deps = stage_dependencies(stages)
+    assert select_stages(stages, deps, ['e'])[-2:] == ['d', 'e']
+    for name in ('b', 'c', 'd'):
+        with open(f'{name}.txt', 'w') as f:
+            f.write(name)
+    assert select_stages(stages, deps, ['e']) == ['e']
+    assert select_stages(stages, deps, ['d', 'e'])[-2:] == ['d', 'e']
+    run_pipeline(stages, targets=['e'])
+    assert _calls() == ['e.txt']
+
+def test_up_to_date_stages_are_skipped(stages):
+    manifest = run_pipeline(stages, targets=['d'], jobs=2)
+    assert {s['status'] for s in manifest['stages'].values()} == {'succeeded'}
+    assert _calls() == ['a.txt', 'b.txt', 'c.txt', 'd.txt']
+    assert os.path.exists(os.path.join('.pipeline', 'last_run.json'))
+
+    os.remove('calls.txt')
+    manifest = run_pipeline(stages, targets=['d'])
+    assert {s['status'] for s in manifest['stages'].values()} == {'skipped'}
+    assert not os.path.exists('calls.txt')
+
+    # An edited output re-runs its producer; the regenerated content is identical so d stays up to date
+    with open('c.txt', 'w') as f:
+        f.write('edited')
+    manifest = run_pipeline(stages, targets=['d'])
+    assert [n for n, s in manifest['stages'].items() if s['status'] == 'succeeded'] == ['c']
+
+    # A changed source re-runs everything downstream of it
+    with open('source.txt', 'w') as f:
+        f.write('v2')
+    manifest = run_pipeline(stages, targets=['d'])
+    assert {s['status'] for s in manifest['stages'].values()} == {'succeeded'}
+
+def test_failed_stage_blocks_dependents(stages):
+    stages['a']['cmd'] = [sys.executable, '-c', 'raise SystemExit(3)']
+    with pytest.raises(PipelineError):
+        run_pipeline(stages)
+    with open(os.path.join('.pipeline', 'last_run.json')) as f:
+        last_run = f.read()
+    assert '"failed"' in last_run and '"blocked"' in last_run
@@ -0,0 +1,70 @@
+import os
+import json
+import profiling
+from profiling import span, traced
+
+@traced()
+def _work(n):
+    return sum(range(n))
+
+def test_spans_are_noops_when_disabled():
+    assert not profiling.is_enabled()
+    with span('anything', key='value') as s:
+        assert s is None
+    assert _work(10) == 45
+
+def test_jsonl_trace_and_summary(tmp_path):
+    path = os.path.join(tmp_path, 'trace.jsonl')
+    profiling.enable(path, report=False)
+    try:
+        with span('outer', stage='test'):
+            for _ in range(3):
+                _work(1000)
+    finally:
+        stats = profiling.disable(report=False)
+
+    assert stats['_work']['count'] == 3
+    assert stats['outer']['count'] == 1
+    assert stats['outer']['total_s'] >= stats['_work']['total_s']
+    events = profiling.load_events(path)
+    assert [e['name'] for e in events] == ['_work', '_work', '_work', 'outer']
+    assert events[-1]['args'] == {'stage': 'test'}
+
+def test_chrome_trace_with_profilers(tmp_path):
+    path = os.path.join(tmp_path, 'trace.json')
+    profiling.enable(path, profile='cprofile', report=False)
+    profiling._tracer.profile_dir = os.path.join(tmp_path, 'profiles')
+    try:
+        with span('outer'):
+            _work(1000)
+    finally:
+        profiling.disable(report=False)
+
+    with open(path) as f:
+        trace = json.load(f)
+    outer = [e for e in trace['traceEvents'] if e['name'] == 'outer'][0]
+    assert outer['ph'] == 'X'
+    assert os.path.exists(outer['args']['cprofile'])
+
+    tracer = profiling.enable(None, profile='tracemalloc', profile_spans=['alloc'], report=False)
+    try:
+        with span('alloc'):
+            data = [bytes(1000) for _ in range(1000)]
+    finally:
+        profiling.disable(report=False)
+    assert tracer.events[0]['args']['mem_delta_bytes'] >= 1000 * 1000
+
+    # Each span reports its own peak, not the highest since tracing started; enclosing spans keep theirs
+    tracer = profiling.enable(None, profile='tracemalloc', profile_spans=['outer', 'small', 'large'], report=False)
+    try:
+        with span('outer'):
+            with span('large'):
+                data = bytes(10_000_000)
+                del data
+            with span('small'):
+                data = bytes(1000)
+    finally:
+        profiling.disable(report=False)
+    peaks = {e['name']: e['args']['mem_peak_bytes'] for e in tracer.events}
+    assert peaks['large'] >= 10_000_000 and peaks['outer'] >= 10_000_000
+    assert peaks['small'] < 1_000_000
@@ -0,0 +1,115 @@
+import json
+import asyncio
+import pytest
+import scraper
+from scraper import crawl_partitioned, facet_values, get_card_info, merge_results
+
+IDEOLOGIES = ['Nazi', 'Incel', 'Islamist', 'Accelerationist']
+LOCATIONS = ['Germany', 'India', 'United States']
+PAGE_SIZE = 4
+
+
+def card_html(i, ideologies, locations):
+    chips = lambda values: ''.join(f'<div class="MuiChip-root"><span>{v}</span></div>' for v in values)
+    return (f'<div class="list-item-wrapper MuiBox-root css-1ycirx"><h2>Symbol {i}</h2>'
+            f'<div class="label-wrapper"><p>Ideology</p>{chips(ideologies)}</div>'
+            f'<div class="label-wrapper"><p>Location</p>{chips(locations)}</div>'
+            f'<div class="label-wrapper"><p>Description</p><div class="sw-width-s">Description of symbol {i}</div></div>'
+            f'<div class="static-image" style="background-image: url(&quot;https://example.org/{i}.png&quot;)"></div></div>')
+
+
+def make_cards(num_cards=30):
+    cards = []
+    for i in range(num_cards):
+        # Every third card has two ideologies, so ideology partitions overlap
+        ideologies = [IDEOLOGIES[i % 4]] + ([IDEOLOGIES[(i + 1) % 4]] if i % 3 == 0 else [])
+        locations = [LOCATIONS[i % 3]]
+        cards.append({'Ideology': ideologies, 'Location': locations, 'html': card_html(i, ideologies, locations)})
+    return cards
+
+
+def make_page(cards):
+    """
+    Static page with a card list paged by a "See More" button and filter chips. Cards use the markup
+    get_card_info parses; the filter markup mirrors what scraper.FILTER_GROUP_SELECTOR assumes, so this
+    tests the crawl logic, not that the selector matches the live page.
+    """
+    filters = ''.join(
+        f'<div class="filter-wrapper"><p>{facet}</p>'
+        + ''.join(f'<div class="MuiChip-root" data-facet="{facet}">{v}</div>' for v in values) + '</div>'
+        for facet, values in [('Ideology', IDEOLOGIES), ('Location', LOCATIONS)])
+    return f'''<html><body>{filters}<div id="list"></div><div id="more"></div>
+<script>
+const CARDS = {json.dumps(cards)};
+let filter = null, shown = {PAGE_SIZE};
+function render() {{
+  const cards = CARDS.filter(c => !filter || c[filter.facet].includes(filter.value));
+  document.getElementById('list').innerHTML = cards.slice(0, shown).map(c => c.html).join('');
+  document.getElementById('more').innerHTML = shown < cards.length ? '<button>See More</button>' : '';
+}}
+document.addEventListener('click', e => {{
+  const chip = e.target.closest('.filter-wrapper .MuiChip-root');
+  if (chip) {{ filter = {{facet: chip.dataset.facet, value: chip.textContent}}; shown = {PAGE_SIZE}; render(); }}
+  if (e.target.closest('#more button')) {{ setTimeout(() => {{ shown += {PAGE_SIZE}; render(); }}, 50); }}
+}});
+render();
+</script></body></html>'''
+
+
+def test_parse_and_merge():
+    cards = make_cards()
+    results = get_card_info(''.join(c['html'] for c in cards))
+    assert len(results) == 30
+    assert results[0] == {'title': 'Symbol 0', 'Ideology': ['Nazi', 'Incel'], 'Location': ['Germany'],
+                          'Description': 'Description of symbol 0', 'images': ['https://example.org/0.png']}
+    assert facet_values(make_page(cards), 'Location') == LOCATIONS
+    assert facet_values(make_page(cards), 'Missing') == []
+
+    # Partitions overlap: cards with two ideologies appear in both
+    partitions = [[r for r in results if ideology in r['Ideology']] for ideology in IDEOLOGIES]
+    merged = merge_results(partitions)
+    assert sorted(r['title'] for r in merged) == sorted(r['title'] for r in results)
+    assert merge_results([[{'title': 'a', 'images': ['1']}], [{'title': 'a', 'images': ['1', '2']}]]) == \
+        [{'title': 'a', 'images': ['1', '2']}]
+
+
+def require_browser():
+    from playwright.sync_api import sync_playwright
+    try:
+        with sync_playwright() as p:
+            p.chromium.launch().close()
+    except Exception as e:
+        pytest.skip(f"Playwright browser not available: {e}")
+
+
+def test_partitioned_crawl(tmp_path):
+    require_browser()
+    cards = make_cards()
+    page_path = tmp_path / 'database.html'
+    page_path.write_text(make_page(cards))
+    results, stats = asyncio.run(crawl_partitioned(page_path.as_uri(), facets=('Ideology', 'Location'),
+                                                   max_contexts=3, settle_ms=500, browser_type='chromium'))
+    assert len(stats) == len(IDEOLOGIES) + len(LOCATIONS)
+    assert not any('error' in s for s in stats.values())
+    assert sorted(r['title'] for r in results) == sorted(r['title'] for r in get_card_info(''.join(c['html'] for c in cards)))
+
+
+def test_failed_partitions_are_retried_then_raise(tmp_path, monkeypatch):
+    require_browser()
+    page_path = tmp_path / 'database.html'
+    page_path.write_text(make_page(make_cards()))
+    attempts = {}
+    crawl_partition = scraper.crawl_partition
+
+    async def flaky_crawl_partition(browser, url, facet, value, settle_ms):
+        # Nazi fails once, Incel always fails
+        attempts[value] = attempts.get(value, 0) + 1
+        if value == 'Incel' or (value == 'Nazi' and attempts[value] == 1):
+            raise RuntimeError('Timeout')
+        return await crawl_partition(browser, url, facet, value, settle_ms=settle_ms)
+
+    monkeypatch.setattr(scraper, 'crawl_partition', flaky_crawl_partition)
+    with pytest.raises(RuntimeError, match='Ideology=Incel'):
+        asyncio.run(crawl_partitioned(page_path.as_uri(), facets=('Ideology',), settle_ms=500,
+                                      browser_type='chromium', max_attempts=2))
+    assert attempts == {'Nazi': 2, 'Incel': 2, 'Islamist': 1, 'Accelerationist': 1}
@@ -2,7 +2,8 @@ import unittest
 import os
 from PIL import Image
 import shutil
-from standardize_images import resize_with_padding
+import numpy as np
+from standardize_images import resize_with_padding, resize_with_padding_multi
 
 class TestResizeWithPadding(unittest.TestCase):
     def setUp(self):
@@ -144,6 +145,29 @@ class TestResizeWithPadding(unittest.TestCase):
                                f"Number of blue squares changed significantly for {filename}. "
                                f"Expected {input_blues}, got {output_blues}")
 
+    def test_multi_resolution(self):
+        target_sizes = [(448, 448), (336, 336), (224, 224)]
+        output_dirs = [os.path.join(self.output_dir, f"{w}x{h}") for w, h in target_sizes]
+        for output_dir in output_dirs:
+            os.makedirs(output_dir, exist_ok=True)
+
+        for filename, original_size in self.test_cases:
+            input_path = os.path.join(self.test_dir, filename)
+            output_paths = resize_with_padding_multi(input_path, list(zip(target_sizes, output_dirs)))
+
+            for output_path, output_dir, target_size in zip(output_paths, output_dirs, target_sizes):
+                self.assertEqual(output_path, os.path.join(output_dir, filename))
+                output_img = Image.open(output_path).convert('RGB')
+                self.assertEqual(output_img.size, target_size)
+
+                # Successive downscaling should closely match resizing straight from the original
+                single_dir = os.path.join(self.output_dir, 'single')
+                os.makedirs(single_dir, exist_ok=True)
+                single_img = Image.open(resize_with_padding(input_path, single_dir, target_size=target_size)).convert('RGB')
+                diff = np.abs(np.asarray(output_img, dtype=np.int16) - np.asarray(single_img, dtype=np.int16)).mean()
+                self.assertLess(diff, 8,
+                                f"Multi-resolution output differs too much from single resize for {filename} at {target_size}")
+
 if __name__ == '__main__':
     unittest.main()
 
@@ -0,0 +1,50 @@
+import os
+import time
+from PIL import Image
+from svg_rasterizer import rasterize_svgs, svg_size
+
+def fake_render(svg_path, output_path, target_size):
+    """Stands in for cairosvg; the SVG text selects the behaviour."""
+    with open(svg_path) as f:
+        content = f.read()
+    if 'hang' in content:
+        time.sleep(60)
+    if 'huge' in content:
+        bytearray(4 * 1024 ** 3)
+    if 'broken' in content:
+        raise ValueError('cannot parse')
+    Image.new('RGBA', target_size, (255, 0, 0, 255)).save(output_path)
+
+def test_rasterize_svgs(tmp_path):
+    jobs = []
+    for name in ['ok', 'hang', 'huge', 'broken']:
+        svg_path = os.path.join(tmp_path, f'{name}.svg')
+        with open(svg_path, 'w') as f:
+            f.write(f'<svg xmlns="http://www.w3.org/2000/svg" width="10" height="10"><!-- {name} --></svg>')
+        jobs.append((svg_path, os.path.join(tmp_path, f'{name}.png')))
+    cache_dir = os.path.join(tmp_path, 'cache')
+
+    start = time.time()
+    report = rasterize_svgs(jobs, (64, 64), num_workers=4, timeout_s=2, memory_limit_mb=256,
+                            cache_dir=cache_dir, render_fn=fake_render)
+    assert time.time() - start < 30
+    assert report['rendered'] == [jobs[0][1]]
+    assert Image.open(jobs[0][1]).size == (64, 64)
+    quarantined = report['quarantined']
+    assert sorted(os.path.basename(p) for p in quarantined) == ['broken.svg', 'hang.svg', 'huge.svg']
+    assert 'Timed out' in quarantined[jobs[1][0]]['error']
+    assert 'memory limit' in quarantined[jobs[2][0]]['error']
+    assert 'cannot parse' in quarantined[jobs[3][0]]['error']
+    assert not os.path.exists(jobs[1][1])
+
+    # Unchanged content is served from the cache without rendering
+    os.remove(jobs[0][1])
+    report = rasterize_svgs(jobs[:1], (64, 64), cache_dir=cache_dir, render_fn=fake_render)
+    assert report['cached'] == [jobs[0][1]] and not report['rendered']
+    assert os.path.exists(jobs[0][1])
+
+def test_svg_size(tmp_path):
+    svg_path = os.path.join(tmp_path, 'a.svg')
+    with open(svg_path, 'w') as f:
+        f.write('<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 200 100"></svg>')
+    assert svg_size(svg_path) == (200.0, 100.0)
@@ -0,0 +1,73 @@
+import os
+import sys
+import json
+import threading
+import urllib.error
+import urllib.request
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lmms-eval-files'))
+from local_server import make_server
+import pytest
+from telemetry_proxy import (Recorder, comparison_report, format_report, record_call, start_proxy, stop_proxy,
+                             write_metrics, REQUESTS_FILENAME)
+
+def _post(base, path, payload):
+    request = urllib.request.Request(base + path, data=json.dumps(payload).encode(),
+                                     headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request) as response:
+        return json.load(response)
+
+def test_proxy_records_requests(tmp_path):
+    server = make_server(port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    run_dir = os.path.join(tmp_path, 'model', 'telemetry', 'run1')
+    proxy = start_proxy(f"http://127.0.0.1:{server.server_port}/v1", run_dir)
+    base = f"http://127.0.0.1:{proxy.server_port}"
+    try:
+        payload = {'model': 'hash', 'messages': [{'role': 'user', 'content': 'Which symbol? A B C D'}]}
+        direct = _post(f"http://127.0.0.1:{server.server_port}/v1", '/chat/completions', payload)
+        proxied = _post(base, '/chat/completions', payload)
+        assert proxied['choices'] == direct['choices']
+        _post(base, '/chat/completions', payload)  # Identical request, counted as a retry
+        try:
+            _post(base, '/unknown', payload)
+        except urllib.error.HTTPError as e:
+            assert e.code == 404
+    finally:
+        stop_proxy(proxy)
+        server.shutdown()
+
+    metrics = write_metrics(run_dir, {'model': 'local-stub', 'run': 'run1'},
+                            price_per_1m_input_tokens=1.0, price_per_1m_output_tokens=2.0)
+    assert metrics['num_requests'] == 3
+    assert metrics['num_errors'] == 1 and metrics['status_counts'] == {'200': 2, '404': 1}
+    assert metrics['num_retries'] == 1
+    assert metrics['prompt_tokens'] == 2 * direct['usage']['prompt_tokens']
+    expected_cost = (metrics['prompt_tokens'] * 1.0 + metrics['completion_tokens'] * 2.0) / 1e6
+    assert abs(metrics['cost_usd'] - expected_cost) < 1e-12
+    assert metrics['latency_p50_s'] <= metrics['latency_p99_s']
+
+    rows = comparison_report(tmp_path)
+    assert [r['run'] for r in rows] == ['run1']
+    assert 'local-stub' in format_report(rows)
+
+def test_record_sdk_calls(tmp_path):
+    class QuotaError(Exception):
+        code = 429
+
+    def quota_exceeded():
+        raise QuotaError('quota exceeded')
+
+    recorder = Recorder(os.path.join(tmp_path, REQUESTS_FILENAME))
+    path = '/models/gemini:generateContent'
+    assert record_call(recorder, path, b'message', lambda: 'A', lambda result: (10, 1)) == 'A'
+    with pytest.raises(QuotaError):
+        record_call(recorder, path, b'message', quota_exceeded)
+    record_call(recorder, path, b'other message', lambda: None, lambda result: result.usage)  # Usage is optional
+    recorder.close()
+
+    metrics = write_metrics(tmp_path, {'model': 'gemini'}, price_per_1m_input_tokens=1.0, price_per_1m_output_tokens=2.0)
+    assert metrics['num_requests'] == 3 and metrics['num_retries'] == 1
+    assert metrics['status_counts'] == {'200': 2, '429': 1}
+    assert metrics['prompt_tokens'] == 10 and metrics['completion_tokens'] == 1
+    assert abs(metrics['cost_usd'] - 12 / 1e6) < 1e-12
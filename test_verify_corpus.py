@@ -0,0 +1,64 @@
+import os
+from PIL import Image
+from label_index import LabelIndex
+from verify_corpus import inspect_image, update_manifest, verify
+
+def test_verify_corpus(tmp_path):
+    images_dir = os.path.join(tmp_path, 'images_std')
+    os.makedirs(images_dir)
+    Image.new('RGB', (448, 448), 'red').save(os.path.join(images_dir, '0_0.png'))
+    Image.new('RGBA', (448, 448), 'red').save(os.path.join(images_dir, '1_0.png'))
+    Image.new('RGB', (224, 224), 'red').save(os.path.join(images_dir, '2_0.jpg'))
+    open(os.path.join(images_dir, '3_0.png'), 'wb').write(b'not an image')
+
+    manifest, num_inspected = update_manifest(images_dir)
+    assert num_inspected == 4
+    # An unchanged corpus is served entirely from the manifest
+    assert update_manifest(images_dir, manifest)[1] == 0
+
+    labels = LabelIndex.from_dict({'0_0.png': ['logo'], '1_0.png': ['photo'], '2_0.jpg': ['logo'], '9_0.png': ['logo']})
+    task_data = [
+        {'image_path': 'images_std/0_0.png', 'image_labels': ['logo']},
+        {'image_path': 'images_std/1_0.png', 'image_labels': ['logo']},
+        {'image_path': 'images_std/8_0.png', 'image_labels': []},
+    ]
+    problems = verify(manifest, task_data, labels)
+    assert problems['wrong_mode'] == ['1_0.png: RGBA']
+    assert problems['wrong_size'] == ['2_0.jpg: 224x224']
+    assert [p.split(':')[0] for p in problems['unreadable_images']] == ['3_0.png']
+    assert problems['missing_task_images'] == ['images_std/8_0.png']
+    assert [p.split(':')[0] for p in problems['task_label_mismatch']] == ['1_0.png']
+    assert problems['unlabeled_images'] == ['3_0.png']
+    assert problems['labels_without_images'] == ['9_0.png']
+    assert problems['identical_images'] == []
+
+    # A byte-identical copy under another name is flagged once both are used by the task data
+    Image.new('RGB', (448, 448), 'red').save(os.path.join(images_dir, '4_0.png'))
+    os.utime(os.path.join(images_dir, '4_0.png'), ns=(0, 10**18))
+    manifest, _ = update_manifest(images_dir, manifest)
+    assert manifest['4_0.png']['sha256'] == manifest['0_0.png']['sha256']
+    assert verify(manifest, task_data, labels)['identical_images'] == []
+    task_data.append({'image_path': 'images_std/4_0.png'})
+    assert verify(manifest, task_data, labels)['identical_images'] == ['0_0.png = 4_0.png']
+    assert verify(manifest, [], labels)['identical_images'] == ['0_0.png = 4_0.png']
+    os.remove(os.path.join(images_dir, '4_0.png'))
+    manifest, _ = update_manifest(images_dir, manifest)
+
+    # Rewriting a file invalidates only its manifest entry
+    Image.new('RGB', (448, 448), 'blue').save(os.path.join(images_dir, '1_0.png'))
+    os.utime(os.path.join(images_dir, '1_0.png'), ns=(0, 10**18))
+    manifest, num_inspected = update_manifest(images_dir, manifest)
+    assert num_inspected == 1
+    assert manifest['1_0.png']['mode'] == 'RGB'
+
+
+def test_truncated_image_is_unreadable(tmp_path):
+    # The header of a truncated file still parses; only decoding the pixels fails
+    path = os.path.join(tmp_path, '0_0.png')
+    Image.effect_noise((448, 448), 64).convert('RGB').save(path)
+    assert 'error' not in inspect_image(path)
+    data = open(path, 'rb').read()
+    open(path, 'wb').write(data[:len(data) // 2])
+    with Image.open(path) as img:
+        assert img.size == (448, 448)
+    assert inspect_image(path)['error'].startswith('Cannot decode image')
@@ -0,0 +1,157 @@
+"""
+Verify that the standardized images, the task data and the image labels agree.
+
+Checks:
+1. Every image in images_std/ decodes with the expected size (448x448) and mode (RGB)
+2. Every image_path in the task data exists, and its image_labels match assets/image_labels.json
+3. Every image has labels and every label entry has an image
+4. No two images used by the task data are byte-identical (same SHA-256). The standardize stage
+   flags near-duplicates and generate_questions.py skips them, so these are duplicates it missed
+
+Image hashes, sizes and modes are cached in a manifest keyed by file size and mtime, so later
+runs only re-read files that changed.
+
+Usage:
+python3 verify_corpus.py
+# Outputs: corpus_manifest.json (cache) and corpus_report.json; exits with 1 if any check failed
+"""
+
+import os
+import sys
+import json
+import hashlib
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+
+from image_dedup import IMAGE_EXTENSIONS
+from label_index import LabelIndex
+
+
+def inspect_image(im_path):
+    """SHA-256 of the file plus the size and mode of the fully decoded image."""
+    h = hashlib.sha256()
+    with open(im_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    try:
+        with Image.open(im_path) as img:
+            img.load()  # Decode the pixel data too, so truncated or corrupt files are caught
+            info = {'width': img.size[0], 'height': img.size[1], 'mode': img.mode}
+    except Exception as e:
+        info = {'error': f"Cannot decode image: {e}"}
+    info['sha256'] = h.hexdigest()
+    return info
+
+
+def update_manifest(images_dir, manifest=None, num_workers=None):
+    """
+    Return (manifest, num_inspected) covering all images in images_dir. Entries whose file
+    size and mtime are unchanged are reused from the previous manifest.
+    """
+    manifest = manifest or {}
+    new_manifest, to_inspect = {}, []
+    with os.scandir(images_dir) as entries:
+        for entry in entries:
+            if not entry.is_file() or not entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            st = entry.stat()
+            previous = manifest.get(entry.name)
+            if previous and previous['size'] == st.st_size and previous['mtime_ns'] == st.st_mtime_ns:
+                new_manifest[entry.name] = previous
+            else:
+                to_inspect.append((entry.name, entry.path, st))
+
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        for (name, _, st), info in zip(to_inspect, executor.map(inspect_image, [p for _, p, _ in to_inspect])):
+            new_manifest[name] = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, **info}
+    return dict(sorted(new_manifest.items())), len(to_inspect)
+
+
+def verify(manifest, task_data, image_labels, target_size=(448, 448), mode='RGB'):
+    """Run all consistency checks; returns a dict of check name -> list of problems."""
+    problems = {
+        'unreadable_images': [],
+        'wrong_size': [],
+        'wrong_mode': [],
+        'missing_task_images': [],
+        'task_label_mismatch': [],
+        'unlabeled_images': [],
+        'labels_without_images': [],
+        'identical_images': [],
+    }
+    for name, entry in manifest.items():
+        if 'error' in entry:
+            problems['unreadable_images'].append(f"{name}: {entry['error']}")
+            continue
+        if (entry['width'], entry['height']) != tuple(target_size):
+            problems['wrong_size'].append(f"{name}: {entry['width']}x{entry['height']}")
+        if entry['mode'] != mode:
+            problems['wrong_mode'].append(f"{name}: {entry['mode']}")
+
+    for task in task_data:
+        image_bn = os.path.basename(task['image_path'])
+        if image_bn not in manifest:
+            problems['missing_task_images'].append(task['image_path'])
+        if 'image_labels' in task and sorted(task['image_labels'] or []) != sorted(image_labels.get(image_bn) or []):
+            problems['task_label_mismatch'].append(
+                f"{image_bn}: task has {task['image_labels']}, labels have {image_labels.get(image_bn)}")
+
+    problems['unlabeled_images'] = sorted(name for name in manifest if name not in image_labels)
+    problems['labels_without_images'] = sorted(name for name in image_labels.files() if name not in manifest)
+
+    # Without task data, every image is compared
+    used = {os.path.basename(task['image_path']) for task in task_data} if task_data else set(manifest)
+    by_hash = {}
+    for name in sorted(used):
+        if name in manifest:
+            by_hash.setdefault(manifest[name]['sha256'], []).append(name)
+    problems['identical_images'] = sorted(' = '.join(names) for names in by_hash.values() if len(names) > 1)
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Verify consistency of images, task data and labels')
+    parser.add_argument('--images_dir', type=str, default='images_std')
+    parser.add_argument('--task_data_path', type=str, default='task_data.json')
+    parser.add_argument('--labels_path', type=str, default=os.path.join('assets', 'image_labels.json'))
+    parser.add_argument('--manifest_path', type=str, default='corpus_manifest.json')
+    parser.add_argument('--report_path', type=str, default='corpus_report.json')
+    parser.add_argument('--target_size', type=int, nargs=2, default=[448, 448])
+    parser.add_argument('--mode', type=str, default='RGB')
+    parser.add_argument('--num_workers', type=int, default=None)
+    args = parser.parse_args()
+
+    manifest = {}
+    if os.path.exists(args.manifest_path):
+        with open(args.manifest_path, 'r') as f:
+            manifest = json.load(f)
+    manifest, num_inspected = update_manifest(args.images_dir, manifest, args.num_workers)
+    with open(args.manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=4)
+    print(f"Inspected {num_inspected} of {len(manifest)} images ({len(manifest) - num_inspected} unchanged)")
+
+    task_data = []
+    if os.path.exists(args.task_data_path):
+        with open(args.task_data_path, 'r') as f:
+            task_data = json.load(f)
+    else:
+        print(f"Warning: {args.task_data_path} not found, skipping task data checks")
+    image_labels = LabelIndex.from_json(args.labels_path)
+
+    problems = verify(manifest, task_data, image_labels, args.target_size, args.mode)
+    with open(args.report_path, 'w') as f:
+        json.dump(problems, f, indent=4)
+
+    failed = False
+    for check, items in problems.items():
+        print(f"{check}: {len(items)}")
+        for item in items[:10]:
+            print(f"    {item}")
+        if len(items) > 10:
+            print(f"    ... and {len(items) - 10} more (see {args.report_path})")
+        failed = failed or bool(items)
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()